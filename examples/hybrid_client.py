@@ -1,12 +1,14 @@
 """
 Example hybrid TCP/UDP client for robot communication.
 
-TCP: Send/receive commands
-UDP: Stream sensor data to server
+TCP: Send/receive commands (newline JSON, or length-prefixed frames with binary_framing=True)
+UDP: Stream sensor data to server (JSON, or the compact binary format with binary_sensors=True)
 """
 
 import asyncio
 import json
+import os
+import struct
 import time
 import random
 from typing import Optional
@@ -14,12 +16,55 @@ from typing import Optional
 SERVER_HOST = "127.0.0.1"
 TCP_PORT = 3000
 UDP_PORT = 3001
+ROBOT_ID = int(os.environ.get("ROBOT_ID", 1))  # must be unique per robot: the server resumes sessions by it
+
+# Binary sensor packet format v1 (see src/llm/sensor_packet.py)
+PACKET_MAGIC = 0xB5
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct("<BBBBHHId")  # magic, version, type, flags, robot_id, count, seq, timestamp
+TYPE_LIDAR, TYPE_IMU, TYPE_PROXIMITY = 1, 2, 3
+
+# Binary TCP framing (see src/llm/tcp_framing.py): uint16 length, uint8 frame type, body
+FRAME_LENGTH = struct.Struct("<H")
+FRAME_COMMAND, FRAME_ACK, FRAME_JSON = 1, 2, 3
+COMMAND_BODY = struct.Struct("<BBIB")  # type, opcode, id, float count (then count x float32)
+ACK_FRAME = struct.Struct("<HBIBf")    # length, type, id, status (0 = success), result
+OPCODE_NAMES = {1: "move", 2: "turn", 3: "FORWARD", 4: "BACKWARD", 5: "TURNLEFT", 6: "TURNRIGHT", 7: "PING"}
+
+
+def encode_lidar_packet(robot_id: int, seq: int, angles: list[float], distances: list[float],
+                        fragment: int = 0, fragments: int = 1) -> bytes:
+    """Binary lidar packet: header + fragment info + (float32 angle, float32 distance) pairs."""
+    n = len(distances)
+    points = [v for pair in zip(angles, distances) for v in pair]
+    return (PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, TYPE_LIDAR, 0, robot_id, n, seq, time.time())
+            + struct.pack("<HH", fragment, fragments)
+            + struct.pack(f"<{2 * n}f", *points))
+
+
+def encode_imu_packet(robot_id: int, seq: int, accel: dict, gyro: dict) -> bytes:
+    """Binary IMU packet: header + 6 float32 (accel x/y/z, gyro x/y/z)."""
+    return (PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, TYPE_IMU, 0, robot_id, 6, seq, time.time())
+            + struct.pack("<6f", accel["x"], accel["y"], accel["z"], gyro["x"], gyro["y"], gyro["z"]))
+
+
+def encode_proximity_packet(robot_id: int, seq: int, distances_cm: list[int]) -> bytes:
+    """Binary proximity packet: header + uint16 distances in centimetres."""
+    n = len(distances_cm)
+    return (PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, TYPE_PROXIMITY, 0, robot_id, n, seq, time.time())
+            + struct.pack(f"<{n}H", *(max(0, min(0xFFFF, int(d))) for d in distances_cm)))
 
 class HybridRobotClient:
     """Example robot client with TCP command channel and UDP sensor streaming."""
     
-    def __init__(self, bot_type: str = "R1D4"):
+    def __init__(self, bot_type: str = "R1D4", binary_sensors: bool = False, robot_id: int = ROBOT_ID,
+                 binary_framing: bool = False):
         self.bot_type = bot_type
+        self.binary_sensors = binary_sensors
+        self.binary_framing = binary_framing
+        self.framing = "line"  # becomes "binary" once the server confirms
+        self.robot_id = robot_id
+        self._seq = 0
         self.tcp_reader: Optional[asyncio.StreamReader] = None
         self.tcp_writer: Optional[asyncio.StreamWriter] = None
         self.udp_transport: Optional[asyncio.DatagramTransport] = None
@@ -33,9 +78,17 @@ class HybridRobotClient:
         print(f"✅ TCP connected to {SERVER_HOST}:{TCP_PORT}")
         
         # Send registration message
-        registration = {"command": "register", "bot": self.bot_type}
+        registration = {"command": "register", "bot": self.bot_type, "robot_id": self.robot_id}
+        if self.binary_framing:
+            registration["framing"] = "binary"
         await self._send_tcp(registration)
         print(f"📝 Registered as {self.bot_type}")
+
+        if self.binary_framing:
+            # The confirmation is the last newline-delimited message from the server
+            reply = json.loads(await self.tcp_reader.readline())
+            self.framing = reply.get("framing", "line")
+            print(f"🔧 Server confirmed {self.framing} framing")
     
     async def setup_udp(self):
         """Setup UDP socket for sensor data transmission."""
@@ -47,25 +100,79 @@ class HybridRobotClient:
         print(f"📡 UDP socket ready (target: {SERVER_HOST}:{UDP_PORT})")
     
     async def _send_tcp(self, data: dict):
-        """Send JSON message over TCP."""
+        """Send JSON message over TCP (as a JSON frame in binary framing)."""
         if not self.tcp_writer:
             return
-        message = json.dumps(data) + "\n"
-        self.tcp_writer.write(message.encode('utf-8'))
+        if self.framing == "binary":
+            body = json.dumps(data).encode('utf-8')
+            self.tcp_writer.write(FRAME_LENGTH.pack(len(body) + 1) + bytes([FRAME_JSON]) + body)
+        else:
+            message = json.dumps(data) + "\n"
+            self.tcp_writer.write(message.encode('utf-8'))
         await self.tcp_writer.drain()
+
+    async def _send_ack(self, cmd: dict, success: bool = True):
+        """Report command completion: a 12-byte ACK frame, or a JSON ack line."""
+        if self.framing == "binary" and isinstance(cmd.get("id"), int):
+            self.tcp_writer.write(ACK_FRAME.pack(ACK_FRAME.size - 2, FRAME_ACK, cmd["id"], 0 if success else 1, 0.0))
+            await self.tcp_writer.drain()
+        else:
+            await self._send_tcp({"id": cmd.get("id"), "status": "completed", "command": cmd.get("command", "unknown")})
+
+    async def _read_frame(self) -> Optional[dict | str]:
+        """Read one frame: a command dict for COMMAND frames, JSON text otherwise; None on EOF."""
+        try:
+            (length,) = FRAME_LENGTH.unpack(await self.tcp_reader.readexactly(2))
+            body = await self.tcp_reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+        if body[0] == FRAME_COMMAND:
+            _, opcode, cmd_id, n = COMMAND_BODY.unpack_from(body)
+            values = list(struct.unpack_from(f"<{n}f", body, COMMAND_BODY.size))
+            return {"id": cmd_id, "command": OPCODE_NAMES.get(opcode, "unknown"), "floatData": values}
+        return body[1:].decode('utf-8', errors='replace')
     
     def send_udp(self, data: dict):
         """Send JSON message over UDP."""
         if not self.udp_transport:
             return
-        message = json.dumps(data).encode('utf-8')
+        message = json.dumps({**data, "robot_id": self.robot_id}).encode('utf-8')
         self.udp_transport.sendto(message)
+
+    def send_udp_binary(self, data: dict):
+        """Encode a sensor dict with the binary packet format and send it over UDP."""
+        if not self.udp_transport:
+            return
+        self._seq += 1
+        if data["type"] == "lidar":
+            distances = data["distances"]
+            packet = encode_lidar_packet(self.robot_id, self._seq, [float(a) for a in range(len(distances))], distances)
+        elif data["type"] == "imu":
+            packet = encode_imu_packet(self.robot_id, self._seq, data["accel"], data["gyro"])
+        else:
+            packet = encode_proximity_packet(
+                self.robot_id, self._seq,
+                [data[k] * 100.0 for k in ("front", "back", "left", "right")]
+            )
+        self.udp_transport.sendto(packet)
     
     async def listen_for_commands(self):
         """Listen for commands from server over TCP."""
         print("👂 Listening for commands...")
         try:
             while self.running and self.tcp_reader:
+                if self.framing == "binary":
+                    frame = await self._read_frame()
+                    if frame is None:
+                        print("🔌 TCP connection closed by server")
+                        break
+                    if isinstance(frame, dict):
+                        print(f"\n📥 Received frame: {frame}")
+                        await self._execute_command(frame)
+                    elif frame:
+                        await self._handle_command(frame)
+                    continue
+
                 line = await self.tcp_reader.readline()
                 if not line:
                     print("🔌 TCP connection closed by server")
@@ -97,6 +204,12 @@ class HybridRobotClient:
     async def _execute_command(self, cmd: dict):
         """Simulate command execution."""
         command_type = cmd.get('command', 'unknown')
+
+        if command_type in ('heartbeat', 'pong'):
+            # Liveness probe from the server: answer it, nothing to execute or ack
+            if command_type == 'heartbeat':
+                await self._send_tcp({"command": "pong"})
+            return
         
         if command_type == 'move':
             distance = cmd.get('float_data', [0])[0]
@@ -112,8 +225,7 @@ class HybridRobotClient:
             print(f"❓ Unknown command: {command_type}")
         
         # Send acknowledgment via TCP
-        ack = {"status": "completed", "command": command_type}
-        await self._send_tcp(ack)
+        await self._send_ack(cmd)
     
     async def stream_sensor_data(self):
         """Simulate streaming sensor data via UDP."""
@@ -155,7 +267,10 @@ class HybridRobotClient:
                         "right": random.uniform(0, 2)
                     }
                 
-                self.send_udp(data)
+                if self.binary_sensors:
+                    self.send_udp_binary(data)
+                else:
+                    self.send_udp(data)
                 await asyncio.sleep(0.1)  # 10 Hz sensor rate
                 
         except asyncio.CancelledError:
@@ -197,7 +312,8 @@ async def main():
     """Run example client."""
     print("🤖 Starting Hybrid Robot Client Example\n")
     
-    client = HybridRobotClient(bot_type="R1D4")
+    client = HybridRobotClient(bot_type="R1D4", robot_id=ROBOT_ID)
+    print(f"   robot_id {client.robot_id} (set ROBOT_ID to run several clients at once)\n")
     
     try:
         await client.run()
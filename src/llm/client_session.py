@@ -0,0 +1,179 @@
+"""
+Per-client TCP session with a bounded outbound queue.
+
+Senders never touch the StreamWriter directly: ``ClientSession.send()`` only
+enqueues, and one writer task per session writes and drains. A robot on a bad
+link therefore fills its own queue instead of stalling a broadcast (or the
+stdin router) for everyone else; a broadcast costs one enqueue per client.
+
+Overflow policies when the queue is full:
+  - drop-oldest  the oldest queued message is discarded (counted in `dropped`)
+  - coalesce     a queued message with the same key is replaced by the new one
+                 (latest set-point wins); falls back to drop-oldest
+  - disconnect   the session is closed; the robot reconnects and re-registers
+
+A robot that registered with a robot_id is detached rather than closed when
+its connection drops: the session keeps its parser, sensors and stats, and
+take_over() moves a new connection into it when the robot resumes.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from src.llm.command_parser import RobotCommandParser
+from src.llm.sensor_store import RobotSensors
+from src.llm.server_logging import get_logger
+from src.llm.tcp_framing import FRAMING_LINE
+from src.map.mapStructure import NavigationSession
+
+log = get_logger()
+
+POLICIES = ("drop-oldest", "coalesce", "disconnect")
+
+
+class ClientSession:
+    """One connected robot: its writer, parser, bot type and outbound queue."""
+
+    def __init__(self, peer: tuple, writer: asyncio.StreamWriter, parser: RobotCommandParser, bot_type: str,
+                 max_queue: int = 256, policy: str = "drop-oldest", drain_timeout: float = 10.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        self.peer = peer
+        self.writer = writer
+        self.parser = parser
+        self.bot_type = bot_type
+        self.robot_id: Optional[str] = None  # "robot_id" from the registration message, if sent
+        self.udp_addrs: set[tuple] = set()  # UDP sources bound to this robot (see SessionRegistry.bind_udp)
+        self.sensors: Optional[RobotSensors] = None  # this robot's sensor history, once a UDP source is bound
+        self.navigation: Optional[NavigationSession] = None  # pose and heading on the map, from the first route
+        self.framing = FRAMING_LINE  # switched to "binary" when negotiated at registration
+        self.max_queue = max_queue
+        self.policy = policy
+        self.drain_timeout = drain_timeout
+        self._queue: deque[tuple[float, Optional[str], bytes]] = deque()  # (enqueue time, coalesce key, data)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.closed = False
+        self.detached = False  # connection lost, waiting for the robot to resume
+        self.last_seen = time.monotonic()  # last inbound traffic (see liveness.py)
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_latency = 0.0   # enqueue -> drained, seconds
+        self.max_latency = 0.0
+        self._latency_sum = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def send(self, data: bytes, key: Optional[str] = None) -> bool:
+        """Queue `data` for this client. Never blocks; returns False if it was not queued."""
+        if self.closed:
+            return False
+        if self.detached:
+            return True  # held in the command tracker and replayed on resume
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                log.warning("⚠️ Outbound queue full for %s, disconnecting", self.peer)
+                self.close()
+                return False
+            if self.policy == "coalesce" and key is not None:
+                for i, (_, queued_key, _) in enumerate(self._queue):
+                    if queued_key == key:
+                        del self._queue[i]
+                        self.coalesced += 1
+                        break
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+        self._queue.append((time.perf_counter(), key, data))
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not self._queue:
+                    continue
+                # Write everything queued so far, then drain once
+                batch = list(self._queue)
+                self._queue.clear()
+                self.writer.write(b"".join(data for _, _, data in batch))
+                await asyncio.wait_for(self.writer.drain(), self.drain_timeout)
+                now = time.perf_counter()
+                for enqueued, _, _ in batch:
+                    latency = now - enqueued
+                    self._latency_sum += latency
+                    if latency > self.max_latency:
+                        self.max_latency = latency
+                self.last_latency = now - batch[-1][0]
+                self.sent += len(batch)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            log.warning("⚠️ Write to %s stalled for %.1fs, disconnecting", self.peer, self.drain_timeout)
+            self.close()
+        except Exception as e:
+            log.error("❌ write failed for %s: %s", self.peer, e)
+            self.close()
+
+    def close(self):
+        """Stop the writer task and close the connection (pending messages are discarded)."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+    def detach(self):
+        """Drop the dead connection but keep the session for resumption (queued messages are discarded)."""
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+        self._queue.clear()
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        self.closed = False
+        self.detached = True
+
+    def take_over(self, other: "ClientSession"):
+        """Resume on `other`'s connection: adopt its peer and writer and retire `other` without closing it."""
+        if other._task is not None:
+            other._task.cancel()
+        other.closed = True
+        other._queue.clear()
+        self.peer = other.peer
+        self.writer = other.writer
+        self.framing = other.framing
+        self.closed = False
+        self.detached = False
+        self._wakeup = asyncio.Event()
+        self.start()
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._queue),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "last_latency_ms": self.last_latency * 1000.0,
+            "avg_latency_ms": (self._latency_sum / self.sent * 1000.0) if self.sent else 0.0,
+            "max_latency_ms": self.max_latency * 1000.0,
+        }
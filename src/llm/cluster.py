@@ -0,0 +1,485 @@
+"""
+Multi-process mode: SO_REUSEPORT worker processes behind one coordinator.
+
+    SERVER_WORKERS=4 python3 -m src.llm.server
+
+Each worker is a full RobotServer (TCP sessions, UDP ingest, persistence,
+liveness) on its own event loop, started with `reuse_port=True` so the
+kernel spreads new TCP connections and UDP sources over the workers. The
+coordinator (the process you started) binds no robot ports. It owns:
+
+  - the fleet-wide session directory: a SessionRegistry of placeholder
+    sessions mirroring every worker's registry, plus peer -> worker
+  - the operator console: RobotServer's stdin router runs unchanged against
+    the directory; `list`, `sensors`, `latency` and `stats` query every
+    worker and merge the answers
+  - the workers themselves: spawned at start, restarted with exponential
+    backoff if one dies, and given up after WORKER_MAX_FAILURES crashes in a row
+
+IPC is newline-delimited JSON over a unix socket (SERVER_IPC_PATH):
+
+  worker -> coordinator
+    {"op": "hello", "worker": 0, "pid": 1234}
+    {"op": "sessions", "upsert": [{peer, bot_type, robot_id, framing, udp}], "remove": [peer, ...]}
+    {"op": "reply", "id": 7, "worker": 0, "result": ...}
+  coordinator -> worker
+    {"op": "send", "peer": [ip, port], "message": "forward 1.0"}   targeted command
+    {"op": "broadcast", "message": "stop", "bot_type": null}
+    {"op": "query", "id": 7, "what": "stats" | "clients" | "latency" | "sensors"}
+    {"op": "stop"}
+
+Workers push directory changes from a SessionRegistry listener, so the
+connection handlers are unchanged. Commands are parsed and encoded in the
+worker that holds the connection.
+
+Limits: the kernel hashes each TCP connection and each UDP source address
+independently, so a robot's sensor packets may land on a different worker
+than its TCP session. Sensors are then kept per UDP address in that worker
+(the `sensors` console view still covers all workers, and each worker shares
+its rows as "<SENSOR_SHM_NAME>.<worker>", see shared_sensors.attach_all()). A robot that
+reconnects resumes only if the new connection lands on the worker holding
+its parked session; otherwise it registers fresh and the old session
+expires after RESUME_GRACE_S. SO_REUSEPORT balancing needs Linux.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from typing import Optional
+
+from src.llm.client_session import ClientSession
+from src.llm.command_parser import get_parser
+from src.llm.command_tracker import LatencyHistogram
+from src.llm.server import (DEBUG_MODE, LOG_BURST, LOG_JSON, LOG_RATE, SENSOR_SHM_NAME, RobotServer,
+                            _print_client_rows, _print_latency_report, _print_sensor_report)
+from src.llm.session_registry import RegistrySnapshot, SessionRegistry
+from src.llm.server_logging import get_logger, setup_logging
+from src.llm.shared_sensors import worker_segment_name
+
+log = get_logger()
+console = get_logger("console")
+
+IPC_LINE_LIMIT = 16 * 1024 * 1024  # a `list` reply for a large fleet is one line
+QUERY_TIMEOUT = 3.0  # seconds to wait for every worker's reply
+WORKER_START_TIMEOUT = 15.0  # seconds start() waits for all workers to connect
+WORKER_RESTART_BACKOFF = 1.0  # seconds before the first restart, doubled per consecutive crash
+WORKER_RESTART_MAX_BACKOFF = 60.0
+WORKER_MAX_FAILURES = 5  # consecutive crashes before a worker slot is given up
+WORKER_STABLE_S = 30.0  # a worker that ran this long before exiting starts a fresh crash count
+
+
+def default_ipc_path(tcp_port: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"robot-server-{tcp_port}.sock")
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _merge_counters(values: list):
+    """Sum counters from several workers; `max*` and `time` keys take the maximum."""
+    merged: dict = {}
+    for value in values:
+        for key, v in value.items():
+            if merged.get(key) is None:
+                merged[key] = v
+            elif isinstance(v, dict):
+                merged[key] = _merge_counters([merged[key], v])
+            elif isinstance(v, (int, float)) and not isinstance(v, bool) and isinstance(merged[key], (int, float)):
+                merged[key] = max(merged[key], v) if key.startswith("max") or key == "time" else merged[key] + v
+    return merged
+
+
+def _directory_entry(session: ClientSession) -> dict:
+    return {"peer": list(session.peer), "bot_type": session.bot_type, "robot_id": session.robot_id,
+            "framing": session.framing, "udp": [list(a) for a in sorted(session.udp_addrs)]}
+
+
+# ---------- Worker side ----------
+
+class WorkerLink:
+    """A worker's connection to the coordinator: mirrors the local registry and runs its requests."""
+
+    def __init__(self, server: RobotServer, index: int, path: str):
+        self.server = server
+        self.index = index
+        self.path = path
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+        self._published: dict[tuple, dict] = {}  # peer -> directory entry last sent
+        self.closed = asyncio.Event()  # coordinator sent "stop" or went away
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_unix_connection(self.path, limit=IPC_LINE_LIMIT)
+        self._write({"op": "hello", "worker": self.index, "pid": os.getpid()})
+        self.server._clients.add_listener(self._on_snapshot)
+        self._task = asyncio.create_task(self._serve(reader))
+
+    def _write(self, message: dict):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(_encode(message))
+
+    def _on_snapshot(self, snapshot: RegistrySnapshot):
+        """Send the directory entries that changed with this registry swap."""
+        current = {peer: _directory_entry(session) for peer, session in snapshot.by_peer.items()}
+        upsert = [entry for peer, entry in current.items() if self._published.get(peer) != entry]
+        remove = [list(peer) for peer in self._published if peer not in current]
+        self._published = current
+        if upsert or remove:
+            self._write({"op": "sessions", "upsert": upsert, "remove": remove})
+
+    async def _serve(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    log.warning("⚠️ Worker %d lost the coordinator", self.index)
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning("⚠️ Worker %d: bad IPC message %r...", self.index, line[:50])
+                    continue
+                if message.get("op") == "stop":
+                    break
+                try:
+                    await self._handle(message)
+                except Exception as e:
+                    log.error("❌ Worker %d failed to handle %s: %s", self.index, message.get("op"), e)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.closed.set()
+
+    async def _handle(self, message: dict):
+        op = message.get("op")
+        if op == "send":
+            await self.server.parse_and_send_to(tuple(message["peer"]), message["message"])
+        elif op == "broadcast":
+            await self.server.parse_and_broadcast(message["message"], message.get("bot_type"))
+        elif op == "query":
+            what = message.get("what")
+            if what == "stats":
+                result = await self.server.stats()
+            elif what == "clients":
+                result = [dict(row, worker=self.index) for row in self.server.client_rows()]
+            elif what == "latency":
+                result = self.server.latency_report()
+            elif what == "sensors":
+                result = self.server.sensor_report()
+            else:
+                result = None
+            self._write({"op": "reply", "id": message.get("id"), "worker": self.index, "result": result})
+        else:
+            log.warning("⚠️ Worker %d: unknown IPC op %r", self.index, op)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def _worker_main(index: int, host: str, tcp_port: int, udp_port: int, ipc_path: str):
+    listener = setup_logging(DEBUG_MODE, LOG_JSON, LOG_RATE, LOG_BURST)
+    server = RobotServer(host, tcp_port, udp_port, reuse_port=True, console=False,
+                         sensor_shm_name=worker_segment_name(SENSOR_SHM_NAME, index))
+    link = WorkerLink(server, index, ipc_path)
+    try:
+        await link.connect()
+        await server.start()
+        log.info("👷 Worker %d (pid %d) serving", index, os.getpid())
+        await link.closed.wait()
+    finally:
+        try:
+            await server.stop()
+            await link.close()
+        finally:
+            listener.stop()
+
+
+def run_worker(index: int, host: str, tcp_port: int, udp_port: int, ipc_path: str):
+    """Worker process entry point (multiprocessing spawn target)."""
+    try:
+        asyncio.run(_worker_main(index, host, tcp_port, udp_port, ipc_path))
+    except KeyboardInterrupt:
+        pass  # Ctrl-C reaches the whole process group; the coordinator shuts down on its own
+
+
+# ---------- Coordinator side ----------
+
+class ClusterCoordinator(RobotServer):
+    """
+    Fleet-wide session directory and operator console for SO_REUSEPORT workers.
+
+    Reuses RobotServer's stdin router unchanged: connected_peers() and
+    `_clients` come from the directory, parse_and_send_to() is routed to the
+    worker holding the connection, parse_and_broadcast() goes to every
+    worker, and stats()/list/sensors/latency merge the workers' answers.
+    """
+
+    def __init__(self, host: str, tcp_port: int, udp_port: int, workers: int, ipc_path: Optional[str] = None):
+        # Deliberately not RobotServer.__init__: no sockets, sensors or persistence live here
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not available on this platform; run with SERVER_WORKERS=1")
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.workers = workers
+        self.ipc_path = ipc_path or default_ipc_path(tcp_port)
+        self._clients = SessionRegistry()  # directory: placeholder sessions (no writer) for every worker's robots
+        self._owner: dict[tuple, int] = {}  # peer -> worker index
+        self._links: dict[int, asyncio.StreamWriter] = {}
+        self._processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._started: dict[int, float] = {}  # worker index -> monotonic spawn time
+        self._failures: dict[int, int] = {}  # worker index -> consecutive crashes
+        self._restart_at: dict[int, float] = {}  # worker index -> monotonic time of its pending restart
+        self._pending: dict[int, asyncio.Future] = {}  # query id -> reply
+        self._next_query = 0
+        self._ipc_server: asyncio.AbstractServer | None = None
+        self._supervisor: asyncio.Task | None = None
+        self._stdin_task: asyncio.Task | None = None
+        self._stopping = False
+        self._stopped = asyncio.Event()
+        self._all_connected = asyncio.Event()
+
+    async def start(self):
+        if os.path.exists(self.ipc_path):
+            os.unlink(self.ipc_path)  # left over from a crashed run
+        self._ipc_server = await asyncio.start_unix_server(self._handle_worker, self.ipc_path, limit=IPC_LINE_LIMIT)
+        for index in range(self.workers):
+            self._spawn(index)
+        try:
+            await asyncio.wait_for(self._all_connected.wait(), WORKER_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ Only %d of %d workers connected", len(self._links), self.workers)
+        self._supervisor = asyncio.create_task(self._supervise())
+        log.info("🧩 Coordinator on %s: %d workers share TCP %s:%s and UDP %s:%s",
+                 self.ipc_path, self.workers, self.host, self.tcp_port, self.host, self.udp_port)
+
+        self._stdin_task = asyncio.create_task(self._stdin_router())
+        log.info("🧭 Command router ready (type 'help' for options).")
+
+    async def serve_forever(self):
+        await self._stopped.wait()
+
+    def _spawn(self, index: int):
+        ctx = multiprocessing.get_context("spawn")  # a fresh interpreter; nothing asyncio-related is inherited
+        process = ctx.Process(target=run_worker, name=f"robot-worker-{index}", daemon=True,
+                              args=(index, self.host, self.tcp_port, self.udp_port, self.ipc_path))
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
+
+    async def _supervise(self):
+        """
+        Restart workers that exit; their robots reconnect to the remaining ones meanwhile.
+        Consecutive crashes back off exponentially, and a worker that keeps crashing
+        (a bad config, a port it cannot bind) is given up instead of respawned forever.
+        """
+        while not self._stopping:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for index, process in list(self._processes.items()):
+                if self._stopping or process.is_alive():
+                    continue
+                due = self._restart_at.get(index)
+                if due is not None:
+                    if now >= due:
+                        del self._restart_at[index]
+                        self._spawn(index)
+                    continue
+                self._drop_worker(index)
+                stable = now - self._started.get(index, now) >= WORKER_STABLE_S
+                failures = self._failures[index] = 1 if stable else self._failures.get(index, 0) + 1
+                if failures >= WORKER_MAX_FAILURES:
+                    del self._processes[index]
+                    log.critical("🛑 Worker %d exited with code %s after %d consecutive crashes; giving up on it "
+                                 "(%d of %d workers left)", index, process.exitcode, failures,
+                                 len(self._processes), self.workers)
+                    continue
+                delay = min(WORKER_RESTART_BACKOFF * 2 ** (failures - 1), WORKER_RESTART_MAX_BACKOFF)
+                self._restart_at[index] = now + delay
+                log.error("💥 Worker %d exited with code %s, restarting in %.0fs (crash %d of %d)",
+                          index, process.exitcode, delay, failures, WORKER_MAX_FAILURES)
+            if not self._processes and not self._stopping:
+                log.critical("🛑 Every worker was given up; stopping the coordinator")
+                self._supervisor = None  # stop() must not cancel this task
+                await self.stop()
+                return
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        index = None
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            index = hello.get("worker")
+            if hello.get("op") != "hello" or index is None:
+                log.warning("⚠️ Unexpected IPC client: %r", hello)
+                return
+            self._links[index] = writer
+            log.info("🔗 Worker %d connected (pid %s)", index, hello.get("pid"))
+            if len(self._links) >= self.workers:
+                self._all_connected.set()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self._on_worker_message(index, json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                    log.warning("⚠️ Bad IPC message from worker %d: %s", index, e)
+        except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError):
+            pass
+        finally:
+            if index is not None and self._links.get(index) is writer:
+                del self._links[index]
+                self._drop_worker(index)
+                if not self._stopping:
+                    log.warning("⚠️ Worker %d disconnected", index)
+            writer.close()
+
+    def _on_worker_message(self, index: int, message: dict):
+        op = message.get("op")
+        if op == "sessions":
+            for peer in message["remove"]:
+                self._remove_entry(tuple(peer))
+            for entry in message["upsert"]:
+                self._upsert_entry(index, entry)
+        elif op == "reply":
+            future = self._pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message.get("result"))
+        else:
+            log.warning("⚠️ Unknown IPC op %r from worker %d", op, index)
+
+    def _upsert_entry(self, index: int, entry: dict):
+        peer = tuple(entry["peer"])
+        session = self._clients.get(peer)
+        if session is None:
+            session = ClientSession(peer, None, get_parser(entry["bot_type"]), entry["bot_type"])
+        elif session.bot_type != entry["bot_type"]:
+            session.parser = get_parser(entry["bot_type"])
+        session.bot_type = entry["bot_type"]
+        session.robot_id = entry["robot_id"]
+        session.framing = entry["framing"]
+        session.udp_addrs = {tuple(a) for a in entry["udp"]}
+        self._owner[peer] = index
+        if self._clients.get(peer) is session:
+            self._clients.update(session)
+        else:
+            self._clients.add(session)
+
+    def _remove_entry(self, peer: tuple):
+        session = self._clients.get(peer)
+        if session is not None:
+            self._clients.remove(session)
+        self._owner.pop(peer, None)
+
+    def _drop_worker(self, index: int):
+        """Forget a dead worker's robots (they reconnect and land on a live worker)."""
+        for peer in [p for p, owner in self._owner.items() if owner == index]:
+            self._remove_entry(peer)
+
+    def _send(self, index: int, message: dict) -> bool:
+        writer = self._links.get(index)
+        if writer is None or writer.is_closing():
+            return False
+        writer.write(_encode(message))
+        return True
+
+    async def _query(self, what: str) -> list:
+        """Ask every connected worker; replies that miss QUERY_TIMEOUT are left out."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for index in list(self._links):
+            self._next_query += 1
+            future = self._pending[self._next_query] = loop.create_future()
+            if self._send(index, {"op": "query", "id": self._next_query, "what": what}):
+                futures.append(future)
+            else:
+                del self._pending[self._next_query]
+        if not futures:
+            return []
+        done, pending = await asyncio.wait(futures, timeout=QUERY_TIMEOUT)
+        for future in pending:
+            future.cancel()
+        if pending:
+            log.warning("⚠️ %d worker(s) did not answer '%s'", len(pending), what)
+        return [f.result() for f in futures if f in done and f.result() is not None]
+
+    # ---------- RobotServer interface used by the console ----------
+
+    async def parse_and_broadcast(self, raw_message: str, bot_type: Optional[str] = None):
+        for index in list(self._links):
+            self._send(index, {"op": "broadcast", "message": raw_message, "bot_type": bot_type})
+
+    async def parse_and_send_to(self, peername: tuple, raw_message: str):
+        index = self._owner.get(tuple(peername))
+        if index is None or not self._send(index, {"op": "send", "peer": list(peername), "message": raw_message}):
+            log.error("❌ Unknown peer")
+
+    async def stats(self) -> dict:
+        merged = _merge_counters(await self._query("stats"))
+        merged["time"] = time.time()
+        merged["workers"] = len(self._links)
+        return merged
+
+    async def _print_client_list(self):
+        rows = {tuple(row["peer"]): row for rows in await self._query("clients") for row in rows}
+        _print_client_rows([(i, rows[p]) for i, p in enumerate(self._clients.snapshot.by_peer) if p in rows])
+
+    async def _print_latency(self):
+        reports = await self._query("latency")
+        if not reports:
+            console.info("No workers answered.")
+            return
+        merged: dict[str, dict[str, LatencyHistogram]] = {"by_robot": {}, "by_command": {}}
+        for report in reports:
+            for kind, hists in merged.items():
+                for name, state in report[kind].items():
+                    hists.setdefault(name, LatencyHistogram()).merge(state)
+        counters = _merge_counters([report["counters"] for report in reports])
+        _print_latency_report(counters, merged["by_robot"], merged["by_command"])
+
+    async def _print_sensor_data(self):
+        reports = await self._query("sensors")
+        if not reports:
+            console.info("No workers answered.")
+            return
+        merged = _merge_counters([{k: v for k, v in r.items() if k != "latest"} for r in reports])
+        merged["latest"] = [entry for r in reports for entry in r["latest"]]
+        _print_sensor_report(merged)
+
+    async def stop(self):
+        if self._stopping:
+            await self._stopped.wait()
+            return
+        self._stopping = True
+        for task in (self._stdin_task, self._supervisor):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        # Workers stop their servers (and flush received_data) on "stop"
+        for index in list(self._links):
+            self._send(index, {"op": "stop"})
+        loop = asyncio.get_running_loop()
+        for index, process in self._processes.items():
+            await loop.run_in_executor(None, process.join, 10.0)
+            if process.is_alive():
+                log.warning("⚠️ Worker %d did not stop, terminating", index)
+                process.terminate()
+        if self._ipc_server is not None:
+            self._ipc_server.close()
+            self._ipc_server = None
+        if os.path.exists(self.ipc_path):
+            os.unlink(self.ipc_path)
+        self._clients.clear()
+        self._owner.clear()
+        log.info("🧩 Coordinator stopped")
+        self._stopped.set()
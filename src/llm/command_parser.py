@@ -1,12 +1,84 @@
 from abc import ABC, abstractmethod
 import json
+from typing import Callable, NamedTuple, Optional
+
+from src.llm.tcp_framing import command_frame, json_frame
+
+
+def _json_float(value: float) -> str:
+    """Format a float exactly like json.dumps does."""
+    if value - value == 0.0:  # finite (inf - inf and nan - nan are nan)
+        return float.__repr__(value)
+    if value != value:
+        return "NaN"
+    return "Infinity" if value > 0 else "-Infinity"
+
+
+class CommandTemplate(NamedTuple):
+    """
+    Precompiled ESP32 JSON message for one command. The message is split
+    around the id and floatData values, so rendering is one int format, one
+    float format and a concatenation instead of building a dict and calling
+    json.dumps.
+    """
+    token: str
+    convert: Optional[Callable[[float], float]]  # None: the command takes no argument
+    head: str                                    # text before the id
+    prefix: str                                  # text between the id and the float value
+    suffix: str
+    head_bytes: bytes
+    prefix_bytes: bytes
+    suffix_bytes: bytes  # includes the trailing newline
+
+    def render(self, value: float = 0.0, command_id: int = 1) -> str:
+        if self.convert is None:
+            return self.head + str(command_id) + self.prefix
+        return self.head + str(command_id) + self.prefix + _json_float(self.convert(value)) + self.suffix
+
+    def render_bytes(self, value: float = 0.0, command_id: int = 1) -> bytes:
+        if self.convert is None:
+            return self.head_bytes + b"%d" % command_id + self.prefix_bytes
+        return (self.head_bytes + b"%d" % command_id + self.prefix_bytes
+                + _json_float(self.convert(value)).encode("ascii") + self.suffix_bytes)
+
+    def render_frame(self, value: float = 0.0, command_id: int = 1) -> bytes:
+        """Binary COMMAND frame (see tcp_framing.py); JSON frame if the token has no opcode."""
+        frame = command_frame(self.token, command_id, () if self.convert is None else (self.convert(value),))
+        return frame if frame is not None else json_frame(self.render(value, command_id))
+
+
+def command_template(token: str, convert: Optional[Callable[[float], float]] = None) -> CommandTemplate:
+    id_marker, value_marker = "\x01", "\x00"
+    msg = {
+        "id": id_marker,
+        "command": token,
+        "status": "DISPATCHED",
+        "intData": [],
+        "floatData": [value_marker] if convert is not None else [],
+        "result": 0.0,
+        "text": ""
+    }
+    head, rest = json.dumps(msg).split(json.dumps(id_marker))
+    if convert is None:
+        return CommandTemplate(token, None, head, rest, "", head.encode("utf-8"),
+                               (rest + "\n").encode("utf-8"), b"")
+    prefix, suffix = rest.split(json.dumps(value_marker))
+    return CommandTemplate(token, convert, head, prefix, suffix, head.encode("utf-8"),
+                           prefix.encode("utf-8"), (suffix + "\n").encode("utf-8"))
+
+
+def compile_aliases(docs: dict, templates: dict[str, CommandTemplate]) -> dict[str, CommandTemplate]:
+    """alias -> template dispatch table, built once from a parser's command docs."""
+    return {alias: templates[name] for name, meta in docs.items() for alias in meta["aliases"]}
+
 
 class RobotCommandParser(ABC):
     @staticmethod
     @abstractmethod
-    def parse_command(command_str: str) -> str:
+    def parse_command(command_str: str, command_id: int = 1) -> str:
         """
-        Parses a string and returns the associated command in a structured format.
+        Parses a string and returns the associated command in a structured format,
+        tagged with `command_id` so the robot's ack can be matched to it.
 
         Throws an exception for invalid or misstructured commands based on specific parsing rules
         """
@@ -18,53 +90,92 @@ class RobotCommandParser(ABC):
         """Lists all available commands with descriptions, including aliases, usage, and examples"""
         pass
 
+    @classmethod
+    def encode_command(cls, command_str: str, command_id: int = 1) -> bytes:
+        """
+        Parses a string and returns the newline-terminated wire bytes.
+        Compiled parsers override this to render straight from byte templates.
+        """
+        payload = cls.parse_command(command_str, command_id)
+        if isinstance(payload, bytes):
+            return payload
+        return (payload if payload.endswith("\n") else payload + "\n").encode("utf-8", errors="replace")
+
+    @classmethod
+    def encode_frame(cls, command_str: str, command_id: int = 1) -> bytes:
+        """Parses a string and returns a length-prefixed frame for binary-framing sessions."""
+        payload = cls.parse_command(command_str, command_id)
+        try:
+            msg = json.loads(payload)
+            frame = command_frame(msg["command"], command_id, msg.get("floatData", []))
+        except (ValueError, TypeError, KeyError):
+            frame = None
+        return frame if frame is not None else json_frame(payload)
+
+    @classmethod
+    def command_name(cls, command_str: str) -> str:
+        """Command name used for ack matching and latency stats (validated like parse_command)."""
+        parts = command_str.split() if command_str else []
+        if not parts:
+            raise ValueError("Empty command string")
+        return parts[0].lower()
+
+
+_PARSERS: dict[str, type[RobotCommandParser]] = {}
+
+def register_parser(robot_type: str):
+    """Class decorator that makes a parser available through get_parser(robot_type)."""
+    def decorator(cls: type[RobotCommandParser]) -> type[RobotCommandParser]:
+        _PARSERS[robot_type] = cls
+        return cls
+    return decorator
+
+@register_parser("R1D4")
 class R1D4CommandParser(RobotCommandParser):
     commands_docs = {
         "Move": {"aliases":["move", "m"], "description": "Move robot by specified meters", "usage": "move <meters:float>", "example": "move 1.0"},
         "Turn": {"aliases":["turn", "t"], "description": "Turn robot by specified degrees", "usage": "turn <degrees:float>", "example": "turn 90.0"}
     }
-    
+    _dispatch = compile_aliases(commands_docs, {
+        # Convert meters to milliseconds (assuming 0.5 m/s speed)
+        "Move": command_template("move", lambda meters: meters * 2000.0),
+        "Turn": command_template("turn", lambda degrees: degrees),
+    })
+
     @staticmethod
-    def parse_command(command_str: str) -> str:
-        if not command_str or not command_str.strip():
+    def _match(command_str: str) -> tuple[CommandTemplate, float]:
+        parts = command_str.split() if command_str else []
+        if not parts:
             raise ValueError("Empty command string")
-        parts = command_str.strip().split()
         if len(parts) != 2:
             raise ValueError("Invalid input: requires exactly 2 arguments")
-
-        verb = parts[0].lower()
         try:
             value = float(parts[1])
         except ValueError:
             raise ValueError("Invalid input: numeric value required")
+        template = R1D4CommandParser._dispatch.get(parts[0].lower())
+        if template is None:
+            raise ValueError("Invalid input: unknown command")
+        return template, value
+
+    @staticmethod
+    def parse_command(command_str: str, command_id: int = 1) -> str:
+        template, value = R1D4CommandParser._match(command_str)
+        return template.render(value, command_id)
+
+    @staticmethod
+    def encode_command(command_str: str, command_id: int = 1) -> bytes:
+        template, value = R1D4CommandParser._match(command_str)
+        return template.render_bytes(value, command_id)
 
-        if verb in R1D4CommandParser.commands_docs["Move"]["aliases"]:
-            # Convert meters to milliseconds (assuming 0.5 m/s speed)
-            duration_ms = value * 2000.0
-            msg = {
-                "id": 1,
-                "command": "move",
-                "status": "DISPATCHED",
-                "intData": [],
-                "floatData": [duration_ms],
-                "result": 0.0,
-                "text": ""
-            }
-            return json.dumps(msg)
-            
-        if verb in R1D4CommandParser.commands_docs["Turn"]["aliases"]:
-            msg = {
-                "id": 1,
-                "command": "turn",
-                "status": "DISPATCHED",
-                "intData": [],
-                "floatData": [value],
-                "result": 0.0,
-                "text": ""
-            }
-            return json.dumps(msg)
-
-        raise ValueError("Invalid input: unknown command")
+    @staticmethod
+    def encode_frame(command_str: str, command_id: int = 1) -> bytes:
+        template, value = R1D4CommandParser._match(command_str)
+        return template.render_frame(value, command_id)
+
+    @staticmethod
+    def command_name(command_str: str) -> str:
+        return R1D4CommandParser._match(command_str)[0].token
     
     @staticmethod
     def list_available_commands():
@@ -74,6 +185,7 @@ class R1D4CommandParser(RobotCommandParser):
         pass
 
 
+@register_parser("HOVERBOT")
 class HOVERBOTCommandParser(RobotCommandParser):
     command_docs = {
         "Forward": {"aliases":["forward", "f"], "description": "Move robot forward by specified meters", "usage": "forward <meters:float>", "example": "forward 1.0"},
@@ -82,73 +194,54 @@ class HOVERBOTCommandParser(RobotCommandParser):
         "Turn Right": {"aliases":["turnright", "tr", "right"], "description": "Turn robot right by specified degrees", "usage": "turnright <degrees:float>", "example": "turnright 90"},
         "Ping": {"aliases":["ping", "p"], "description": "Ping the ultrasonic sensor", "usage": "ping", "example": "ping"},
     }
-    
+    # Translate to ESP32 JSON protocol ("Turn Left" -> "TURNLEFT")
+    # Forward/Backward: convert meters to milliseconds (1m = 2000ms), adjust based on robot speed
+    # Turn: convert degrees to milliseconds (90deg = 500ms), adjust based on turn rate
+    _dispatch = compile_aliases(command_docs, {
+        "Forward": command_template("FORWARD", lambda meters: meters * 2000.0),
+        "Backward": command_template("BACKWARD", lambda meters: meters * 2000.0),
+        "Turn Left": command_template("TURNLEFT", lambda degrees: abs(degrees) / 90.0 * 500.0),
+        "Turn Right": command_template("TURNRIGHT", lambda degrees: abs(degrees) / 90.0 * 500.0),
+        "Ping": command_template("PING"),
+    })
+
     @staticmethod
-    def parse_command(command_str: str) -> str:
-        if not command_str or not command_str.strip():
+    def _match(command_str: str) -> tuple[CommandTemplate, float]:
+        parts = command_str.lower().split() if command_str else []
+        if not parts:
             raise ValueError("Empty command string")
-        
-        raw = command_str.strip().lower()
-        parts = raw.split()
-        
-        # Build alias lookup
-        alias_map = {}
-        for canonical, meta in HOVERBOTCommandParser.command_docs.items():
-            for a in meta["aliases"]:
-                alias_map[a] = canonical
-        
-        matched_command = None
-        value = None
-        
-        # Check for ping (no arguments)
-        if parts[0] == "ping" or parts[0] == "p":
+        template = HOVERBOTCommandParser._dispatch.get(parts[0])
+        if template is None:
+            raise ValueError("Invalid input: unknown command")
+        if template.convert is None:
             if len(parts) != 1:
                 raise ValueError("Invalid input: ping takes no arguments")
-            matched_command = "Ping"
-        elif parts[0] in alias_map:
-            if len(parts) != 2:
-                raise ValueError("Invalid input: movement requires exactly one numeric argument")
-            try:
-                value = float(parts[1])
-            except ValueError:
-                raise ValueError("Invalid input: movement amount must be numerical")
-            matched_command = alias_map[parts[0]]
-        else:
-            raise ValueError("Invalid input: unknown command")
-        
-        # Translate to ESP32 JSON protocol
-        command_token = matched_command.upper().replace(" ", "")  # "Turn Left" -> "TURNLEFT"
-        
-        if command_token == "PING":
-            msg = {
-                "id": 1,
-                "command": command_token,
-                "status": "DISPATCHED",
-                "intData": [],
-                "floatData": [],
-                "result": 0.0,
-                "text": ""
-            }
-        else:
-            # Movement commands
-            # Forward/Backward: convert meters to milliseconds (1m = 2000ms)
-            # Turn: convert degrees to milliseconds (90deg = 500ms)
-            if command_token in ["FORWARD", "BACKWARD"]:
-                duration_ms = value * 2000.0  # Adjust based on robot speed
-            else:  # TURNLEFT, TURNRIGHT
-                duration_ms = abs(value) / 90.0 * 500.0  # Adjust based on turn rate
-            
-            msg = {
-                "id": 1,
-                "command": command_token,
-                "status": "DISPATCHED",
-                "intData": [],
-                "floatData": [duration_ms],
-                "result": 0.0,
-                "text": ""
-            }
-        
-        return json.dumps(msg)
+            return template, 0.0
+        if len(parts) != 2:
+            raise ValueError("Invalid input: movement requires exactly one numeric argument")
+        try:
+            return template, float(parts[1])
+        except ValueError:
+            raise ValueError("Invalid input: movement amount must be numerical")
+
+    @staticmethod
+    def parse_command(command_str: str, command_id: int = 1) -> str:
+        template, value = HOVERBOTCommandParser._match(command_str)
+        return template.render(value, command_id)
+
+    @staticmethod
+    def encode_command(command_str: str, command_id: int = 1) -> bytes:
+        template, value = HOVERBOTCommandParser._match(command_str)
+        return template.render_bytes(value, command_id)
+
+    @staticmethod
+    def encode_frame(command_str: str, command_id: int = 1) -> bytes:
+        template, value = HOVERBOTCommandParser._match(command_str)
+        return template.render_frame(value, command_id)
+
+    @staticmethod
+    def command_name(command_str: str) -> str:
+        return HOVERBOTCommandParser._match(command_str)[0].token
     
     @staticmethod
     def list_available_commands():
@@ -157,9 +250,7 @@ class HOVERBOTCommandParser(RobotCommandParser):
             print(f"- {command}: {doc['description']}. Usage: {doc['usage']}")
 
 def get_parser(robot_type: str) -> RobotCommandParser:
-    if robot_type == "R1D4":
-        return R1D4CommandParser
-    if robot_type == "HOVERBOT":
-        return HOVERBOTCommandParser
-    else:
-        raise ValueError(f"Unknown robot type: {robot_type}")
+    try:
+        return _PARSERS[robot_type]
+    except KeyError:
+        raise ValueError(f"Unknown robot type: {robot_type}") from None
@@ -0,0 +1,225 @@
+"""
+Command ids, in-flight tracking and round-trip latency histograms.
+
+Every dispatched command gets an id from one server-wide counter, so ids
+increase monotonically within each session. A broadcast shares one id, which
+lets the parser encode it once per bot type. Commands stay in the per-robot
+in-flight table until an ack arrives or they time out:
+
+  - ESP32 firmware echoes the id: {"id": 7, "command": "FORWARD", "status": "SUCCESS", ...}
+  - older clients only echo the command name: {"status": "completed", "command": "move"};
+    these are matched to the oldest in-flight command with that name (FIFO).
+    An ack that carries an id is matched by id only, so a stale or unknown id
+    never completes some other command of the same name
+
+Dispatch-to-ack latency goes into log-bucketed histograms per robot and per
+command type. p50/p95/p99 are accurate to one bucket (about 5%). A robot's
+histogram lives as long as its session; the per-command ones are kept.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+MAX_COMMAND_ID = 2**31 - 1  # firmware parses ids as a C int
+
+FAILURE_STATUSES = {"failure", "failed", "error"}
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from `min_s` to `max_s` seconds (values outside are clamped)."""
+
+    def __init__(self, min_s: float = 1e-4, max_s: float = 3600.0, growth: float = 1.1):
+        self.min_s = min_s
+        self._log_growth = math.log(growth)
+        self.growth = growth
+        self._buckets = [0] * (int(math.log(max_s / min_s) / self._log_growth) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds <= self.min_s:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / self.min_s) / self._log_growth) + 1, len(self._buckets) - 1)
+        self._buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate q-th percentile (0-100) in seconds, or None if empty."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index, n in enumerate(self._buckets):
+            seen += n
+            if seen >= rank:
+                if index == 0:
+                    return self.min_s
+                # Geometric middle of the bucket, never above the observed max
+                low = self.min_s * self.growth ** (index - 1)
+                return min(low * math.sqrt(self.growth), self.max)
+        return self.max
+
+    def state(self) -> dict:
+        """JSON-serialisable counts; merge() adds them into a histogram with the same buckets."""
+        return {"buckets": [[i, n] for i, n in enumerate(self._buckets) if n],
+                "count": self.count, "total": self.total, "max": self.max}
+
+    def merge(self, state: dict):
+        """Add another histogram's state() (e.g. from a worker process) into this one."""
+        for index, n in state["buckets"]:
+            self._buckets[index] += n
+        self.count += state["count"]
+        self.total += state["total"]
+        self.max = max(self.max, state["max"])
+
+    def summary(self) -> dict:
+        """Counts and p50/p95/p99/max in milliseconds."""
+        def ms(v):
+            return None if v is None else v * 1000.0
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": self.max * 1000.0 if self.count else None,
+            "avg_ms": self.total / self.count * 1000.0 if self.count else None,
+        }
+
+
+class InFlightCommand(NamedTuple):
+    command_id: int
+    command: str          # canonical command name, e.g. "move" or "FORWARD"
+    sent_at: float        # time.monotonic() at dispatch
+    data: bytes = b""     # encoded message, replayed if the robot resumes its session
+
+
+class CommandTracker:
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._next_id = 0
+        self._in_flight: dict[object, OrderedDict[int, InFlightCommand]] = {}  # robot -> id -> command
+        self.by_robot: dict[object, LatencyHistogram] = {}
+        self.by_command: dict[str, LatencyHistogram] = {}
+        self._task: asyncio.Task | None = None
+        self.dispatched_count = 0
+        self.acked = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.unmatched_acks = 0
+
+    def next_id(self) -> int:
+        self._next_id = self._next_id % MAX_COMMAND_ID + 1
+        return self._next_id
+
+    def dispatched(self, robot, command_id: int, command: str, now: float | None = None, data: bytes = b""):
+        table = self._in_flight.get(robot)
+        if table is None:
+            table = self._in_flight[robot] = OrderedDict()
+        table[command_id] = InFlightCommand(command_id, command, time.monotonic() if now is None else now, data)
+        self.dispatched_count += 1
+
+    def acked_by(self, robot, ack: dict, now: float | None = None) -> Optional[tuple[InFlightCommand, float]]:
+        """Match an ack to an in-flight command; returns (command, latency seconds) or None."""
+        table = self._in_flight.get(robot)
+        entry = None
+        if table:
+            command_id = ack.get("id")
+            if command_id is not None:
+                if isinstance(command_id, int):
+                    entry = table.pop(command_id, None)
+            else:
+                name = str(ack.get("command", "")).lower()
+                for queued in table.values():
+                    if queued.command.lower() == name:
+                        entry = table.pop(queued.command_id)
+                        break
+        if entry is None:
+            self.unmatched_acks += 1
+            return None
+
+        latency = (time.monotonic() if now is None else now) - entry.sent_at
+        if str(ack.get("status", "")).lower() in FAILURE_STATUSES:
+            self.failed += 1
+        self.acked += 1
+        hist = self.by_robot.get(robot)
+        if hist is None:
+            hist = self.by_robot[robot] = LatencyHistogram()
+        hist.record(latency)
+        hist = self.by_command.get(entry.command)
+        if hist is None:
+            hist = self.by_command[entry.command] = LatencyHistogram()
+        hist.record(latency)
+        return entry, latency
+
+    def in_flight(self, robot) -> list[InFlightCommand]:
+        """Unacknowledged commands for a robot, oldest first."""
+        return list(self._in_flight.get(robot, {}).values())
+
+    def expire(self, now: float | None = None) -> list[tuple[object, InFlightCommand]]:
+        """Drop commands older than the timeout; returns (robot, command) for each one."""
+        deadline = (time.monotonic() if now is None else now) - self.timeout
+        expired = []
+        for robot, table in self._in_flight.items():
+            while table:
+                oldest = next(iter(table.values()))
+                if oldest.sent_at > deadline:
+                    break
+                table.popitem(last=False)
+                expired.append((robot, oldest))
+        self.timed_out += len(expired)
+        return expired
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(max(self.timeout / 4, 0.1))
+            for robot, cmd in self.expire():
+                log.warning("⏱️ Command %s (%s) to %s timed out after %.0fs", cmd.command_id, cmd.command, robot, self.timeout)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def rekey(self, old, new):
+        """A robot resumed on a new connection: move its in-flight table and latency history."""
+        table = self._in_flight.pop(old, None)
+        if table is not None:
+            self._in_flight[new] = table
+        hist = self.by_robot.pop(old, None)
+        if hist is not None:
+            self.by_robot[new] = hist
+
+    def forget(self, robot) -> list[InFlightCommand]:
+        """Drop a robot's in-flight table and latency histogram (its session is gone)."""
+        self.by_robot.pop(robot, None)
+        return list(self._in_flight.pop(robot, {}).values())
+
+    def stats(self) -> dict:
+        return {
+            "dispatched": self.dispatched_count,
+            "acked": self.acked,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "unmatched_acks": self.unmatched_acks,
+            "in_flight": sum(len(t) for t in self._in_flight.values()),
+        }
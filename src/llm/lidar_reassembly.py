@@ -0,0 +1,250 @@
+"""
+LIDAR scan reassembly from fragmented UDP batches.
+
+A full sweep arrives as several lidar packets. Fragments are collected per
+(robot, scan id) and, once all of them are in (or the scan times out), joined
+into one angle-sorted numpy array pair and published to consumers.
+
+Fragment identification, in order of preference:
+  - binary packets: header `seq` + lidar `fragment`/`fragments`
+  - JSON packets:   "scan_id", "fragment", "fragments" fields
+  - legacy JSON "scans" batches without ids: a new revolution starts when the
+    first angle of a batch wraps below the last angle of the previous batch
+Single-packet JSON scans ("distances" without fragment info) complete immediately.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.llm.sensor_packet import lidar_points
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+WRAP_THRESHOLD_DEG = 180.0  # angle drop that marks a new revolution in legacy batches
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@dataclass
+class LidarScan:
+    robot: object
+    scan_id: Optional[int]
+    timestamp: float          # receive time of the first fragment
+    angles: np.ndarray        # float32, ascending
+    distances: np.ndarray     # float32, aligned with angles
+    complete: bool
+    fragments_received: int
+    fragments_expected: Optional[int]
+
+
+@dataclass
+class _PendingScan:
+    scan_id: Optional[int]
+    expected: Optional[int]
+    first_seen: float
+    last_seen: float
+    fragments: dict  # fragment index -> (angles, distances)
+    last_angle: float = -np.inf
+
+
+class LidarScanAssembler:
+    """
+    Reassembles lidar fragments into full scans.
+      - timeout:      seconds without a new fragment before a scan is flushed
+      - min_coverage: fraction of expected fragments required to publish a timed-out scan
+    Complete scans go to registered listeners (sync callbacks) and subscriber queues.
+    """
+
+    def __init__(self, timeout: float = 0.5, min_coverage: float = 0.5, recent_ids: int = 8):
+        self.timeout = timeout
+        self.min_coverage = min_coverage
+        self._recent_ids = recent_ids
+        self._pending: dict[tuple, _PendingScan] = {}   # (robot, scan_id) -> pending
+        self._legacy: dict[object, _PendingScan] = {}   # robot -> open legacy scan
+        self._published: dict[object, list[int]] = {}   # robot -> recently published scan ids
+        self._latest: dict[object, LidarScan] = {}
+        self._listeners: list[Callable[[LidarScan], None]] = []
+        self._queues: list[asyncio.Queue] = []
+        self._task: asyncio.Task | None = None
+        self.completed = 0
+        self.partial = 0
+        self.expired = 0
+        self.late_fragments = 0
+        self.invalid = 0
+
+    # ---------- Consumers ----------
+
+    def add_listener(self, callback: Callable[[LidarScan], None]):
+        self._listeners.append(callback)
+
+    def subscribe(self, maxsize: int = 16) -> asyncio.Queue:
+        """Queue of published LidarScan objects; the oldest scan is dropped when full."""
+        q: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._queues.append(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        if q in self._queues:
+            self._queues.remove(q)
+
+    def latest_scan(self, robot) -> Optional[LidarScan]:
+        return self._latest.get(robot)
+
+    def _publish(self, scan: LidarScan):
+        self._latest[scan.robot] = scan
+        if scan.complete:
+            self.completed += 1
+        else:
+            self.partial += 1
+        if scan.scan_id is not None:
+            ids = self._published.setdefault(scan.robot, [])
+            ids.append(scan.scan_id)
+            del ids[:-self._recent_ids]
+        for cb in self._listeners:
+            try:
+                cb(scan)
+            except Exception as e:
+                log.error("❌ Lidar scan listener failed: %s", e)
+        for q in self._queues:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(scan)
+
+    # ---------- Ingest ----------
+
+    def add(self, robot, packet: dict, recv_time: float | None = None) -> list[LidarScan]:
+        """Add one lidar packet; returns the scans published as a result."""
+        now = time.time() if recv_time is None else recv_time
+        arrays = lidar_points(packet)
+        if arrays is None:
+            return []
+
+        if "fragments" in packet or "scan_id" in packet:
+            scan_id = packet["scan_id"] if "scan_id" in packet else packet.get("seq")
+            index, expected = packet.get("fragment", 0), packet.get("fragments", 1)
+            if not (_is_int(index) and _is_int(expected) and 0 <= index < expected
+                    and (scan_id is None or _is_int(scan_id) or isinstance(scan_id, str))):
+                self.invalid += 1  # untyped JSON: drop this packet only
+                return []
+            return self._add_fragment(robot, scan_id, index, expected, arrays, now)
+        if "distances" in packet:
+            # Whole sweep in one packet
+            scan = self._assemble(robot, None, now, {0: arrays}, 1, complete=True)
+            self._publish(scan)
+            return [scan]
+        return self._add_legacy(robot, arrays, now)
+
+    def _add_fragment(self, robot, scan_id, index: int, expected: int, arrays, now: float) -> list[LidarScan]:
+        if scan_id in self._published.get(robot, ()):
+            self.late_fragments += 1
+            return []
+        key = (robot, scan_id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingScan(scan_id, expected, now, now, {})
+        pending.fragments[index] = arrays
+        pending.last_seen = now
+        if len(pending.fragments) >= pending.expected:
+            del self._pending[key]
+            scan = self._assemble(robot, scan_id, pending.first_seen, pending.fragments, expected, complete=True)
+            self._publish(scan)
+            return [scan]
+        return []
+
+    def _add_legacy(self, robot, arrays, now: float) -> list[LidarScan]:
+        angles, _ = arrays
+        published = []
+        pending = self._legacy.get(robot)
+        if pending is not None and len(angles) and angles[0] < pending.last_angle - WRAP_THRESHOLD_DEG:
+            # Angle wrapped: the previous revolution is finished
+            del self._legacy[robot]
+            scan = self._assemble(robot, None, pending.first_seen, pending.fragments, None, complete=True)
+            self._publish(scan)
+            published.append(scan)
+            pending = None
+        if pending is None:
+            pending = self._legacy[robot] = _PendingScan(None, None, now, now, {})
+        pending.fragments[len(pending.fragments)] = arrays
+        pending.last_seen = now
+        if len(angles):
+            pending.last_angle = float(angles[-1])
+        return published
+
+    def _assemble(self, robot, scan_id, first_seen: float, fragments: dict,
+                  expected: Optional[int], complete: bool) -> LidarScan:
+        parts = [fragments[i] for i in sorted(fragments)]
+        angles = np.concatenate([a for a, _ in parts]) if parts else np.empty(0, np.float32)
+        distances = np.concatenate([d for _, d in parts]) if parts else np.empty(0, np.float32)
+        order = np.argsort(angles, kind="stable")
+        return LidarScan(robot, scan_id, first_seen, angles[order], distances[order],
+                         complete, len(fragments), expected)
+
+    # ---------- Timeouts ----------
+
+    def expire(self, now: float | None = None) -> list[LidarScan]:
+        """Flush scans idle for longer than `timeout`; partial scans below min_coverage are dropped."""
+        now = time.time() if now is None else now
+        published = []
+        for key, pending in list(self._pending.items()):
+            if now - pending.last_seen < self.timeout:
+                continue
+            del self._pending[key]
+            if len(pending.fragments) / pending.expected >= self.min_coverage:
+                scan = self._assemble(key[0], pending.scan_id, pending.first_seen,
+                                      pending.fragments, pending.expected, complete=False)
+                self._publish(scan)
+                published.append(scan)
+            else:
+                self.expired += 1
+        for robot, pending in list(self._legacy.items()):
+            if now - pending.last_seen < self.timeout:
+                continue
+            del self._legacy[robot]
+            scan = self._assemble(robot, None, pending.first_seen, pending.fragments, None, complete=True)
+            self._publish(scan)
+            published.append(scan)
+        return published
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.timeout / 2)
+            self.expire()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.expire(now=float("inf"))
+
+    def forget(self, robot):
+        """Drop all state for `robot` (its session ended or it moved to another UDP address)."""
+        for key in [k for k in self._pending if k[0] == robot]:
+            del self._pending[key]
+        self._legacy.pop(robot, None)
+        self._published.pop(robot, None)
+        self._latest.pop(robot, None)
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "partial": self.partial,
+            "expired": self.expired,
+            "late_fragments": self.late_fragments,
+            "invalid": self.invalid,
+            "pending": len(self._pending) + len(self._legacy),
+        }
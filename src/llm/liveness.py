@@ -0,0 +1,176 @@
+"""
+Heartbeat and liveness tracking for TCP sessions.
+
+Any inbound traffic counts as a heartbeat: a command line or frame, an ack,
+a {"command": "ping"} or a UDP sensor packet from the robot's bound address.
+Recording it is one attribute write (`session.last_seen = now`), so the
+per-message cost does not depend on the number of sessions.
+
+Deadlines live in one hashed timer wheel driven by a single task (no sleep
+task per client). Each session has one wheel entry that is checked lazily:
+when it fires, the session is compared against `last_seen`. A session that
+has heard from its robot since is simply rescheduled, one silent for
+`idle_after` seconds is probed once, and one silent for `timeout` seconds is
+evicted. A tick only touches the sessions whose check is due in that slot.
+"""
+
+import asyncio
+import math
+import time
+from typing import Callable, Hashable
+
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+ALIVE = "alive"
+IDLE = "idle"        # silent for idle_after (probed once)
+DETACHED = "reconnecting"  # connection lost, session held for resumption
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: `slots` buckets of `tick` seconds. An entry due more
+    than one revolution ahead stays in its bucket until its tick comes round.
+    schedule/cancel are O(1); advance() visits one bucket per elapsed tick.
+    """
+
+    def __init__(self, tick: float = 0.5, slots: int = 512, clock: Callable[[], float] = time.monotonic):
+        if tick <= 0 or slots <= 0:
+            raise ValueError("tick and slots must be positive")
+        self.tick = tick
+        self.clock = clock
+        self._slots: list[dict[Hashable, int]] = [{} for _ in range(slots)]  # key -> due tick
+        self._where: dict[Hashable, int] = {}  # key -> slot index
+        self._now_tick = int(clock() / tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Fire `key` at `deadline` (clock time); replaces any earlier schedule for it."""
+        self.cancel(key)
+        due = max(math.ceil(deadline / self.tick), self._now_tick + 1)
+        index = due % len(self._slots)
+        self._slots[index][key] = due
+        self._where[key] = index
+
+    def cancel(self, key: Hashable) -> bool:
+        index = self._where.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+    def advance(self, now: float | None = None) -> list[Hashable]:
+        """Move the wheel to `now` and return the keys that came due, oldest tick first."""
+        target = int((self.clock() if now is None else now) / self.tick)
+        steps = min(target - self._now_tick, len(self._slots))
+        start = self._now_tick
+        self._now_tick = max(target, self._now_tick)
+        fired = []
+        for step in range(1, steps + 1):
+            slot = self._slots[(start + step) % len(self._slots)]
+            if not slot:
+                continue
+            due_keys = [key for key, due in slot.items() if due <= target]
+            for key in due_keys:
+                del slot[key]
+                del self._where[key]
+            fired.extend(due_keys)
+        return fired
+
+
+class LivenessMonitor:
+    """
+    Probe and evict silent sessions. `probe(session)` should send the robot
+    something it answers; `evict(session, silent_s)` should drop the connection.
+    Sessions need `last_seen` (time.monotonic()), `closed` and `detached`.
+    """
+
+    def __init__(self, idle_after: float, timeout: float, probe: Callable, evict: Callable,
+                 tick: float = 0.5, slots: int = 512):
+        self.idle_after = idle_after
+        self.timeout = timeout
+        self._probe = probe
+        self._evict = evict
+        self.wheel = TimerWheel(tick, slots)
+        self._probed: dict = {}  # session -> time of the unanswered probe
+        self._task: asyncio.Task | None = None
+        self.probes = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    def watch(self, session, now: float | None = None):
+        """Start (or restart, after a resume) tracking a session."""
+        if not self.enabled:
+            return
+        session.last_seen = time.monotonic() if now is None else now
+        self._probed.pop(session, None)
+        self.wheel.schedule(session, session.last_seen + self._first_check())
+
+    def forget(self, session):
+        self.wheel.cancel(session)
+        self._probed.pop(session, None)
+
+    def _first_check(self) -> float:
+        return self.idle_after if 0 < self.idle_after < self.timeout else self.timeout
+
+    def state(self, session, now: float | None = None) -> str:
+        if session.detached:
+            return DETACHED
+        silent = (time.monotonic() if now is None else now) - session.last_seen
+        return IDLE if 0 < self.idle_after <= silent else ALIVE
+
+    def check(self, now: float | None = None):
+        """Handle every session whose check is due (called once per tick)."""
+        now = time.monotonic() if now is None else now
+        for session in self.wheel.advance(now):
+            probed_at = self._probed.pop(session, None)
+            if session.closed or session.detached:
+                continue
+            if probed_at is not None and session.last_seen >= probed_at:
+                probed_at = None  # answered; the next silence gets a new probe
+            silent = now - session.last_seen
+            if silent >= self.timeout:
+                self.evicted += 1
+                self._evict(session, silent)
+            elif 0 < self.idle_after <= silent:
+                if probed_at is None:
+                    probed_at = now
+                    self.probes += 1
+                    self._probe(session)
+                self._probed[session] = probed_at
+                self.wheel.schedule(session, session.last_seen + self.timeout)
+            else:
+                self.wheel.schedule(session, session.last_seen + self._first_check())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            try:
+                self.check()
+            except Exception as e:
+                log.error("❌ Liveness check failed: %s", e)
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"tracked": len(self.wheel), "idle": len(self._probed), "probes": self.probes, "evicted": self.evicted}
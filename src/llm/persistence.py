@@ -0,0 +1,181 @@
+"""
+Buffered writer for the received_data/ daily capture files.
+
+File layout is unchanged: received_data/<YYYYMMDD>_<ip>_<port>_<kind>.<ext>.
+Instead of one thread hop and one open/close per sample, payloads are
+appended to in-memory buffers and a background task flushes all of them in a
+single thread hop when a buffer reaches `flush_bytes` or every
+`flush_interval` seconds. File handles stay open per (date, peer, kind) and
+are closed when the date rolls over at midnight.
+
+Backpressure: once `max_pending_bytes` are buffered, write() waits for the
+next flush, which in turn slows the UDP ingest consumer (its ring then drops
+the oldest datagrams and counts them).
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO
+
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+EXTENSIONS = {"tcp": "log", "tcpbin": "bin", "udp": "jsonl", "udpbin": "bin"}
+
+
+class ReceivedDataWriter:
+    def __init__(self, out_dir: Path, flush_bytes: int = 64 * 1024, flush_interval: float = 1.0,
+                 max_pending_bytes: int = 8 * 1024 * 1024):
+        self.out_dir = Path(out_dir)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_pending_bytes = max_pending_bytes
+        self._buffers: dict[tuple, list[bytes]] = {}   # (date, ip, port, kind) -> chunks
+        self._buffer_sizes: dict[tuple, int] = {}
+        self._pending_bytes = 0
+        self._handles: dict[tuple, BinaryIO] = {}      # only touched from the flush thread
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False  # set by close(); the flush loop exits after its current flush
+        self._date_str = ""
+        self._day_end = 0.0
+        self.bytes_written = 0
+        self.bytes_lost = 0  # buffered bytes whose write failed
+        self.flushes = 0
+        self.backpressure_waits = 0
+
+    def _current_date(self) -> str:
+        now = time.time()
+        if now >= self._day_end:
+            today = datetime.fromtimestamp(now)
+            self._date_str = today.strftime("%Y%m%d")
+            midnight = datetime(today.year, today.month, today.day) + timedelta(days=1)
+            self._day_end = midnight.timestamp()
+        return self._date_str
+
+    def path_for(self, key: tuple) -> Path:
+        date_str, ip, port, kind = key
+        return self.out_dir / f"{date_str}_{ip}_{port}_{kind}.{EXTENSIONS.get(kind, 'jsonl')}"
+
+    async def write(self, kind: str, addr: tuple, payload: str | bytes):
+        """Buffer one payload; text payloads get a trailing newline like before."""
+        if isinstance(payload, str):
+            if not payload.endswith("\n"):
+                payload += "\n"
+            payload = payload.encode("utf-8", errors="replace")
+        ip = str(addr[0]).replace(":", "_")
+        port = str(addr[1]) if len(addr) > 1 else "udp"
+        key = (self._current_date(), ip, port, kind)
+
+        chunks = self._buffers.get(key)
+        if chunks is None:
+            chunks = self._buffers[key] = []
+            self._buffer_sizes[key] = 0
+        chunks.append(payload)
+        self._buffer_sizes[key] += len(payload)
+        self._pending_bytes += len(payload)
+
+        if self._buffer_sizes[key] >= self.flush_bytes:
+            self._flush_requested.set()
+        while self._pending_bytes >= self.max_pending_bytes and self._task is not None:
+            self.backpressure_waits += 1
+            self._flush_requested.set()
+            self._flushed.clear()
+            await self._flushed.wait()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                break  # close() does the final flush
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("⚠️ Failed to flush received data: %s", e)
+
+    async def flush(self):
+        """Write out every buffer in one thread hop."""
+        async with self._flush_lock:
+            try:
+                if not self._buffers:
+                    return
+                buffers, self._buffers, self._buffer_sizes = self._buffers, {}, {}
+                size = self._pending_bytes
+                self._pending_bytes = 0
+                today = self._current_date()
+                written = 0
+                try:
+                    written = await asyncio.to_thread(self._write_all, buffers, today)
+                finally:
+                    # Failed buffers are not kept for a retry: a full disk would grow them without bound
+                    self.bytes_written += written
+                    self.flushes += 1
+                    if written < size:
+                        self.bytes_lost += size - written
+                        log.error("❌ Lost %d bytes of received data (flush failed)", size - written)
+            finally:
+                self._flushed.set()  # wake backpressure waiters even when the write failed
+
+    def _write_all(self, buffers: dict[tuple, list[bytes]], today: str) -> int:
+        """Append every buffer to its file; returns the bytes written (a failed file is skipped and reopened next time)."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for key, chunks in buffers.items():
+            data = b"".join(chunks)
+            try:
+                f = self._handles.get(key)
+                if f is None:
+                    f = self._handles[key] = open(self.path_for(key), "ab")
+                f.write(data)
+                f.flush()
+            except OSError as e:
+                log.warning("⚠️ Failed to write %s: %s", self.path_for(key), e)
+                f = self._handles.pop(key, None)
+                if f is not None:
+                    try:
+                        f.close()
+                    except OSError:
+                        pass
+                continue
+            written += len(data)
+        # Midnight rotation: close handles from previous days
+        for key in [k for k in self._handles if k[0] != today]:
+            self._handles.pop(key).close()
+        return written
+
+    async def close(self):
+        """Flush everything and close all file handles."""
+        if self._task is not None:
+            # Stop the loop between flushes: cancelling it mid-flush would leave the write thread running
+            self._stopping = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        async with self._flush_lock:
+            handles, self._handles = self._handles, {}
+            await asyncio.to_thread(lambda: [f.close() for f in handles.values()])
+        self._stopping = False
+
+    def stats(self) -> dict:
+        return {
+            "pending_bytes": self._pending_bytes,
+            "bytes_written": self.bytes_written,
+            "bytes_lost": self.bytes_lost,
+            "flushes": self.flushes,
+            "open_files": len(self._handles),
+            "backpressure_waits": self.backpressure_waits,
+        }
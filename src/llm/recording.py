@@ -0,0 +1,391 @@
+"""
+Indexed, chunked binary recording format for sensor logs.
+
+A recording is two files:
+
+  <name>.srec       data: 8-byte file header, then zlib-compressed chunks
+  <name>.srec.idx   sidecar index: stream table (JSON) + fixed-size chunk records
+
+Each chunk holds rows of one stream, i.e. one (robot, sensor) pair, stored
+as a typed numpy column layout (see SCHEMAS), sorted by timestamp. The index
+records (stream, t_first, t_last, offset, length, rows) for every chunk, so a
+reader can seek to any timestamp by consulting the index alone and
+decompressing only the chunks that overlap the requested window. Both files
+are memory-mapped by RecordingReader.
+
+Streams whose payload is not numeric (TCP lines, unknown sensor packets) use
+the "raw" schema: one (t, offset, length) row per message plus a UTF-8 blob
+appended after the rows in the same chunk. A stream whose packets carried a
+robot_id keeps the first one in its stream table entry ("robot_id"), so a
+replay can send the robot's own id again.
+
+Convert the existing received_data captures with:
+    python3 -m src.llm.recording convert received_data/ day.srec --date 20261016
+    python3 -m src.llm.recording info day.srec
+"""
+
+import argparse
+import json
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from src.llm.sensor_packet import decode_packet, lidar_points
+
+DATA_MAGIC = b"SREC\x01\x00\x00\x00"
+INDEX_MAGIC = b"SRIX\x01\x00\x00\x00"
+CHUNK_HEADER = struct.Struct("<4sHIII")  # b"CHNK", stream id, rows, raw length, compressed length
+
+SCHEMAS: dict[str, np.dtype] = {
+    "lidar": np.dtype([("t", "<f8"), ("angle", "<f4"), ("distance", "<f4")]),
+    "imu": np.dtype([("t", "<f8"), ("ax", "<f4"), ("ay", "<f4"), ("az", "<f4"),
+                     ("gx", "<f4"), ("gy", "<f4"), ("gz", "<f4")]),
+    "proximity": np.dtype([("t", "<f8"), ("channel", "<u1"), ("distance_cm", "<f4")]),
+    "raw": np.dtype([("t", "<f8"), ("offset", "<u4"), ("length", "<u4")]),
+}
+
+INDEX_DTYPE = np.dtype([("stream", "<u2"), ("t_first", "<f8"), ("t_last", "<f8"),
+                        ("offset", "<u8"), ("length", "<u4"), ("rows", "<u4")], align=True)
+
+PROXIMITY_SIDES = ("front", "back", "left", "right")
+
+
+# ---------- Packet -> typed rows ----------
+
+def packet_rows(packet: dict, t: float) -> tuple[str, Optional[np.ndarray]]:
+    """(schema, rows) for a decoded sensor packet; rows is None for non-numeric packets."""
+    sensor = packet.get("type")
+    if sensor == "lidar":
+        points = lidar_points(packet)
+        if points is None:
+            return "lidar", None
+        rows = np.empty(len(points[0]), dtype=SCHEMAS["lidar"])
+        rows["t"] = t
+        rows["angle"], rows["distance"] = points
+        return "lidar", rows
+    if sensor == "imu":
+        accel, gyro = packet.get("accel") or {}, packet.get("gyro") or {}
+        if not (isinstance(accel, dict) and isinstance(gyro, dict)):
+            raise ValueError("imu accel/gyro must be objects")
+        rows = np.array([(t, accel.get("x", np.nan), accel.get("y", np.nan), accel.get("z", np.nan),
+                          gyro.get("x", np.nan), gyro.get("y", np.nan), gyro.get("z", np.nan))],
+                        dtype=SCHEMAS["imu"])
+        return "imu", rows
+    if sensor == "proximity":
+        if "distances_cm" in packet:
+            values = np.asarray(packet["distances_cm"], dtype=np.float32)
+        elif "distance_cm" in packet:
+            values = np.array([packet["distance_cm"]], dtype=np.float32)
+        else:
+            values = np.array([packet[k] * 100.0 if k in packet else np.nan for k in PROXIMITY_SIDES],
+                              dtype=np.float32)
+        rows = np.empty(len(values), dtype=SCHEMAS["proximity"])
+        rows["t"] = t
+        rows["channel"] = np.arange(len(values))
+        rows["distance_cm"] = values
+        return "proximity", rows
+    return "raw", None
+
+
+# ---------- Writer ----------
+
+class _StreamBuffer:
+    def __init__(self, schema: str):
+        self.schema = schema
+        self.parts: list[np.ndarray] = []
+        self.rows = 0
+        self.blob: list[bytes] = []
+        self.blob_size = 0
+
+
+class RecordingWriter:
+    """
+    Append-only recording writer.
+      - chunk_rows: rows buffered per stream before a chunk is compressed and written
+      - level:      zlib compression level
+    The index sidecar is written by close().
+    """
+
+    def __init__(self, path: str | Path, chunk_rows: int = 8192, level: int = 6):
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self._f = open(self.path, "wb")
+        self._f.write(DATA_MAGIC)
+        self._offset = len(DATA_MAGIC)
+        self._streams: list[dict] = []
+        self._stream_ids: dict[tuple[str, str], int] = {}
+        self._buffers: dict[int, _StreamBuffer] = {}
+        self._index: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _stream(self, robot: str, sensor: str, schema: str) -> int:
+        key = (robot, sensor)
+        sid = self._stream_ids.get(key)
+        if sid is None:
+            sid = self._stream_ids[key] = len(self._streams)
+            self._streams.append({"id": sid, "robot": robot, "sensor": sensor, "schema": schema})
+            self._buffers[sid] = _StreamBuffer(schema)
+        return sid
+
+    def append_rows(self, robot: str, sensor: str, rows: np.ndarray, schema: Optional[str] = None):
+        """Append typed rows (dtype must match SCHEMAS[schema], default schema = sensor)."""
+        sid = self._stream(robot, sensor, schema or sensor)
+        buf = self._buffers[sid]
+        buf.parts.append(rows)
+        buf.rows += len(rows)
+        if buf.rows >= self.chunk_rows:
+            self._flush_stream(sid)
+
+    def append_raw(self, robot: str, sensor: str, t: float, text: str | bytes):
+        """Append one non-numeric message (TCP line, unknown packet) to a raw stream."""
+        data = text.encode("utf-8", errors="replace") if isinstance(text, str) else text
+        sid = self._stream(robot, sensor, "raw")
+        buf = self._buffers[sid]
+        buf.parts.append(np.array([(t, buf.blob_size, len(data))], dtype=SCHEMAS["raw"]))
+        buf.blob.append(data)
+        buf.blob_size += len(data)
+        buf.rows += 1
+        if buf.rows >= self.chunk_rows:
+            self._flush_stream(sid)
+
+    def append_packet(self, robot: str, packet: dict, t: float, raw: str | bytes | None = None):
+        """Append a decoded sensor packet; non-numeric packets are kept as raw JSON."""
+        schema, rows = packet_rows(packet, t)
+        if rows is not None:
+            sensor = schema
+            self.append_rows(robot, sensor, rows)
+        else:
+            sensor = str(packet.get("type", "udp"))
+            self.append_raw(robot, sensor, t, raw if raw is not None else json.dumps(packet, default=str))
+        robot_id = packet.get("robot_id")
+        if isinstance(robot_id, (int, str)) and not isinstance(robot_id, bool):
+            self._streams[self._stream_ids[(robot, sensor)]].setdefault("robot_id", robot_id)
+
+    def _flush_stream(self, sid: int):
+        buf = self._buffers[sid]
+        if not buf.rows:
+            return
+        # Sort by time within the chunk; raw rows carry their own blob offsets
+        rows = np.concatenate(buf.parts)
+        rows = rows[np.argsort(rows["t"], kind="stable")]
+        raw = rows.tobytes() + b"".join(buf.blob)
+        compressed = zlib.compress(raw, self.level)
+        self._f.write(CHUNK_HEADER.pack(b"CHNK", sid, len(rows), len(raw), len(compressed)))
+        self._f.write(compressed)
+        self._index.append((sid, float(rows["t"][0]), float(rows["t"][-1]),
+                            self._offset + CHUNK_HEADER.size, len(compressed), len(rows)))
+        self._offset += CHUNK_HEADER.size + len(compressed)
+        self._buffers[sid] = _StreamBuffer(buf.schema)
+
+    def close(self):
+        if self._f.closed:
+            return
+        for sid in list(self._buffers):
+            self._flush_stream(sid)
+        self._f.close()
+        write_index(Path(str(self.path) + ".idx"), self._streams, np.array(self._index, dtype=INDEX_DTYPE))
+
+
+def write_index(path: Path, streams: list[dict], records: np.ndarray):
+    header = json.dumps({"streams": streams}).encode("utf-8")
+    prefix = INDEX_MAGIC + struct.pack("<I", len(header)) + header
+    pad = (-len(prefix)) % 8
+    with open(path, "wb") as f:
+        f.write(prefix + b"\0" * pad)
+        f.write(records.tobytes())
+
+
+# ---------- Reader ----------
+
+class RecordingReader:
+    """Memory-mapped reader; only chunks overlapping a query window are decompressed."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if bytes(self._data[:len(DATA_MAGIC)]) != DATA_MAGIC:
+            raise ValueError(f"{self.path} is not a sensor recording")
+        idx_path = Path(str(self.path) + ".idx")
+        with open(idx_path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{idx_path} is not a recording index")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            self.streams: list[dict] = json.loads(f.read(header_len))["streams"]
+        offset = len(INDEX_MAGIC) + 4 + header_len
+        offset += (-offset) % 8
+        n = (idx_path.stat().st_size - offset) // INDEX_DTYPE.itemsize
+        self.index = (np.memmap(idx_path, dtype=INDEX_DTYPE, mode="r", offset=offset, shape=(n,))
+                      if n else np.empty(0, dtype=INDEX_DTYPE))
+        self._by_key = {(s["robot"], s["sensor"]): s for s in self.streams}
+
+    def stream(self, robot: str, sensor: str) -> Optional[dict]:
+        return self._by_key.get((robot, sensor))
+
+    def time_range(self) -> tuple[float, float]:
+        if not len(self.index):
+            return (float("nan"), float("nan"))
+        return float(self.index["t_first"].min()), float(self.index["t_last"].max())
+
+    def _chunk(self, rec) -> tuple[np.ndarray, bytes]:
+        stream = self.streams[int(rec["stream"])]
+        dtype = SCHEMAS[stream["schema"]]
+        start = int(rec["offset"])
+        raw = zlib.decompress(self._data[start:start + int(rec["length"])])
+        n = int(rec["rows"])
+        rows = np.frombuffer(raw, dtype=dtype, count=n)
+        return rows, raw[n * dtype.itemsize:]
+
+    def chunks(self, robot: str, sensor: str, t0: float = -np.inf, t1: float = np.inf) -> Iterator[tuple[np.ndarray, bytes]]:
+        """(rows, blob) per chunk overlapping [t0, t1], in file order."""
+        stream = self.stream(robot, sensor)
+        if stream is None:
+            return
+        idx = self.index
+        mask = (idx["stream"] == stream["id"]) & (idx["t_last"] >= t0) & (idx["t_first"] <= t1)
+        for rec in idx[mask]:
+            yield self._chunk(rec)
+
+    def read(self, robot: str, sensor: str, t0: float = -np.inf, t1: float = np.inf) -> np.ndarray:
+        """Typed rows of one stream with t0 <= t <= t1."""
+        stream = self.stream(robot, sensor)
+        if stream is None:
+            raise KeyError(f"No stream {robot}/{sensor}")
+        parts = []
+        for rows, _ in self.chunks(robot, sensor, t0, t1):
+            lo = np.searchsorted(rows["t"], t0, side="left")
+            hi = np.searchsorted(rows["t"], t1, side="right")
+            parts.append(rows[lo:hi])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=SCHEMAS[stream["schema"]])
+
+    def read_raw(self, robot: str, sensor: str, t0: float = -np.inf, t1: float = np.inf) -> list[tuple[float, bytes]]:
+        """(t, message bytes) for a raw stream."""
+        out = []
+        for rows, blob in self.chunks(robot, sensor, t0, t1):
+            for t, off, length in rows[(rows["t"] >= t0) & (rows["t"] <= t1)]:
+                out.append((float(t), blob[off:off + length]))
+        return out
+
+
+# ---------- Converter from received_data ----------
+
+CAPTURE_NAME = re.compile(r"^(\d{8})_(.+)_([^_]+)_(tcp|tcpbin|udp|udpbin)\.(log|jsonl|bin)$")
+
+
+def iter_capture(path: Path, kind: str) -> Iterator[tuple[Optional[str], Optional[bytes]]]:
+    """(json line, None) for *_udp.jsonl, (None, packet bytes) for length-prefixed *_udpbin.bin / *_tcpbin.bin."""
+    if kind in ("udpbin", "tcpbin"):
+        # Stream the records: captures can be far larger than memory
+        with open(path, "rb", buffering=1 << 20) as f:
+            while True:
+                prefix = f.read(4)
+                if len(prefix) < 4:
+                    return
+                (n,) = struct.unpack("<I", prefix)
+                yield None, f.read(n)  # a truncated last record comes back short
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line, None
+
+
+def convert_received_data(sources: list[Path], out_path: Path, date: Optional[str] = None,
+                          chunk_rows: int = 8192) -> dict:
+    """
+    Convert received_data captures (*_udp.jsonl, *_udpbin.bin, *_tcp.log, *_tcpbin.bin) into a recording.
+    Robots are named "<ip>_<port>" after the capture file. The captures carry no
+    receive time, so sensor rows use the packet "timestamp" (carried forward when
+    missing) and TCP lines are recorded at t=0, i.e. before any sensor data.
+    """
+    files: list[Path] = []
+    for src in sources:
+        src = Path(src)
+        files.extend(sorted(src.iterdir()) if src.is_dir() else [src])
+    counts = {"files": 0, "tcp_lines": 0, "tcp_frames": 0, "packets": 0, "invalid": 0}
+
+    try:
+        with RecordingWriter(out_path, chunk_rows=chunk_rows) as writer:
+            for path in files:
+                m = CAPTURE_NAME.match(path.name)
+                if not m or (date and m.group(1) != date):
+                    continue
+                _, ip, port, kind, _ = m.groups()
+                robot = f"{ip}_{port}"
+                counts["files"] += 1
+                if kind == "tcp":
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        for line in f:
+                            writer.append_raw(robot, "tcp", 0.0, line.rstrip("\n"))
+                            counts["tcp_lines"] += 1
+                    continue
+                if kind == "tcpbin":
+                    for _, frame in iter_capture(path, kind):
+                        writer.append_raw(robot, "tcpbin", 0.0, frame)
+                        counts["tcp_frames"] += 1
+                    continue
+
+                last_t = 0.0
+                for line, raw in iter_capture(path, kind):
+                    try:
+                        if raw is not None:
+                            packet = decode_packet(raw)
+                        else:
+                            line = line.strip()
+                            if not line:
+                                continue
+                            packet = json.loads(line)
+                        if not isinstance(packet, dict):
+                            raise ValueError("not an object")
+                        t = packet.get("timestamp")
+                        t = last_t if not isinstance(t, (int, float)) else float(t)
+                        # Rows are built before anything is buffered, so a bad field drops just this packet
+                        writer.append_packet(robot, packet, t, raw=line)
+                    except (TypeError, ValueError, KeyError, AttributeError):
+                        counts["invalid"] += 1
+                        continue
+                    last_t = t
+                    counts["packets"] += 1
+    except BaseException:
+        # Do not leave a half-written recording behind
+        for leftover in (Path(out_path), Path(str(out_path) + ".idx")):
+            leftover.unlink(missing_ok=True)
+        raise
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sensor recording tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="convert received_data captures into a recording")
+    conv.add_argument("sources", nargs="+", type=Path, help="capture files or directories")
+    conv.add_argument("out", type=Path)
+    conv.add_argument("--date", help="only convert captures from this YYYYMMDD date")
+    conv.add_argument("--chunk-rows", type=int, default=8192)
+    info = sub.add_parser("info", help="summarise a recording")
+    info.add_argument("path", type=Path)
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        counts = convert_received_data(args.sources, args.out, args.date, args.chunk_rows)
+        print(f"✅ Wrote {args.out}: {counts['files']} files, {counts['packets']} packets, "
+              f"{counts['tcp_lines']} TCP lines, {counts['tcp_frames']} TCP frames, {counts['invalid']} invalid")
+    else:
+        reader = RecordingReader(args.path)
+        t0, t1 = reader.time_range()
+        print(f"📼 {args.path}: {len(reader.streams)} streams, {len(reader.index)} chunks, t=[{t0:.3f}, {t1:.3f}]")
+        for s in reader.streams:
+            recs = reader.index[reader.index["stream"] == s["id"]]
+            print(f"  [{s['id']}] {s['robot']} {s['sensor']} ({s['schema']}): "
+                  f"{int(recs['rows'].sum())} rows in {len(recs)} chunks")
+
+
+if __name__ == "__main__":
+    main()
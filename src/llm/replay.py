@@ -0,0 +1,384 @@
+"""
+Time-accelerated replay of recorded robot traffic into a running RobotServer.
+
+Sources:
+  - a received_data/ directory (optionally filtered by --date): raw TCP lines,
+    binary TCP frames, JSON datagrams and binary datagrams are re-emitted byte for byte
+  - a .srec recording (see recording.py): typed rows are re-encoded as binary
+    (default) or JSON sensor packets carrying the recorded robot's id (see
+    recorded_robot_id), raw streams are re-emitted as recorded
+
+Every recorded peer gets its own socket, so the server sees one TCP session
+and one UDP source per recorded robot. Timing is taken from the packet
+timestamps, normalised per peer (robots may use boot-relative clocks), and
+divided by the speed factor; TCP lines have no recorded time and are sent
+first. Several sources and --copies N replay concurrently to synthesise
+fleet-scale load; every copy after the first registers and sends under its
+own robot id (see copy_robot_id) so the server sees N distinct robots.
+
+    python3 -m src.llm.replay received_data/ --date 20261016 --speed 10
+    python3 -m src.llm.replay day.srec --speed max --copies 20
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from src.llm.recording import CAPTURE_NAME, RecordingReader, iter_capture
+from src.llm.sensor_packet import HEADER, decode_packet, encode_imu, encode_lidar, encode_proximity, is_binary_packet
+from src.llm.tcp_framing import FRAME_JSON, LENGTH, json_frame
+
+HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+TCP_PORT = int(os.environ.get("SERVER_PORT", 3000))
+UDP_PORT = int(os.environ.get("UDP_PORT", 3001))
+
+
+@dataclass(order=True)
+class ReplayEvent:
+    t: float                                   # seconds since the peer's first event
+    channel: str = field(compare=False)        # "tcp" (line), "tcpbin" (raw frame) or "udp"
+    peer: str = field(compare=False)           # recorded peer name, e.g. "10.0.0.5_51234"
+    payload: bytes = field(compare=False)
+
+
+# ---------- Sources ----------
+
+def _normalised(events: Iterator[tuple[float, str, str, bytes]]) -> Iterator[ReplayEvent]:
+    """Shift one peer's timestamps so its first sensor event is at t=0."""
+    t0 = None
+    for t, channel, peer, payload in events:
+        if channel != "udp":
+            yield ReplayEvent(0.0, channel, peer, payload)
+            continue
+        if t0 is None:
+            t0 = t
+        yield ReplayEvent(max(0.0, t - t0), channel, peer, payload)
+
+
+def _capture_events(path: Path, kind: str, peer: str) -> Iterator[tuple[float, str, str, bytes]]:
+    if kind == "tcp":
+        with open(path, "rb") as f:
+            for line in f:
+                yield 0.0, "tcp", peer, line.rstrip(b"\r\n")
+        return
+    if kind == "tcpbin":
+        for _, frame in iter_capture(path, kind):
+            yield 0.0, "tcpbin", peer, frame
+        return
+    last_t = 0.0
+    for line, raw in iter_capture(path, kind):
+        try:
+            if raw is not None:
+                t = decode_packet(raw)["timestamp"]
+                payload = raw
+            else:
+                line = line.strip()
+                if not line:
+                    continue
+                t = json.loads(line).get("timestamp")
+                payload = line.encode("utf-8")
+        except (ValueError, AttributeError):
+            continue
+        t = last_t if not isinstance(t, (int, float)) else float(t)
+        last_t = t
+        yield t, "udp", peer, payload
+
+
+def received_data_events(directory: Path, date: Optional[str] = None) -> Iterator[ReplayEvent]:
+    """Merge all captures of a received_data directory into one time-ordered event stream."""
+    streams = []
+    for path in sorted(Path(directory).iterdir()):
+        m = CAPTURE_NAME.match(path.name)
+        if not m or (date and m.group(1) != date):
+            continue
+        _, ip, port, kind, _ = m.groups()
+        streams.append(_normalised(_capture_events(path, kind, f"{ip}_{port}")))
+    return heapq.merge(*streams)
+
+
+def recorded_robot_id(reader: RecordingReader, robot: str):
+    """
+    The id a recorded robot used: from its sensor packets (stream table), else
+    from its TCP register/resume line, else the robot label if it is a number.
+    None if the recording does not say.
+    """
+    for stream in reader.streams:
+        if stream["robot"] == robot and stream.get("robot_id") is not None:
+            return stream["robot_id"]
+    if reader.stream(robot, "tcp") is not None:
+        for _, line in reader.read_raw(robot, "tcp"):
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(msg, dict) and msg.get("command") in ("register", "resume") and msg.get("robot_id") is not None:
+                return msg["robot_id"]
+    return int(robot) if robot.isdigit() else None
+
+
+def _packet_robot_id(robot_id, robot: str) -> int:
+    """uint16 header id for binary packets; a label-derived one when the recorded id does not fit."""
+    try:
+        value = int(robot_id)
+    except (TypeError, ValueError):
+        value = -1
+    return value if 0 <= value <= 0xFFFF else zlib.crc32(robot.encode("utf-8")) & 0xFFFF
+
+
+def _recording_stream_events(reader: RecordingReader, stream: dict, binary: bool,
+                             robot_id=None) -> Iterator[tuple[float, str, str, bytes]]:
+    robot, sensor, schema = stream["robot"], stream["sensor"], stream["schema"]
+    packet_id = _packet_robot_id(robot_id, robot)
+    identity = {"robot_id": robot_id} if robot_id is not None else {}
+    channel = sensor if sensor in ("tcp", "tcpbin") else "udp"
+    seq = 0
+    for rows, blob in reader.chunks(robot, sensor):
+        if schema == "raw":
+            for t, off, length in rows:
+                yield float(t), channel, robot, blob[off:off + length]
+            continue
+        # Rows sharing a timestamp came from one packet
+        boundaries = np.flatnonzero(np.diff(rows["t"])) + 1
+        for group in np.split(rows, boundaries):
+            t = float(group["t"][0])
+            seq += 1
+            if schema == "lidar":
+                payload = (encode_lidar(packet_id, seq, group["angle"], group["distance"], t) if binary else
+                           json.dumps({"type": "lidar", **identity, "timestamp": t, "angles": group["angle"].tolist(),
+                                       "distances": group["distance"].tolist()}).encode("utf-8"))
+            elif schema == "imu":
+                r = group[0]
+                accel, gyro = (r["ax"], r["ay"], r["az"]), (r["gx"], r["gy"], r["gz"])
+                payload = (encode_imu(packet_id, seq, accel, gyro, t) if binary else
+                           json.dumps({"type": "imu", **identity, "timestamp": t,
+                                       "accel": dict(zip("xyz", map(float, accel))),
+                                       "gyro": dict(zip("xyz", map(float, gyro)))}).encode("utf-8"))
+            elif schema == "proximity":
+                values = group["distance_cm"]
+                payload = (encode_proximity(packet_id, seq, values, t) if binary else
+                           json.dumps({"type": "proximity", **identity, "timestamp": t,
+                                       "distance_cm": float(values[0])}).encode("utf-8"))
+            else:
+                continue
+            yield t, channel, robot, payload
+
+
+def recording_events(path: Path, binary: bool = True) -> Iterator[ReplayEvent]:
+    """Merge all streams of a .srec recording into one time-ordered event stream."""
+    reader = RecordingReader(path)
+    by_robot: dict[str, list] = {}
+    robot_ids = {robot: recorded_robot_id(reader, robot) for robot in {s["robot"] for s in reader.streams}}
+    for stream in reader.streams:
+        by_robot.setdefault(stream["robot"], []).append(
+            _recording_stream_events(reader, stream, binary, robot_ids[stream["robot"]]))
+    # Normalise per robot across that robot's streams
+    return heapq.merge(*(_normalised(heapq.merge(*streams)) for streams in by_robot.values()))
+
+
+def open_source(source: Path, date: Optional[str], binary: bool) -> Iterator[ReplayEvent]:
+    source = Path(source)
+    if source.is_dir():
+        return received_data_events(source, date)
+    return recording_events(source, binary)
+
+
+# ---------- Copies ----------
+
+ROBOT_ID_OFFSET = 4  # byte offset of the uint16 robot_id in a binary sensor header
+
+
+def copy_robot_id(robot_id, copy: int):
+    """
+    Id that copy `copy` of a recorded robot uses; copy 0 keeps the recorded id.
+    Ids that fit a binary packet header (0..65535) map to another such number,
+    so a copy's TCP registration and binary packets still agree; any other id
+    becomes f"{robot_id}-{copy}". The numeric mapping is a hash and can collide
+    for very large fleets x copies.
+    """
+    if copy == 0 or robot_id is None:
+        return robot_id
+    label = f"{robot_id}-{copy}"
+    if isinstance(robot_id, bool) or not str(robot_id).isdigit() or int(robot_id) > 0xFFFF:
+        return label
+    value = zlib.crc32(label.encode("utf-8")) & 0xFFFF
+    return value if isinstance(robot_id, int) else str(value)
+
+
+def _json_with_copy_id(text: bytes, copy: int) -> Optional[bytes]:
+    try:
+        msg = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(msg, dict) or msg.get("robot_id") is None:
+        return None
+    msg["robot_id"] = copy_robot_id(msg["robot_id"], copy)
+    return json.dumps(msg).encode("utf-8")
+
+
+def _payload_with_copy_id(channel: str, payload: bytes, copy: int) -> bytes:
+    """`payload` with its robot id (JSON field or binary header) replaced by the copy's."""
+    if channel == "udp" and is_binary_packet(payload):
+        if len(payload) < HEADER.size:
+            return payload
+        (robot_id,) = struct.unpack_from("<H", payload, ROBOT_ID_OFFSET)
+        packed = bytearray(payload)
+        struct.pack_into("<H", packed, ROBOT_ID_OFFSET, copy_robot_id(robot_id, copy))
+        return bytes(packed)
+    if channel == "tcpbin":
+        if len(payload) <= LENGTH.size or payload[LENGTH.size] != FRAME_JSON:
+            return payload
+        text = _json_with_copy_id(payload[LENGTH.size + 1:], copy)
+        return json_frame(text) if text is not None else payload
+    text = _json_with_copy_id(payload, copy)
+    return text if text is not None else payload
+
+
+def as_copy(events: Iterator[ReplayEvent], copy: int) -> Iterator[ReplayEvent]:
+    """Rewrite every robot id in `events` (register/resume lines, sensor packets) for copy `copy`."""
+    if copy == 0:
+        yield from events
+        return
+    for ev in events:
+        yield ReplayEvent(ev.t, ev.channel, ev.peer, _payload_with_copy_id(ev.channel, ev.payload, copy))
+
+
+# ---------- Player ----------
+
+@dataclass
+class ReplayStats:
+    tcp_lines: int = 0
+    udp_packets: int = 0
+    bytes_sent: int = 0
+    max_lag: float = 0.0       # worst lateness vs. the scaled schedule, seconds
+    duration: float = 0.0
+    errors: int = 0
+
+
+class ReplaySession:
+    """Replays one event stream with its own sockets (one TCP + one UDP socket per recorded peer)."""
+
+    def __init__(self, events: Iterator[ReplayEvent], host: str, tcp_port: int, udp_port: int,
+                 speed: float, stats: ReplayStats):
+        self.events = events
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.speed = speed
+        self.stats = stats
+        self._writers: dict[str, asyncio.StreamWriter] = {}
+        self._udp: dict[str, asyncio.DatagramTransport] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    async def _tcp(self, peer: str) -> asyncio.StreamWriter:
+        writer = self._writers.get(peer)
+        if writer is None:
+            reader, writer = await asyncio.open_connection(self.host, self.tcp_port)
+            self._writers[peer] = writer
+            self._tasks.append(asyncio.create_task(self._discard(reader)))
+        return writer
+
+    async def _discard(self, reader: asyncio.StreamReader):
+        # Keep the server's send buffer moving; replayed robots do not act on commands
+        while await reader.read(65536):
+            pass
+
+    async def _udp_transport(self, peer: str) -> asyncio.DatagramTransport:
+        transport = self._udp.get(peer)
+        if transport is None:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(self.host, self.udp_port))
+            self._udp[peer] = transport
+        return transport
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        unpaced = self.speed <= 0 or self.speed == float("inf")
+        sent = 0
+        try:
+            for ev in self.events:
+                if not unpaced:
+                    delay = start + ev.t / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.stats.max_lag = max(self.stats.max_lag, -delay)
+                try:
+                    if ev.channel != "udp":
+                        writer = await self._tcp(ev.peer)
+                        # Frames are self-delimiting; lines get their newline back
+                        writer.write(ev.payload if ev.channel == "tcpbin" else ev.payload + b"\n")
+                        await writer.drain()
+                        self.stats.tcp_lines += 1
+                    else:
+                        (await self._udp_transport(ev.peer)).sendto(ev.payload)
+                        self.stats.udp_packets += 1
+                    self.stats.bytes_sent += len(ev.payload)
+                except (OSError, ConnectionError):
+                    self.stats.errors += 1
+                sent += 1
+                if unpaced and sent % 256 == 0:
+                    await asyncio.sleep(0)
+        finally:
+            await self.close()
+
+    async def close(self):
+        for transport in self._udp.values():
+            transport.close()
+        for writer in self._writers.values():
+            writer.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._udp.clear()
+        self._writers.clear()
+
+
+async def replay(sources: list[Path], host: str = HOST, tcp_port: int = TCP_PORT, udp_port: int = UDP_PORT,
+                 speed: float = 1.0, copies: int = 1, date: Optional[str] = None, binary: bool = True) -> ReplayStats:
+    """Replay every source `copies` times concurrently; speed <= 0 or inf means as fast as possible."""
+    stats = ReplayStats()
+    started = time.perf_counter()
+    sessions = [ReplaySession(as_copy(open_source(src, date, binary), copy), host, tcp_port, udp_port, speed, stats)
+                for src in sources for copy in range(copies)]
+    await asyncio.gather(*(s.run() for s in sessions))
+    stats.duration = time.perf_counter() - started
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded robot traffic into a RobotServer")
+    ap.add_argument("sources", nargs="+", type=Path, help="received_data directories or .srec recordings")
+    ap.add_argument("--date", help="YYYYMMDD filter for received_data directories")
+    ap.add_argument("--speed", default="1", help="time scale factor (1, 10, ...) or 'max'")
+    ap.add_argument("--copies", type=int, default=1, help="concurrent copies of each source")
+    ap.add_argument("--json", action="store_true", help="re-encode .srec sensor rows as JSON instead of binary")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--tcp-port", type=int, default=TCP_PORT)
+    ap.add_argument("--udp-port", type=int, default=UDP_PORT)
+    args = ap.parse_args()
+
+    speed = float("inf") if args.speed == "max" else float(args.speed)
+    print(f"⏩ Replaying {len(args.sources)} source(s) x{args.copies} at speed {args.speed} "
+          f"to {args.host} (TCP {args.tcp_port}, UDP {args.udp_port})")
+    stats = asyncio.run(replay(args.sources, args.host, args.tcp_port, args.udp_port,
+                               speed, args.copies, args.date, not args.json))
+    rate = stats.udp_packets / stats.duration if stats.duration else 0.0
+    print(f"✅ Sent {stats.udp_packets} UDP packets ({rate:,.0f}/s) and {stats.tcp_lines} TCP lines, "
+          f"{stats.bytes_sent} bytes in {stats.duration:.2f}s; max lag {stats.max_lag * 1000:.1f} ms, "
+          f"{stats.errors} errors")
+
+
+if __name__ == "__main__":
+    main()
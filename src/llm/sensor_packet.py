@@ -0,0 +1,156 @@
+"""
+Compact binary UDP sensor packet format (version 1).
+
+All fields are little-endian. A packet is a fixed 20-byte header followed by
+a type-specific payload:
+
+    offset  size  field
+    0       1     magic      0xB5 (JSON packets always start with '{' or whitespace)
+    1       1     version    1
+    2       1     type       1 = lidar, 2 = imu, 3 = proximity
+    3       1     flags      reserved, 0
+    4       2     robot_id   uint16
+    6       2     count      number of payload elements
+    8       4     seq        uint32 sequence number (scan id for lidar)
+    12      8     timestamp  float64 seconds
+
+Payloads:
+    lidar      uint16 fragment, uint16 fragments, then count x (float32 angle_deg, float32 distance)
+    imu        count = 6 x float32: accel x/y/z, gyro x/y/z
+    proximity  count x uint16 distance in cm
+
+Decoding never builds per-point Python objects: lidar and proximity arrays are
+numpy views over the received datagram (via memoryview + numpy.frombuffer).
+"""
+
+import struct
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+MAGIC = 0xB5
+MAGIC_BYTE = bytes([MAGIC])
+VERSION = 1
+
+TYPE_LIDAR = 1
+TYPE_IMU = 2
+TYPE_PROXIMITY = 3
+TYPE_NAMES = {TYPE_LIDAR: "lidar", TYPE_IMU: "imu", TYPE_PROXIMITY: "proximity"}
+
+HEADER = struct.Struct("<BBBBHHId")
+LIDAR_PREFIX = struct.Struct("<HH")
+IMU_PAYLOAD = struct.Struct("<6f")
+
+LIDAR_POINT_DTYPE = np.dtype([("angle", "<f4"), ("distance", "<f4")])
+PROXIMITY_DTYPE = np.dtype("<u2")
+
+
+def is_binary_packet(data: bytes) -> bool:
+    """True if the datagram starts with the binary packet magic byte."""
+    return len(data) > 0 and data[0] == MAGIC
+
+
+def _header(ptype: int, robot_id: int, count: int, seq: int, timestamp: float | None) -> bytes:
+    ts = time.time() if timestamp is None else timestamp
+    return HEADER.pack(MAGIC, VERSION, ptype, 0, robot_id & 0xFFFF, count, seq & 0xFFFFFFFF, ts)
+
+
+def encode_lidar(robot_id: int, seq: int, angles: Sequence[float], distances: Sequence[float],
+                 timestamp: float | None = None, fragment: int = 0, fragments: int = 1) -> bytes:
+    """Encode one lidar fragment. `angles` and `distances` must have equal length."""
+    n = len(distances)
+    if len(angles) != n:
+        raise ValueError("angles and distances must have the same length")
+    points = np.empty(n, dtype=LIDAR_POINT_DTYPE)
+    points["angle"] = angles
+    points["distance"] = distances
+    return (_header(TYPE_LIDAR, robot_id, n, seq, timestamp)
+            + LIDAR_PREFIX.pack(fragment, fragments)
+            + points.tobytes())
+
+
+def encode_imu(robot_id: int, seq: int, accel: Sequence[float], gyro: Sequence[float],
+               timestamp: float | None = None) -> bytes:
+    """Encode one IMU sample (accel x/y/z, gyro x/y/z)."""
+    return _header(TYPE_IMU, robot_id, 6, seq, timestamp) + IMU_PAYLOAD.pack(*accel, *gyro)
+
+
+def encode_proximity(robot_id: int, seq: int, distances_cm: Sequence[int],
+                     timestamp: float | None = None) -> bytes:
+    """Encode one or more proximity readings in centimetres (clamped to uint16)."""
+    values = np.clip(np.asarray(distances_cm, dtype=np.float64), 0, 0xFFFF).astype(PROXIMITY_DTYPE)
+    return _header(TYPE_PROXIMITY, robot_id, len(values), seq, timestamp) + values.tobytes()
+
+
+def lidar_points(packet: dict) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """(angles, distances) float32 arrays from a binary or JSON lidar packet, or None (also if malformed)."""
+    try:
+        if "distances" in packet:
+            distances = np.asarray(packet["distances"], dtype=np.float32)
+            angles = packet.get("angles")
+            if angles is None:
+                angles = np.linspace(0.0, 360.0, len(distances), endpoint=False, dtype=np.float32)
+            angles = np.asarray(angles, dtype=np.float32)
+            if distances.ndim != 1 or angles.shape != distances.shape:
+                return None
+            return angles, distances
+        scans = packet.get("scans")
+        if scans and isinstance(scans, list) and all(isinstance(s, dict) for s in scans):
+            angles = np.fromiter((s.get("angle", np.nan) for s in scans), dtype=np.float32, count=len(scans))
+            distances = np.fromiter((s.get("distance", np.nan) for s in scans), dtype=np.float32, count=len(scans))
+            return angles, distances
+    except (TypeError, ValueError):  # untyped JSON: non-numeric points
+        pass
+    return None
+
+
+def decode_packet(data: bytes) -> dict:
+    """
+    Decode a binary sensor packet into a dict shaped like the JSON packets.
+    Raises ValueError for truncated, unknown-type or unsupported-version packets.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("Truncated packet header")
+    magic, version, ptype, _flags, robot_id, count, seq, timestamp = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a binary sensor packet")
+    if version != VERSION:
+        raise ValueError(f"Unsupported packet version {version}")
+
+    packet = {
+        "type": TYPE_NAMES.get(ptype, "unknown"),
+        "robot_id": robot_id,
+        "seq": seq,
+        "timestamp": timestamp,
+    }
+    offset = HEADER.size
+
+    if ptype == TYPE_LIDAR:
+        end = offset + LIDAR_PREFIX.size + count * LIDAR_POINT_DTYPE.itemsize
+        if len(view) < end:
+            raise ValueError("Truncated lidar payload")
+        fragment, fragments = LIDAR_PREFIX.unpack_from(view, offset)
+        points = np.frombuffer(view, dtype=LIDAR_POINT_DTYPE, count=count, offset=offset + LIDAR_PREFIX.size)
+        packet["fragment"] = fragment
+        packet["fragments"] = fragments
+        packet["angles"] = points["angle"]
+        packet["distances"] = points["distance"]
+    elif ptype == TYPE_IMU:
+        if count != 6 or len(view) < offset + IMU_PAYLOAD.size:
+            raise ValueError("Truncated imu payload")
+        ax, ay, az, gx, gy, gz = IMU_PAYLOAD.unpack_from(view, offset)
+        packet["accel"] = {"x": ax, "y": ay, "z": az}
+        packet["gyro"] = {"x": gx, "y": gy, "z": gz}
+    elif ptype == TYPE_PROXIMITY:
+        if len(view) < offset + count * PROXIMITY_DTYPE.itemsize:
+            raise ValueError("Truncated proximity payload")
+        distances = np.frombuffer(view, dtype=PROXIMITY_DTYPE, count=count, offset=offset)
+        packet["distances_cm"] = distances
+        if count == 1:
+            packet["distance_cm"] = int(distances[0])
+    else:
+        raise ValueError(f"Unknown packet type {ptype}")
+
+    return packet
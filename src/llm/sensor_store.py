@@ -0,0 +1,254 @@
+"""
+Per-robot, per-sensor-type time-series store built on preallocated numpy rings.
+
+Every ring is "mirrored": sample i is written both at slot i and slot
+i + capacity, so any window of up to `capacity` samples is one contiguous
+slice and queries return array views instead of copies. Appends are O(1)
+and memory per robot is bounded by the configured retention; robots that
+stop sending are dropped by SensorStore.evict_idle().
+
+Views stay valid until the ring wraps over them; call `.copy()` on a window
+that must outlive the next `capacity` appends.
+"""
+
+import time
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from src.llm.sensor_packet import lidar_points
+
+
+class SensorWindow(NamedTuple):
+    timestamps: np.ndarray  # (n,) float64 receive times
+    values: np.ndarray      # (n, channels, width) float32, NaN-padded
+    lengths: np.ndarray     # (n,) int32 valid entries per row
+
+
+class SensorSpec(NamedTuple):
+    channels: int
+    width: int
+    rate_hz: float
+    extract: Callable[[dict], Optional[np.ndarray]]  # packet -> (channels, n) array or None
+
+
+class SensorRingBuffer:
+    """Mirrored ring of fixed-size rows with monotonic float64 timestamps."""
+
+    def __init__(self, capacity: int, channels: int, width: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.channels = channels
+        self.width = width
+        self._timestamps = np.full(2 * capacity, np.nan, dtype=np.float64)
+        self._values = np.full((2 * capacity, channels, width), np.nan, dtype=np.float32)
+        self._lengths = np.zeros(2 * capacity, dtype=np.int32)
+        self._next = 0   # physical slot (in [0, capacity)) of the next write
+        self._count = 0
+        self._last_t = -np.inf
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._values.nbytes + self._lengths.nbytes
+
+    def append(self, timestamp: float, row: np.ndarray):
+        """Append one sample; `row` is (channels, n) and is truncated/NaN-padded to `width`."""
+        # Keep timestamps monotonic so windows can be found with a binary search
+        t = timestamp if timestamp >= self._last_t else self._last_t
+        self._last_t = t
+        n = min(row.shape[-1], self.width)
+        for slot in (self._next, self._next + self.capacity):
+            self._timestamps[slot] = t
+            dst = self._values[slot]
+            dst[:, :n] = row[:, :n]
+            if n < self.width:
+                dst[:, n:] = np.nan
+            self._lengths[slot] = n
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _bounds(self) -> tuple[int, int]:
+        start = (self._next - self._count) % self.capacity
+        return start, start + self._count
+
+    def all(self) -> SensorWindow:
+        s, e = self._bounds()
+        return SensorWindow(self._timestamps[s:e], self._values[s:e], self._lengths[s:e])
+
+    def between(self, t0: float, t1: float) -> SensorWindow:
+        """Samples with t0 <= timestamp <= t1, as views."""
+        s, e = self._bounds()
+        ts = self._timestamps[s:e]
+        i0 = s + int(np.searchsorted(ts, t0, side="left"))
+        i1 = s + int(np.searchsorted(ts, t1, side="right"))
+        return SensorWindow(self._timestamps[i0:i1], self._values[i0:i1], self._lengths[i0:i1])
+
+    def last(self, seconds: float, now: float | None = None) -> SensorWindow:
+        """Samples from the last `seconds` (relative to `now`, default wall clock)."""
+        now = time.time() if now is None else now
+        return self.between(now - seconds, now)
+
+
+# ---------- Packet -> row extractors ----------
+
+def _extract_lidar(packet: dict) -> Optional[np.ndarray]:
+    points = lidar_points(packet)
+    return np.vstack(points) if points is not None else None
+
+
+def _extract_imu(packet: dict) -> Optional[np.ndarray]:
+    accel = packet.get("accel") or {}
+    gyro = packet.get("gyro") or {}
+    return np.array([[accel.get("x", np.nan), accel.get("y", np.nan), accel.get("z", np.nan),
+                      gyro.get("x", np.nan), gyro.get("y", np.nan), gyro.get("z", np.nan)]], dtype=np.float32)
+
+
+def _extract_proximity(packet: dict) -> Optional[np.ndarray]:
+    if "distances_cm" in packet:
+        return np.asarray(packet["distances_cm"], dtype=np.float32)[np.newaxis, :]
+    if "distance_cm" in packet:
+        return np.array([[packet["distance_cm"]]], dtype=np.float32)
+    sides = [packet[k] * 100.0 for k in ("front", "back", "left", "right") if k in packet]
+    return np.array([sides], dtype=np.float32) if sides else None
+
+
+DEFAULT_SPECS: dict[str, SensorSpec] = {
+    "lidar": SensorSpec(channels=2, width=1024, rate_hz=10.0, extract=_extract_lidar),
+    "imu": SensorSpec(channels=1, width=6, rate_hz=100.0, extract=_extract_imu),
+    "proximity": SensorSpec(channels=1, width=4, rate_hz=50.0, extract=_extract_proximity),
+    # Reassembled full sweeps (see lidar_reassembly.py), appended with append_row()
+    "lidar_scan": SensorSpec(channels=2, width=2048, rate_hz=5.0, extract=_extract_lidar),
+}
+
+
+class RobotSensors:
+    """History rings and the latest packet for one robot; shared by every key it is attached under."""
+
+    def __init__(self, retention_s: float, specs: dict[str, SensorSpec]):
+        self.retention_s = retention_s
+        self.specs = specs
+        self._rings: dict[str, SensorRingBuffer] = {}  # sensor type -> ring
+        self.latest: Optional[tuple[float, dict]] = None  # (timestamp, packet), any type
+        self.shared = None  # SensorSlot mirroring each new row into shared memory (see shared_sensors.py)
+        self.updated = time.time()  # receive time of the newest packet or row (see SensorStore.evict_idle)
+
+    def append(self, packet: dict, timestamp: float):
+        """Store a packet; raises (storing nothing) if its fields do not fit the sensor's spec."""
+        sensor_type = packet.get("type")
+        spec = self.specs.get(sensor_type)
+        row = spec.extract(packet) if spec is not None else None
+        self.latest = (timestamp, packet)
+        self.updated = timestamp
+        if row is not None:
+            self.append_row(sensor_type, row, timestamp)
+
+    def append_row(self, sensor_type: str, row: np.ndarray, timestamp: float):
+        ring = self._rings.get(sensor_type)
+        if ring is None:
+            spec = self.specs[sensor_type]
+            capacity = max(1, int(self.retention_s * spec.rate_hz))
+            ring = self._rings[sensor_type] = SensorRingBuffer(capacity, spec.channels, spec.width)
+        ring.append(timestamp, row)
+        self.updated = max(self.updated, timestamp)
+        if self.shared is not None:
+            self.shared.write(sensor_type, row, timestamp)
+
+    def ring(self, sensor_type: str) -> Optional[SensorRingBuffer]:
+        return self._rings.get(sensor_type)
+
+    def last(self, sensor_type: str, seconds: float, now: float | None = None) -> Optional[SensorWindow]:
+        ring = self._rings.get(sensor_type)
+        return ring.last(seconds, now) if ring else None
+
+    def between(self, sensor_type: str, t0: float, t1: float) -> Optional[SensorWindow]:
+        ring = self._rings.get(sensor_type)
+        return ring.between(t0, t1) if ring else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(r.nbytes for r in self._rings.values())
+
+
+class SensorStore:
+    """
+    A RobotSensors per robot key.
+      - robot keys are opaque (currently the UDP source address); attach() lets
+        a second key (a robot's new UDP port) share an existing RobotSensors
+      - unknown sensor types are kept as latest-value only
+      - capacity per ring = retention_s * spec.rate_hz samples
+    """
+
+    def __init__(self, retention_s: float = 10.0, specs: dict[str, SensorSpec] | None = None):
+        self.retention_s = retention_s
+        self.specs = dict(DEFAULT_SPECS if specs is None else specs)
+        self._robots: dict = {}  # robot key -> RobotSensors
+
+    def robot(self, robot, create: bool = True) -> Optional[RobotSensors]:
+        sensors = self._robots.get(robot)
+        if sensors is None and create:
+            sensors = self._robots[robot] = RobotSensors(self.retention_s, self.specs)
+        return sensors
+
+    def attach(self, robot, sensors: RobotSensors):
+        """Store packets from `robot` in an existing RobotSensors (e.g. a session's)."""
+        self._robots[robot] = sensors
+
+    def append(self, robot, packet: dict, timestamp: float | None = None):
+        self.robot(robot).append(packet, time.time() if timestamp is None else timestamp)
+
+    def append_row(self, robot, sensor_type: str, row: np.ndarray, timestamp: float):
+        """Append a derived (channels, n) row to history without touching the latest packet."""
+        self.robot(robot).append_row(sensor_type, row, timestamp)
+
+    def latest(self, robot) -> Optional[tuple[float, dict]]:
+        """(timestamp, packet) of the most recent packet from `robot`, any type."""
+        sensors = self._robots.get(robot)
+        return sensors.latest if sensors else None
+
+    def latest_items(self) -> list[tuple[object, float, dict]]:
+        """(robot, timestamp, packet) per robot; a shared RobotSensors is listed under its newest key."""
+        newest = {id(sensors): (robot, sensors) for robot, sensors in self._robots.items() if sensors.latest}
+        return [(robot, *sensors.latest) for robot, sensors in newest.values()]
+
+    def ring(self, robot, sensor_type: str) -> Optional[SensorRingBuffer]:
+        sensors = self._robots.get(robot)
+        return sensors.ring(sensor_type) if sensors else None
+
+    def last(self, robot, sensor_type: str, seconds: float, now: float | None = None) -> Optional[SensorWindow]:
+        """e.g. store.last(addr, "lidar", 2.0) -> last 2 s of lidar for that robot."""
+        sensors = self._robots.get(robot)
+        return sensors.last(sensor_type, seconds, now) if sensors else None
+
+    def between(self, robot, sensor_type: str, t0: float, t1: float) -> Optional[SensorWindow]:
+        sensors = self._robots.get(robot)
+        return sensors.between(sensor_type, t0, t1) if sensors else None
+
+    def robots(self) -> list:
+        return [robot for robot, sensors in self._robots.items() if sensors.latest]
+
+    def drop(self, robot):
+        self._robots.pop(robot, None)
+
+    def evict_idle(self, idle_s: float, now: float | None = None) -> list:
+        """
+        Drop robot keys with no packet for `idle_s` seconds and return them. Every new
+        UDP source gets a key (and up to a few MB of rings), so without this a fleet
+        that reconnects from fresh ports grows without bound.
+        """
+        cutoff = (time.time() if now is None else now) - idle_s
+        idle = [robot for robot, sensors in self._robots.items() if sensors.updated < cutoff]
+        for robot in idle:
+            del self._robots[robot]
+        return idle
+
+    def clear(self):
+        self._robots.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in {id(s): s for s in self._robots.values()}.values())
@@ -1,29 +1,75 @@
 import json
+import logging
 import socket
 import os
+import struct
 import time
+import weakref
 from typing import Optional
 from pathlib import Path
-from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 import asyncio
-import time
-from typing import Optional
-from src.map.mapStructure import handle_navigation_command
+import numpy as np
+from src.map.mapStructure import NavigationSession, handle_navigation_command, load_navigation_map
 from src.llm.command_parser import RobotCommandParser, R1D4CommandParser, get_parser
 from src.llm.voice_command_interpreter import interpretSeriesOfCommands
+from src.llm.udp_ingest import UDPIngestPipeline
+from src.llm.sensor_packet import is_binary_packet, decode_packet
+from src.llm.sensor_store import RobotSensors, SensorStore, SensorWindow
+from src.llm.shared_sensors import SharedSensorStore
+from src.llm.lidar_reassembly import LidarScanAssembler, LidarScan
+from src.llm.persistence import ReceivedDataWriter
+from src.llm.client_session import ClientSession
+from src.llm.session_registry import SessionRegistry
+from src.llm.command_tracker import CommandTracker
+from src.llm.liveness import IDLE, LivenessMonitor
+from src.llm.tcp_framing import (FRAMING_BINARY, FRAMING_LINE, FRAME_ACK, FRAME_JSON, LENGTH,
+                                 decode_ack, json_frame, read_frame)
+from src.llm.server_logging import get_logger, setup_logging
 
 
 # Server Configuration
 HOST = "0.0.0.0"  # Listen on all network interfaces
 PORT = int(os.environ.get("SERVER_PORT", 3000))  # TCP port for commands
 UDP_PORT = int(os.environ.get("UDP_PORT", 3001))  # UDP port for sensor data
+UDP_INGEST_CAPACITY = int(os.environ.get("UDP_INGEST_CAPACITY", 8192))  # datagrams buffered before dropping
+UDP_INGEST_BATCH = int(os.environ.get("UDP_INGEST_BATCH", 256))  # datagrams handled per consumer pass
+SENSOR_RETENTION_S = float(os.environ.get("SENSOR_RETENTION_S", 10.0))  # seconds of sensor history kept per robot
+SENSOR_IDLE_EVICT_S = float(os.environ.get("SENSOR_IDLE_EVICT_S", 120.0))  # silence before a UDP source's history is freed (0 keeps it)
+LIDAR_SCAN_TIMEOUT = float(os.environ.get("LIDAR_SCAN_TIMEOUT", 0.5))  # seconds before an incomplete scan is flushed
+PERSIST_FLUSH_BYTES = int(os.environ.get("PERSIST_FLUSH_BYTES", 64 * 1024))  # per-file buffer size that triggers a flush
+PERSIST_FLUSH_INTERVAL = float(os.environ.get("PERSIST_FLUSH_INTERVAL", 1.0))  # max seconds between flushes
+PERSIST_MAX_PENDING_BYTES = int(os.environ.get("PERSIST_MAX_PENDING_BYTES", 8 * 1024 * 1024))  # backpressure threshold
+CLIENT_QUEUE_SIZE = int(os.environ.get("CLIENT_QUEUE_SIZE", 256))  # outbound messages queued per client
+CLIENT_QUEUE_POLICY = os.environ.get("CLIENT_QUEUE_POLICY", "drop-oldest")  # drop-oldest | coalesce | disconnect
+CLIENT_DRAIN_TIMEOUT = float(os.environ.get("CLIENT_DRAIN_TIMEOUT", 10.0))  # seconds a stalled client may block its writer
+COMMAND_TIMEOUT = float(os.environ.get("COMMAND_TIMEOUT", 30.0))  # seconds before an unacknowledged command is dropped
+RESUME_GRACE_S = float(os.environ.get("RESUME_GRACE_S", 15.0))  # seconds a dropped robot may resume its session (0 disables)
+HEARTBEAT_IDLE_S = float(os.environ.get("HEARTBEAT_IDLE_S", 20.0))  # silence before the server probes a robot
+HEARTBEAT_TIMEOUT_S = float(os.environ.get("HEARTBEAT_TIMEOUT_S", 60.0))  # silence before a session is evicted (0 disables)
+LIVENESS_TICK_S = float(os.environ.get("LIVENESS_TICK_S", 0.5))  # timer wheel resolution
+SENSOR_SHM_NAME = os.environ.get("SENSOR_SHM_NAME", f"cap_sensors_{PORT}")  # shared-memory latest-sensor segment
+SENSOR_SHM_SLOTS = int(os.environ.get("SENSOR_SHM_SLOTS", 256))  # robots mirrored into it (0 disables)
+NAV_MAP_FILE = os.environ.get("NAV_MAP_FILE", "")  # navigation map JSON/YAML ("" = src/map/maps/hospital.json)
+NAV_ROUTE_CACHE = int(os.environ.get("NAV_ROUTE_CACHE", 1024))  # cached (start, goal, heading) routes
+NAV_MAP_RELOAD_S = float(os.environ.get("NAV_MAP_RELOAD_S", 2.0))  # seconds between map file checks (0 disables reload)
+NAV_ROUTE_TABLE_MAX_NODES = int(os.environ.get("NAV_ROUTE_TABLE_MAX_NODES", 2000))  # all-pairs table up to this size, else A*
+NAV_ROUTE_BACKEND = os.environ.get("NAV_ROUTE_BACKEND", "auto")  # auto | table | ch (contraction hierarchy) | astar
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))  # >1: SO_REUSEPORT worker processes + coordinator (see cluster.py)
+SERVER_IPC_PATH = os.environ.get("SERVER_IPC_PATH", "")  # coordinator unix socket ("" = temp dir, per TCP port)
+RECEIVED_DATA_DIR = Path(__file__).resolve().parents[2] / "received_data"
 
 # Enable or disable debug mode (set env SERVER_DEBUG=1/true to enable)
 DEBUG_MODE = os.environ.get("SERVER_DEBUG", "").lower() in ("1", "true", "yes", "on")
+LOG_JSON = os.environ.get("SERVER_LOG_JSON", "").lower() in ("1", "true", "yes", "on")  # one JSON object per log line
+LOG_RATE = float(os.environ.get("SERVER_LOG_RATE", 5.0))  # per-peer log messages per second (0 disables the limit)
+LOG_BURST = int(os.environ.get("SERVER_LOG_BURST", 20))  # per-peer messages allowed before rate limiting starts
 MANUAL_MODE = True  # manual mode skips heavy STT/TTS initialization
 
+log = get_logger()
+console = get_logger("console")  # operator console output (help, list, stats, ...), never rate limited
+
 if not MANUAL_MODE:
     from src.llm.stt.transcribe import FasterWhisper
     from src.llm.tts.text_to_speech import TextToSpeech
@@ -50,34 +96,34 @@ async def a_input(prompt: str) -> str:
     return await asyncio.to_thread(lambda: input(prompt))
 
 async def listen_for_activation() -> bool:
-    print("🎤 Waiting for 'listen' activation...")
+    log.info("🎤 Waiting for 'listen' activation...")
     while True:
         try:
             command = (await a_stt_listen_transcribe()) or ""
             lc = command.lower()
             if "stop listening" in lc:
-                print("🔇 Stopping activation loop.")
+                log.info("🔇 Stopping activation loop.")
                 return False
             if "listen" in lc:
                 return True
         except Exception as e:
-            print(f"❌ STT error: {e}")
+            log.error("❌ STT error: %s", e)
             await asyncio.sleep(0.2)
 
 async def capture_voice() -> str | None:
     try:
         msg = "What do you need me to do?"
-        print(f"🎤 {msg}")
+        log.info("🎤 %s", msg)
         await a_tts_speak(msg)
         return await a_stt_listen_transcribe()
     except Exception as e:
-        print(f"❌ Capture error: {e}")
+        log.error("❌ Capture error: %s", e)
         return None
 
-def _build_response_from_text_or_nav(voice_command: str | None) -> str:
+def _build_response_from_text_or_nav(voice_command: str | None, navigation: Optional[NavigationSession] = None) -> str:
     try:
         response_str = interpretSeriesOfCommands(voice_command) if voice_command else json.dumps([])
-        print(f"🔍 Raw AI Response: {response_str}")
+        log.info("🔍 Raw AI Response: %s", response_str)
 
         if response_str and response_str.startswith("("):
             stripped = response_str.strip("()")
@@ -85,8 +131,8 @@ def _build_response_from_text_or_nav(voice_command: str | None) -> str:
             if len(parts) == 2:
                 start_room = parts[0].strip()
                 end_room = parts[1].strip()
-                print(f"📍 Navigation from {start_room} to {end_room}")
-                response_json = handle_navigation_command(start_room, end_room)
+                log.info("📍 Navigation from %s to %s", start_room, end_room)
+                response_json = handle_navigation_command(start_room, end_room, navigation)
 
                 if isinstance(response_json, str) and response_json.startswith("{"):
                     try:
@@ -98,21 +144,44 @@ def _build_response_from_text_or_nav(voice_command: str | None) -> str:
 
                 try:
                     nav_list = json.loads(response_json)
-                    print("🧭 Navigation Commands:")
+                    log.info("🧭 Navigation Commands:")
                     for c in nav_list:
-                        print(c)
+                        log.info("%s", c)
                     return json.dumps(nav_list)
                 except Exception:
                     return json.dumps([])
             else:
-                print("❌ Invalid navigation tuple format.")
+                log.error("❌ Invalid navigation tuple format.")
                 return json.dumps([])
         else:
             return response_str or json.dumps([])
     except Exception as e:
-        print(f"❌ Build response error: {e}")
+        log.error("❌ Build response error: %s", e)
         return json.dumps([])
 
+def _encode_payload(payload: str | bytes) -> bytes:
+    """Newline-terminated UTF-8 bytes for a parser result (bytes pass through unchanged)."""
+    if isinstance(payload, bytes):
+        return payload
+    if not payload.endswith("\n"):
+        payload += "\n"
+    return payload.encode("utf-8", errors="replace")
+
+def _encode_message(session: 'ClientSession', message: str) -> bytes:
+    """A JSON text message in the session's framing (newline line or JSON frame)."""
+    if session.framing == FRAMING_BINARY:
+        return json_frame(message)
+    return _encode_payload(message)
+
+def _parser_class(parser) -> type:
+    """Parsers are used both as classes (get_parser) and instances; group them by class."""
+    return parser if isinstance(parser, type) else type(parser)
+
+def _coalesce_key(raw_message: str) -> str:
+    """Command name used by the 'coalesce' overflow policy (a newer 'move' replaces a queued 'move')."""
+    parts = raw_message.split(None, 1)
+    return parts[0].lower() if parts else ""
+
 class UDPProtocol(asyncio.DatagramProtocol):
     """UDP protocol handler for receiving sensor data from robots."""
     
@@ -124,24 +193,11 @@ class UDPProtocol(asyncio.DatagramProtocol):
         self.transport = transport
     
     def datagram_received(self, data: bytes, addr: tuple):
-        """Handle incoming UDP sensor data packets."""
-        try:
-            # Decode sensor data (expecting JSON format)
-            msg = data.decode('utf-8', errors='replace')
-            sensor_data = json.loads(msg)
-            # Persist raw UDP payload
-            asyncio.create_task(self.server._persist_received('udp', addr, msg))
-            
-            # Store sensor data associated with the client address
-            asyncio.create_task(self.server._handle_sensor_data(addr, sensor_data))
-            
-        except json.JSONDecodeError:
-            print(f"⚠️  Invalid JSON from {addr}: {data[:50]}...")
-        except Exception as e:
-            print(f"❌ UDP error from {addr}: {e}")
+        """Queue incoming UDP sensor packets; decoding happens in the ingest consumer."""
+        self.server._udp_ingest.push(data, addr)
     
     def error_received(self, exc):
-        print(f"❌ UDP error: {exc}")
+        log.error("❌ UDP error: %s", exc)
 
 class RobotServer:
     """
@@ -151,63 +207,89 @@ class RobotServer:
       - Runs a single stdin router task to send manual commands to chosen client(s).
     Protocol: 
       - TCP: newline-delimited UTF-8 messages
-      - UDP: JSON-encoded sensor packets
+      - UDP: binary sensor packets (see sensor_packet.py) or JSON-encoded sensor packets
     """
 
-    def __init__(self, host: str, tcp_port: int, udp_port: int):
+    def __init__(self, host: str, tcp_port: int, udp_port: int, reuse_port: bool = False, console: bool = True,
+                 sensor_shm_name: Optional[str] = None):
         self.host = host
         self.tcp_port = tcp_port
         self.udp_port = udp_port
+        self.reuse_port = reuse_port  # share the ports with other worker processes (cluster mode)
+        self.console = console        # run the stdin router (the cluster coordinator owns it instead)
+        self.sensor_shm_name = sensor_shm_name or SENSOR_SHM_NAME
         self._tcp_server: asyncio.AbstractServer | None = None
         self._udp_transport: Optional[asyncio.DatagramTransport] = None
-        self._clients: dict[tuple, tuple[asyncio.StreamWriter, RobotCommandParser, str]] = {}  # peername -> (writer, parser, bot_type)
-        self._sensor_data: dict[tuple, dict] = {}  # addr -> latest sensor data
-        self._sensor_timestamps: dict[tuple, float] = {}  # addr -> last update time
-        self._lock = asyncio.Lock()
+        self._clients = SessionRegistry()  # copy-on-write peername -> session, plus bot type / robot id indexes
+        self._sensor_store = SensorStore(SENSOR_RETENTION_S)  # addr -> sensor history + latest packet (per robot, no lock)
+        self._session_sensors: "weakref.WeakSet[RobotSensors]" = weakref.WeakSet()  # histories owned by a session
+        self._shared_sensors: Optional[SharedSensorStore] = None  # latest rows for other processes (created in start())
+        self._navigation = None  # NavigationMap behind handle_navigation_command (loaded in start())
+        self._lidar_scans = LidarScanAssembler(LIDAR_SCAN_TIMEOUT)  # fragmented lidar -> full sweeps
+        self._lidar_scans.add_listener(self._on_lidar_scan)
+        self._persistence = ReceivedDataWriter(RECEIVED_DATA_DIR, PERSIST_FLUSH_BYTES,
+                                               PERSIST_FLUSH_INTERVAL, PERSIST_MAX_PENDING_BYTES)
+        self._commands = CommandTracker(COMMAND_TIMEOUT)  # command ids, in-flight table, ack latency
+        self._detached: dict[str, tuple[ClientSession, asyncio.TimerHandle]] = {}  # robot_id -> session awaiting resume
+        self._stopping = False
+        self._liveness = LivenessMonitor(HEARTBEAT_IDLE_S, HEARTBEAT_TIMEOUT_S, self._probe_session,
+                                         self._evict_session, LIVENESS_TICK_S)  # one timer wheel for all sessions
         self._stdin_task: asyncio.Task | None = None
+        self._evict_task: asyncio.Task | None = None
+        self._udp_ingest = UDPIngestPipeline(self._handle_sensor_batch, UDP_INGEST_CAPACITY, UDP_INGEST_BATCH)
 
-    async def _persist_received(self, kind: str, addr: tuple, payload: str):
+    async def _persist_received(self, kind: str, addr: tuple, payload: str | bytes):
         """Persist received data under project_root/received_data as daily files per peer.
-        kind: 'tcp' or 'udp'
+        kind: 'tcp', 'udp', 'udpbin' (length-prefixed binary sensor packets) or 'tcpbin' (length-prefixed TCP frames)
+        Writes are buffered by ReceivedDataWriter and flushed in the background.
         """
         try:
-            root = Path(__file__).resolve().parents[2]
-            out_dir = root / "received_data"
-            out_dir.mkdir(parents=True, exist_ok=True)
-            date_str = datetime.now().strftime("%Y%m%d")
-            ip = str(addr[0]).replace(":", "_")
-            port = str(addr[1]) if len(addr) > 1 else ("udp")
-            ext = "log" if kind == "tcp" else "jsonl"
-            file_path = out_dir / f"{date_str}_{ip}_{port}_{kind}.{ext}"
-
-            if not payload.endswith("\n"):
-                payload += "\n"
-
-            def _append(fp: Path, content: str):
-                with open(fp, "a", encoding="utf-8") as f:
-                    f.write(content)
-
-            await asyncio.to_thread(_append, file_path, payload)
+            await self._persistence.write(kind, addr, payload)
         except Exception as e:
-            print(f"⚠️ Failed to persist {kind} data from {addr}: {e}")
+            log.warning("⚠️ Failed to persist %s data from %s: %s", kind, addr, e, extra={"peer": addr})
 
     async def start(self):
+        self._persistence.start()
+        if SENSOR_SHM_SLOTS > 0:
+            try:
+                self._shared_sensors = SharedSensorStore(self.sensor_shm_name, SENSOR_SHM_SLOTS)
+                log.info("🧠 Latest sensor rows shared as '%s' (%d robots, %.1f MiB)",
+                         self.sensor_shm_name, SENSOR_SHM_SLOTS, self._shared_sensors.nbytes / 2**20)
+            except OSError as e:
+                log.warning("⚠️ Shared sensor memory unavailable: %s", e)
+        try:
+            self._navigation = load_navigation_map(NAV_MAP_FILE or None, NAV_ROUTE_CACHE, NAV_MAP_RELOAD_S,
+                                                   NAV_ROUTE_TABLE_MAX_NODES, NAV_ROUTE_BACKEND)
+            log.info("🗺️ Navigation map %s loaded (version %s, %d nodes, %s routes)", self._navigation.path.name,
+                     self._navigation.version, len(self._navigation.graph.adj), self._navigation.graph.backend)
+        except (OSError, ValueError) as e:
+            log.warning("⚠️ Navigation map unavailable: %s", e)
+        self._commands.start()
+        self._liveness.start()
+
         # Start TCP server for commands
-        self._tcp_server = await asyncio.start_server(self._handle_client, self.host, self.tcp_port)
+        self._tcp_server = await asyncio.start_server(self._handle_client, self.host, self.tcp_port,
+                                                      reuse_port=self.reuse_port)
         tcp_sockets = ", ".join(str(s.getsockname()) for s in (self._tcp_server.sockets or []))
-        print(f"🚀 TCP Server (commands) running on {tcp_sockets}")
+        log.info("🚀 TCP Server (commands) running on %s", tcp_sockets)
         
         # Start UDP endpoint for sensor data
+        self._udp_ingest.start()
+        self._lidar_scans.start()
+        if SENSOR_IDLE_EVICT_S > 0:
+            self._evict_task = asyncio.create_task(self._evict_idle_sensors(SENSOR_IDLE_EVICT_S))
         loop = asyncio.get_running_loop()
         self._udp_transport, _ = await loop.create_datagram_endpoint(
             lambda: UDPProtocol(self),
-            local_addr=(self.host, self.udp_port)
+            local_addr=(self.host, self.udp_port),
+            reuse_port=self.reuse_port,
         )
-        print(f"📡 UDP Server (sensors) running on {self.host}:{self.udp_port}")
+        log.info("📡 UDP Server (sensors) running on %s:%s", self.host, self.udp_port)
 
         # Launch the single stdin router (manual command dispatcher)
-        self._stdin_task = asyncio.create_task(self._stdin_router())
-        print("🧭 Command router ready (type 'help' for options).")
+        if self.console:
+            self._stdin_task = asyncio.create_task(self._stdin_router())
+            log.info("🧭 Command router ready (type 'help' for options).")
 
     async def serve_forever(self):
         if not self._tcp_server:
@@ -216,6 +298,11 @@ class RobotServer:
             await self._tcp_server.serve_forever()
 
     async def stop(self):
+        self._stopping = True
+        for session, timer in list(self._detached.values()):
+            timer.cancel()
+            self._expire_detached(session)
+
         # Stop router task first
         if self._stdin_task and not self._stdin_task.done():
             self._stdin_task.cancel()
@@ -229,115 +316,245 @@ class RobotServer:
         if self._udp_transport:
             self._udp_transport.close()
             self._udp_transport = None
-            print("📡 UDP server stopped")
+            log.info("📡 UDP server stopped")
+        await self._udp_ingest.stop()
+        await self._lidar_scans.stop()
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            try:
+                await self._evict_task
+            except asyncio.CancelledError:
+                pass
+            self._evict_task = None
+        await self._commands.stop()
+        await self._liveness.stop()
 
         # Stop TCP server
         if self._tcp_server:
             self._tcp_server.close()
             await self._tcp_server.wait_closed()
             self._tcp_server = None
-            print("🚀 TCP server stopped")
+            log.info("🚀 TCP server stopped")
             
-        async with self._lock:
-            for w in list(self._clients.values()):
-                try:
-                    w.close()
-                except Exception:
-                    pass
-            self._clients.clear()
-            self._sensor_data.clear()
-            self._sensor_timestamps.clear()
-
-    async def parse_and_broadcast(self, raw_message: str):
-        async with self._lock:
-            items = list(self._clients.items())  # [(peer, (writer, parser, bot_type)), ...]
-        
-        out: list[tuple[asyncio.StreamWriter, bytes]] = []
-        for peer, (writer, parser, bot_type) in items:
-            try:
-                payload = parser.parse_command(raw_message)
-                if isinstance(payload, bytes):
-                    data = payload
-                else:
-                    if not payload.endswith("\n"):
-                        payload += "\n"
-                    data = payload.encode("utf-8", errors="replace")
-                out.append((writer, data))
-            except Exception as e:
-                print(f"❌ parse failed for {peer}: {e}")
+        for session in self._clients.clear():
+            session.close()
+        self._sensor_store.clear()
+        if self._shared_sensors is not None:
+            self._shared_sensors.close()
+            self._shared_sensors = None
+        if self._navigation is not None:
+            self._navigation.close()
+            self._navigation = None
 
-        # write (transport stays dumb)
-        for writer, data in out:
+        # Flush buffered received_data last so nothing ingested above is lost
+        await self._persistence.close()
+
+    async def parse_and_broadcast(self, raw_message: str, bot_type: Optional[str] = None):
+        """
+        Parse and encode once per parser class, then enqueue the same bytes
+        object to every session in that group; slow clients only back up
+        their own queue. `bot_type` limits the broadcast to one kind of robot.
+        """
+        snapshot = self._clients.snapshot
+        sessions = snapshot.by_bot_type.get(bot_type, ()) if bot_type else snapshot.by_peer.values()
+
+        groups: dict[tuple[type, str], list[ClientSession]] = {}
+        for session in sessions:
+            groups.setdefault((_parser_class(session.parser), session.framing), []).append(session)
+
+        key = _coalesce_key(raw_message)
+        command_id = self._commands.next_id()  # one id per broadcast keeps the bytes shared
+        for (parser_cls, framing), members in groups.items():
             try:
-                writer.write(data)
+                if framing == FRAMING_BINARY:
+                    data = parser_cls.encode_frame(raw_message, command_id)
+                else:
+                    data = parser_cls.encode_command(raw_message, command_id)
+                name = parser_cls.command_name(raw_message)
             except Exception as e:
-                print(f"❌ write failed: {e}")
-
-        await asyncio.gather(*(w.drain() for w, _ in out), return_exceptions=True)
+                log.error("❌ parse failed for %d %s client(s): %s", len(members), parser_cls.__name__, e)
+                continue
+            for session in members:
+                if session.send(data, key):
+                    self._commands.dispatched(session.peer, command_id, name, data=data)
 
     async def parse_and_send_to(self, peername: tuple, raw_message: str):
-        async with self._lock:
-            sess = self._clients.get(peername)
-        if not sess:
-            print("❌ Unknown peer")
+        session = self._clients.get(peername)
+        if not session:
+            log.error("❌ Unknown peer")
             return
-        writer, parser, bot_type = sess
-        payload = parser.parse_command(raw_message)  # -> str (or bytes; if bytes, handle below)
-        if isinstance(payload, bytes):
-            data = payload
+        command_id = self._commands.next_id()
+        if session.framing == FRAMING_BINARY:
+            data = session.parser.encode_frame(raw_message, command_id)
         else:
-            if not payload.endswith("\n"):
-                payload += "\n"
-            data = payload.encode("utf-8", errors="replace")
-        try:
-            writer.write(data)
-            await writer.drain()
-        except Exception as e:
-            print(f"❌ write failed: {e}")
+            data = session.parser.encode_command(raw_message, command_id)
+        if session.send(data, _coalesce_key(raw_message)):
+            self._commands.dispatched(peername, command_id, session.parser.command_name(raw_message), data=data)
+        else:
+            log.error("❌ write failed: %s is disconnected", peername)
 
     async def connected_peers(self) -> list[tuple]:
-        async with self._lock:
-            return list(self._clients.keys())
-    
-    async def _handle_sensor_data(self, addr: tuple, sensor_data: dict):
-        """Process incoming sensor data from UDP."""
-        async with self._lock:
-            self._sensor_data[addr] = {
-                "timestamp": time.time(),
-                "data": sensor_data
-            }
-        print(f"📊 Sensor data from {addr}: {len(sensor_data.get('scans', []))} scans")
-    
-    async def get_latest_sensor_data(self, addr: tuple, max_age: float = 1.0) -> Optional[dict]:
-        """Get latest sensor data for a client, if recent enough."""
-        async with self._lock:
-            entry = self._sensor_data.get(addr)
-            if entry and (time.time() - entry["timestamp"]) <= max_age:
-                return entry["data"]
-        return None
+        return list(self._clients.snapshot.by_peer)
+
+    async def stats(self) -> dict:
+        """Machine-readable server counters (used by the fleet load harness)."""
+        sessions = self._clients.snapshot.by_peer.values()
+        return {
+            "time": time.time(),
+            "clients": len(sessions),
+            "detached": len(self._detached),
+            "liveness": self._liveness.stats(),
+            "outbound": {
+                "queued": sum(sess.depth for sess in sessions),
+                "max_depth": max((sess.depth for sess in sessions), default=0),
+                "dropped": sum(sess.dropped for sess in sessions),
+                "coalesced": sum(sess.coalesced for sess in sessions),
+            },
+            "commands": self._commands.stats(),
+            "udp": self._udp_ingest.stats(),
+            "lidar_scans": self._lidar_scans.stats(),
+            "persistence": self._persistence.stats(),
+            "shared_sensors": self._shared_sensors.stats() if self._shared_sensors else None,
+            "navigation": self._navigation.stats() if self._navigation else None,
+        }
     
-    async def _handle_sensor_data(self, addr: tuple, sensor_data: dict):
-        """Process incoming sensor data from UDP."""
-        async with self._lock:
-            self._sensor_data[addr] = sensor_data
-            self._sensor_timestamps[addr] = time.time()
-        
+    async def _handle_sensor_batch(self, batch: list[tuple[float, tuple, bytes]]):
+        """Decode, persist and store a batch of UDP sensor packets."""
+        decoded: list[tuple[float, tuple, dict]] = []
+        raw_by_addr: dict[tuple, list[str]] = {}
+        bin_by_addr: dict[tuple, list[bytes]] = {}
+        for recv_time, addr, data in batch:
+            if is_binary_packet(data):
+                try:
+                    sensor_data = decode_packet(data)
+                except ValueError as e:
+                    log.warning("⚠️  Invalid binary packet from %s: %s", addr, e, extra={"peer": addr})
+                    continue
+                decoded.append((recv_time, addr, sensor_data))
+                bin_by_addr.setdefault(addr, []).extend((struct.pack("<I", len(data)), data))
+                continue
+
+            # JSON fallback
+            msg = data.decode('utf-8', errors='replace')
+            try:
+                sensor_data = json.loads(msg)
+            except json.JSONDecodeError:
+                log.warning("⚠️  Invalid JSON from %s: %r...", addr, data[:50], extra={"peer": addr})
+                continue
+            if not isinstance(sensor_data, dict):
+                log.warning("⚠️  Unexpected UDP payload from %s: %r...", addr, data[:50], extra={"peer": addr})
+                continue
+            decoded.append((recv_time, addr, sensor_data))
+            raw_by_addr.setdefault(addr, []).append(msg if msg.endswith("\n") else msg + "\n")
+
+        # Persist raw UDP payloads (one write per peer per batch)
+        for addr, lines in raw_by_addr.items():
+            await self._persist_received('udp', addr, "".join(lines))
+        for addr, chunks in bin_by_addr.items():
+            await self._persist_received('udpbin', addr, b"".join(chunks))
+
+        sources: dict[tuple, RobotSensors] = {}  # identity lookup once per source per batch
+        for recv_time, addr, sensor_data in decoded:
+            try:
+                sensors = sources.get(addr)
+                if sensors is None:
+                    sensors = sources[addr] = self._sensors_for(addr, sensor_data.get("robot_id"))
+                sensors.append(sensor_data, recv_time)
+                if sensor_data.get("type") == "lidar":
+                    self._lidar_scans.add(addr, sensor_data, recv_time)
+            except Exception as e:  # a malformed packet must not cost the rest of the batch
+                log.warning("⚠️  Dropping %s packet from %s: %s", sensor_data.get("type", "unknown"), addr, e,
+                            extra={"peer": addr})
+
         # Optional: Log sensor data (can be verbose for high-frequency data)
-        if DEBUG_MODE:
-            data_type = sensor_data.get('type', 'unknown')
-            print(f"📊 Sensor [{data_type}] from {addr[0]}:{addr[1]}")
+        if log.isEnabledFor(logging.DEBUG):
+            for _, addr, sensor_data in decoded:
+                data_type = sensor_data.get('type', 'unknown')
+                log.debug("📊 Sensor [%s] from %s:%s", data_type, addr[0], addr[1], extra={"peer": addr})
     
+    def _sensors_for(self, addr: tuple, robot_id=None) -> RobotSensors:
+        """Sensor state for a UDP source: its session's when the robot is identified, else per address."""
+        session = self._clients.resolve_udp(addr, robot_id)
+        sensors = self._sensor_store.robot(addr, create=False)
+        if sensors is not None and (session is None or session.sensors is None) and sensors in self._session_sensors:
+            # The address fed another robot's history (re-bound, or a same-IP guess): start its own
+            self._sensor_store.drop(addr)
+            sensors = None
+        if session is None:
+            sensors = sensors or self._sensor_store.robot(addr)
+            self._share(sensors, f"{addr[0]}:{addr[1]}")
+            return sensors
+        session.last_seen = time.monotonic()  # sensor traffic counts as a heartbeat
+        if session.sensors is None:
+            session.sensors = sensors or self._sensor_store.robot(addr)
+            self._session_sensors.add(session.sensors)
+        elif sensors is not session.sensors and addr in session.udp_addrs:
+            self._sensor_store.attach(addr, session.sensors)
+            for old in session.udp_addrs - {addr}:
+                self._lidar_scans.forget(old)  # the robot moved to a new UDP address
+        self._share(session.sensors, session.robot_id or f"{addr[0]}:{addr[1]}")
+        return session.sensors
+
+    def _forget_udp(self, session: ClientSession):
+        """Drop per-address state kept for a session's UDP sources once the session is gone."""
+        for addr in session.udp_addrs:
+            self._lidar_scans.forget(addr)
+            if self._sensor_store.robot(addr, create=False) is session.sensors:
+                self._sensor_store.drop(addr)
+
+    async def _evict_idle_sensors(self, idle_s: float):
+        """Free the sensor history of UDP sources silent for `idle_s` (reconnects leave old ports behind)."""
+        while True:
+            await asyncio.sleep(max(1.0, idle_s / 4))
+            evicted = self._sensor_store.evict_idle(idle_s)
+            for addr in evicted:
+                self._lidar_scans.forget(addr)
+            if evicted:
+                log.debug("🧹 Evicted sensor history of %d idle UDP source(s)", len(evicted))
+
+    def _share(self, sensors: RobotSensors, label: str):
+        """Mirror a robot's new rows into shared memory under `label` (robot_id, else its UDP "ip:port")."""
+        if self._shared_sensors is None:
+            return
+        if sensors.shared is None or not sensors.shared.active:
+            sensors.shared = self._shared_sensors.slot(label)
+        elif sensors.shared.label != label:
+            self._shared_sensors.rename(sensors.shared, label)
+
+    def robot_session(self, robot_id) -> Optional[ClientSession]:
+        """Session registered with `robot_id`; its latest sensors are `session.sensors.latest`."""
+        return self._clients.by_robot_id(str(robot_id))
+
+    def _on_lidar_scan(self, scan: LidarScan):
+        """Keep reassembled sweeps in sensor history."""
+        self._sensor_store.append_row(scan.robot, "lidar_scan", np.vstack((scan.angles, scan.distances)), scan.timestamp)
+        if log.isEnabledFor(logging.DEBUG):
+            state = "complete" if scan.complete else "partial"
+            log.debug("🛰️  Lidar scan %s from %s: %d points (%s)", scan.scan_id, scan.robot, len(scan.angles), state)
+
+    def subscribe_lidar_scans(self, maxsize: int = 16) -> asyncio.Queue:
+        """Queue of reassembled LidarScan objects for downstream consumers."""
+        return self._lidar_scans.subscribe(maxsize)
+
     async def get_latest_sensor_data(self, addr: tuple, max_age: float = 1.0) -> Optional[dict]:
         """Get latest sensor data for a client (if recent enough)."""
-        async with self._lock:
-            if addr not in self._sensor_data:
-                return None
-            
-            age = time.time() - self._sensor_timestamps.get(addr, 0)
-            if age > max_age:
-                return None  # Data too old
-            
-            return self._sensor_data[addr].copy()
+        entry = self._sensor_store.latest(addr)
+        if entry is None:
+            return None
+
+        timestamp, data = entry
+        if time.time() - timestamp > max_age:
+            return None  # Data too old
+
+        return data.copy()
+
+    async def get_sensor_history(self, addr: tuple, sensor_type: str, seconds: float) -> Optional[SensorWindow]:
+        """Last `seconds` of `sensor_type` samples for a client, as array views."""
+        return self._sensor_store.last(addr, sensor_type, seconds)
+
+    async def get_sensor_range(self, addr: tuple, sensor_type: str, t0: float, t1: float) -> Optional[SensorWindow]:
+        """`sensor_type` samples received between t0 and t1 (inclusive), as array views."""
+        return self._sensor_store.between(addr, sensor_type, t0, t1)
     
     def send_udp(self, addr: tuple, data: dict):
         """Send UDP message to a specific address (optional, for UDP responses)."""
@@ -346,128 +563,163 @@ class RobotServer:
             self._udp_transport.sendto(message, addr)
 
     async def _write_to_writers(self, peernames, message: str):
-        if not message.endswith("\n"):
-            message += "\n"
-        data = message.encode("utf-8", errors="replace")
-        async with self._lock:
-            tuples = [self._clients.get(p) for p in peernames if p in self._clients]
-            writers = [t[0] for t in tuples]
-            parsers = [t[1] for t in tuples]
-        for w, p in zip(writers, parsers):
-            if not w:
-                continue
-            try:
-                w.write(data)
-            except Exception as e:
-                print(f"❌ write failed: {e}")
-        await asyncio.gather(*(w.drain() for w in writers if w), return_exceptions=True)
+        by_peer = self._clients.snapshot.by_peer
+        sessions = [by_peer[p] for p in peernames if p in by_peer]
+        encoded: dict[str, bytes] = {}  # framing -> bytes, shared across sessions
+        for session in sessions:
+            data = encoded.get(session.framing)
+            if data is None:
+                data = encoded[session.framing] = _encode_message(session, message)
+            session.send(data)
 
     # ---------- Per-client handler ----------
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-# Replace lines 321-384 in server.py with this debugged version:
-
         peer = writer.get_extra_info("peername")  # (ip, port)
-        print(f"✅ Connection from {peer}")
-        print(f"🔍 [DEBUG] Waiting for registration message...")
+        log.info("✅ Connection from %s", peer)
+        log.debug("🔍 [DEBUG] Waiting for registration message...")
 
-        async with self._lock:
-            self._clients[peer] = (writer, R1D4CommandParser(), "R1D4")
+        session = ClientSession(peer, writer, R1D4CommandParser(), "R1D4",
+                                CLIENT_QUEUE_SIZE, CLIENT_QUEUE_POLICY, CLIENT_DRAIN_TIMEOUT)
+        session.start()
+        self._clients.add(session)
+        self._liveness.watch(session)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)  # let the OS notice dead peers too
 
         try:
             if MANUAL_MODE:
                 # In manual mode, per-client handler does NOT read stdin.
                 # It just keeps the connection open and optionally logs client messages.
                 while True:
-                    print(f"🔍 [DEBUG] {peer} - Calling readline()...")
-                    data = await reader.readline()
-                    print(f"🔍 [DEBUG] {peer} - Received {len(data) if data else 0} bytes: {data[:100] if data else 'EMPTY'}")
-                    
-                    if not data:
-                        print(f"🔍 [DEBUG] {peer} - No data received, breaking")
-                        break
-                    
-                    msg = data.decode("utf-8", errors="replace").rstrip()
-                    # Persist raw TCP inbound payload
-                    try:
-                        await self._persist_received('tcp', peer, data.decode('utf-8', errors='replace'))
-                    except Exception as _e:
-                        if DEBUG_MODE:
-                            print(f"⚠️ Failed to persist TCP from {peer}: {_e}")
-                    
-                    print(f"🔍 [DEBUG] {peer} - Decoded message: '{msg}' (length: {len(msg)})")
+                    if session.framing == FRAMING_BINARY:
+                        # Negotiated at registration: acks are handled here, JSON frames fall through
+                        msg = await self._read_binary_message(session, reader)
+                        if msg is None:
+                            log.debug("🔍 [DEBUG] %s - Connection closed, breaking", peer, extra={"peer": peer})
+                            break
+                    else:
+                        log.debug("🔍 [DEBUG] %s - Calling readline()...", peer, extra={"peer": peer})
+                        data = await reader.readline()
+                        log.debug("🔍 [DEBUG] %s - Received %d bytes: %r", peer, len(data), data[:100] if data else "EMPTY", extra={"peer": peer})
+                        
+                        if not data:
+                            log.debug("🔍 [DEBUG] %s - No data received, breaking", peer, extra={"peer": peer})
+                            break
+                        
+                        msg = data.decode("utf-8", errors="replace").rstrip()
+                        # Persist raw TCP inbound payload
+                        try:
+                            await self._persist_received('tcp', peer, data.decode('utf-8', errors='replace'))
+                        except Exception as _e:
+                            log.debug("⚠️ Failed to persist TCP from %s: %s", peer, _e, extra={"peer": peer})
+                        
+                        log.debug("🔍 [DEBUG] %s - Decoded message: '%s' (length: %d)", peer, msg, len(msg), extra={"peer": peer})
                     
+                    session.last_seen = time.monotonic()
                     if msg:
-                        print(f"📥 From {peer}: {msg}")
+                        log.info("📥 From %s: %s", peer, msg, extra={"peer": peer})
                         registered = False
+                        is_ack = False
+                        is_heartbeat = False
                         
                         # Check if it's JSON
-                        print(f"🔍 [DEBUG] {peer} - Checking if JSON (starts with '{{': {msg.startswith('{')})")
+                        log.debug("🔍 [DEBUG] %s - Checking if JSON (starts with '{': %s)", peer, msg.startswith("{"), extra={"peer": peer})
                         if msg.startswith("{"):
                             try:
                                 json_msg = json.loads(msg)
-                                print(f"🔍 [DEBUG] {peer} - Successfully parsed JSON: {json_msg}")
+                                log.debug("🔍 [DEBUG] %s - Successfully parsed JSON: %s", peer, json_msg, extra={"peer": peer})
                             except Exception as e:
-                                print(f"🔍 [DEBUG] {peer} - JSON parse failed: {e}")
+                                log.debug("🔍 [DEBUG] %s - JSON parse failed: %s", peer, e, extra={"peer": peer})
                                 json_msg = None
                             
                             if isinstance(json_msg, dict):
                                 # Preferred explicit registration message
                                 if json_msg.get("command") == "register" and json_msg.get("bot"):
                                     bot_type = json_msg.get("bot")
-                                    print(f"🔍 [DEBUG] {peer} - Found 'register' command with bot={bot_type}")
-                                    try:
-                                        parser = get_parser(bot_type)
-                                    except Exception as e:
-                                        print(f"🔍 [DEBUG] {peer} - get_parser failed: {e}, defaulting to R1D4")
-                                        parser = R1D4CommandParser(); bot_type = "R1D4"
-                                    print(f"✅ [REGISTRATION] Client {peer} registered as {bot_type}")
-                                    print(f"   Parser type: {type(parser).__name__}")
-                                    async with self._lock:
-                                        self._clients[peer] = (writer, parser, bot_type)
-                                    parser.list_available_commands()
-                                    registered = True
+                                    log.debug("🔍 [DEBUG] %s - Found 'register' command with bot=%s", peer, bot_type, extra={"peer": peer})
+                                    resumed, status = self._resume(session, json_msg.get("robot_id"), bot_type, json_msg.get("framing"))
+                                    if resumed is not None:
+                                        # Same robot within the grace window: keep parser, sensors and queued commands
+                                        session = resumed
+                                        registered = True
+                                    else:
+                                        try:
+                                            parser = get_parser(bot_type)
+                                        except Exception as e:
+                                            log.debug("🔍 [DEBUG] %s - get_parser failed: %s, defaulting to R1D4", peer, e, extra={"peer": peer})
+                                            parser = R1D4CommandParser(); bot_type = "R1D4"
+                                        log.info("✅ [REGISTRATION] Client %s registered as %s", peer, bot_type)
+                                        log.info("   Parser type: %s", _parser_class(parser).__name__)
+                                        # On CONFLICT the live robot keeps the id (and its UDP routing)
+                                        self._register(session, parser, bot_type,
+                                                       json_msg.get("robot_id") if status != "CONFLICT" else None)
+                                        registered = True
+                                        if json_msg.get("framing"):
+                                            self._negotiate_framing(session, json_msg["framing"])
                                 
                                 # Fallback: identity field
                                 elif not registered and json_msg.get("identity"):
                                     bot_type = json_msg.get("identity")
-                                    print(f"🔍 [DEBUG] {peer} - Found 'identity' field: {bot_type}")
+                                    log.debug("🔍 [DEBUG] %s - Found 'identity' field: %s", peer, bot_type, extra={"peer": peer})
                                     try:
                                         parser = get_parser(bot_type)
                                     except Exception as e:
-                                        print(f"🔍 [DEBUG] {peer} - get_parser failed: {e}, defaulting to R1D4")
+                                        log.debug("🔍 [DEBUG] %s - get_parser failed: %s, defaulting to R1D4", peer, e, extra={"peer": peer})
                                         parser = R1D4CommandParser(); bot_type = "R1D4"
-                                    print(f"✅ [REGISTRATION/IDENTITY] Client {peer} registered as {bot_type}")
-                                    print(f"   Parser type: {type(parser).__name__}")
-                                    async with self._lock:
-                                        self._clients[peer] = (writer, parser, bot_type)
-                                    parser.list_available_commands()
+                                    log.info("✅ [REGISTRATION/IDENTITY] Client %s registered as %s", peer, bot_type)
+                                    log.info("   Parser type: %s", _parser_class(parser).__name__)
+                                    self._register(session, parser, bot_type, json_msg.get("robot_id"))
                                     registered = True
+
+                                # Resume after a reconnect: {"command": "resume", "robot_id": "7"}
+                                elif json_msg.get("command") == "resume" and json_msg.get("robot_id") is not None:
+                                    registered = True
+                                    resumed, status = self._resume(session, json_msg["robot_id"], None, json_msg.get("framing"))
+                                    if resumed is None:
+                                        if status == "UNKNOWN":  # CONFLICT was already answered
+                                            self._send_json(session, json.dumps({"command": "resume", "status": status}))
+                                    else:
+                                        session = resumed
+
+                                # Heartbeats: {"command": "ping"} gets a pong; a pong answers our probe
+                                elif json_msg.get("command") in ("ping", "pong"):
+                                    is_heartbeat = True
+                                    if json_msg["command"] == "ping":
+                                        self._send_json(session, json.dumps({"command": "pong"}))
+
+                                # Command ack: {"id": 7, "status": "SUCCESS", ...} or {"status": "completed", "command": "move"}
+                                elif "status" in json_msg:
+                                    is_ack = True
+                                    match = self._commands.acked_by(peer, json_msg)
+                                    if match:
+                                        cmd, latency = match
+                                        log.debug("✅ Ack %s (%s) from %s: %s in %.1f ms", cmd.command_id, cmd.command,
+                                                  peer, json_msg.get("status"), latency * 1000, extra={"peer": peer})
                         
                         # Text fallback
-                        if not registered:
+                        if not registered and not is_ack and not is_heartbeat:
                             lower = msg.lower()
-                            print(f"🔍 [DEBUG] {peer} - Checking text fallback. lowercase msg: '{lower}'")
-                            print(f"🔍 [DEBUG] {peer} - msg.strip() == 'HOVERBOT': {msg.strip() == 'HOVERBOT'}")
-                            print(f"🔍 [DEBUG] {peer} - 'hoverbot' in lower: {'hoverbot' in lower}")
+                            log.debug("🔍 [DEBUG] %s - Checking text fallback. lowercase msg: '%s'", peer, lower, extra={"peer": peer})
+                            log.debug("🔍 [DEBUG] %s - msg.strip() == 'HOVERBOT': %s", peer, msg.strip() == "HOVERBOT", extra={"peer": peer})
+                            log.debug("🔍 [DEBUG] %s - 'hoverbot' in lower: %s", peer, "hoverbot" in lower, extra={"peer": peer})
                             
                             # UPDATED CONDITION - handle both cases
                             if msg.strip() == "HOVERBOT" or "hoverbot" in lower:
                                 bot_type = "HOVERBOT"
-                                print(f"🔍 [DEBUG] {peer} - Text fallback matched! Setting bot_type=HOVERBOT")
+                                log.debug("🔍 [DEBUG] %s - Text fallback matched! Setting bot_type=HOVERBOT", peer, extra={"peer": peer})
                                 try:
                                     parser = get_parser(bot_type)
-                                    print(f"🔍 [DEBUG] {peer} - get_parser succeeded")
+                                    log.debug("🔍 [DEBUG] %s - get_parser succeeded", peer, extra={"peer": peer})
                                 except Exception as e:
-                                    print(f"🔍 [DEBUG] {peer} - get_parser failed: {e}, defaulting to R1D4")
+                                    log.debug("🔍 [DEBUG] %s - get_parser failed: %s, defaulting to R1D4", peer, e, extra={"peer": peer})
                                     parser = R1D4CommandParser(); bot_type = "R1D4"
-                                print(f"✅ [REGISTRATION/FALLBACK] Client {peer} registered as {bot_type}")
-                                print(f"   Parser type: {type(parser).__name__}")
-                                async with self._lock:
-                                    self._clients[peer] = (writer, parser, bot_type)
-                                parser.list_available_commands()
+                                log.info("✅ [REGISTRATION/FALLBACK] Client %s registered as %s", peer, bot_type)
+                                log.info("   Parser type: %s", _parser_class(parser).__name__)
+                                self._register(session, parser, bot_type)
                             else:
-                                print(f"🔍 [DEBUG] {peer} - No registration pattern matched")
+                                log.debug("🔍 [DEBUG] %s - No registration pattern matched", peer, extra={"peer": peer})
 
             else:
                 # Voice-activated flow (per client)
@@ -476,7 +728,11 @@ class RobotServer:
                     if not activated:
                         break
                     voice_command = await capture_voice()
-                    response_json = _build_response_from_text_or_nav(voice_command)
+                    if session.navigation is None:
+                        session.navigation = NavigationSession(session.robot_id)
+                    # Interpreting and planning block; planning is per-robot state only, so a thread is safe
+                    response_json = await asyncio.to_thread(_build_response_from_text_or_nav, voice_command,
+                                                            session.navigation)
 
                     try:
                         if response_json and response_json != "[]":
@@ -484,29 +740,163 @@ class RobotServer:
                         else:
                             await a_tts_speak("I didn't quite understand.")
                     except Exception as e:
-                        print(f"❌ TTS speak failed: {e}")
+                        log.error("❌ TTS speak failed: %s", e)
 
-                    await self._send_json(writer, response_json)
+                    self._send_json(session, response_json)
 
         except asyncio.CancelledError:
             pass
         except Exception as e:
-            print(f"❌ Handler error for {peer}: {e}")
+            log.error("❌ Handler error for %s: %s", peer, e)
         finally:
+            superseded = session.peer != peer  # the robot already resumed on a newer connection
+            resumable = (session.robot_id is not None and RESUME_GRACE_S > 0 and not self._stopping
+                         and self._clients.get(peer) is session)
+            if resumable:
+                self._park(session)
+            elif not superseded:
+                session.close()
+                self._commands.forget(peer)
+                self._liveness.forget(session)
+                self._forget_udp(session)
             try:
-                writer.close()
                 await writer.wait_closed()
             except Exception:
                 pass
-            async with self._lock:
-                self._clients.pop(peer, None)
-            print(f"🔌 Client disconnected: {peer}")
+            if superseded:
+                log.info("🔌 Client disconnected: %s (robot %s resumed on %s)", peer, session.robot_id, session.peer)
+            elif resumable:
+                log.info("🔌 Client disconnected: %s (robot %s may resume within %.0fs)", peer, session.robot_id, RESUME_GRACE_S)
+            else:
+                self._clients.remove(session)
+                log.info("🔌 Client disconnected: %s", peer)
+
+    def _probe_session(self, session: ClientSession):
+        """Ask a silent robot for a reply; any answer (pong, ack, error) counts."""
+        log.debug("💓 Probing %s", session.peer, extra={"peer": session.peer})
+        self._send_json(session, json.dumps({"command": "heartbeat"}))
+
+    def _evict_session(self, session: ClientSession, silent: float):
+        """Close a silent connection; its handler then parks or removes the session as usual."""
+        log.warning("💤 No traffic from %s for %.0fs, evicting", session.peer, silent)
+        session.close()
+
+    def _park(self, session: ClientSession):
+        """Keep a dropped robot's session (parser, sensors, in-flight commands) for RESUME_GRACE_S."""
+        session.detach()
+        previous = self._detached.pop(session.robot_id, None)
+        if previous is not None and previous[0] is not session:
+            previous[1].cancel()
+            self._expire_detached(previous[0])
+        timer = asyncio.get_running_loop().call_later(RESUME_GRACE_S, self._expire_detached, session)
+        self._detached[session.robot_id] = (session, timer)
+
+    def _expire_detached(self, session: ClientSession):
+        if self._detached.get(session.robot_id, (None,))[0] is session:
+            del self._detached[session.robot_id]
+        if session.detached:
+            session.close()
+            self._commands.forget(session.peer)
+            self._liveness.forget(session)
+            self._forget_udp(session)
+            self._clients.remove(session)
+            log.info("⌛ Robot %s did not resume; session %s closed", session.robot_id, session.peer)
+
+    def _resume(self, fresh: ClientSession, robot_id, bot_type: Optional[str],
+                framing: Optional[str]) -> tuple[Optional[ClientSession], str]:
+        """
+        Move a reconnecting robot's connection into its detached session and
+        replay its unacknowledged commands in order. Returns (resumed session,
+        "OK"), or (None, "UNKNOWN") if there is nothing to resume, or (None,
+        "CONFLICT") if another live robot holds the id; register normally then.
+        """
+        if robot_id is None:
+            return None, "UNKNOWN"
+        parked = self._detached.get(str(robot_id))
+        if parked is not None:
+            session, timer = parked
+        else:
+            # The old connection may still look alive (half-open after a Wi-Fi drop)
+            session, timer = self._clients.by_robot_id(str(robot_id)), None
+            if session is None or session is fresh:
+                return None, "UNKNOWN"
+        requested = FRAMING_BINARY if framing == FRAMING_BINARY else FRAMING_LINE
+        if (bot_type is not None and bot_type != session.bot_type) or requested != session.framing:
+            return None, "UNKNOWN"  # changed firmware or protocol: start over (the old session expires)
+        if timer is None and session.peer[0] != fresh.peer[0] and self._liveness.state(session) != IDLE:
+            # Still talking from another address: a second robot with the same id, not a reconnect
+            log.warning("⚠️ Robot id %s is live on %s; not handing it to %s", robot_id, session.peer, fresh.peer)
+            self._send_json(fresh, json.dumps({"command": "resume", "status": "CONFLICT"}))
+            return None, "CONFLICT"
+        if timer is not None:
+            del self._detached[session.robot_id]
+            timer.cancel()
+        else:
+            session.detach()  # its handler sees the closed connection and leaves the session alone
+
+        old_peer = session.peer
+        session.take_over(fresh)
+        self._clients.reattach(session, old_peer)
+        self._commands.rekey(old_peer, session.peer)
+        self._liveness.watch(session)
+        if framing:
+            self._negotiate_framing(session, framing)
+        replay = [cmd for cmd in self._commands.in_flight(session.peer) if cmd.data][-session.max_queue:]
+        for cmd in replay:
+            session.send(cmd.data)
+        log.info("🔁 Robot %s resumed on %s (was %s), replayed %d command(s)",
+                 session.robot_id, session.peer, old_peer, len(replay))
+        return session, "OK"
+
+    def _register(self, session: ClientSession, parser, bot_type: str, robot_id=None):
+        """Apply a registration and re-index the session registry."""
+        session.parser, session.bot_type = parser, bot_type
+        if robot_id is not None:
+            session.robot_id = str(robot_id)
+        self._clients.update(session)
+
+    def _send_json(self, session: ClientSession, json_str: str):
+        session.send(_encode_message(session, json_str))
+
+    def _negotiate_framing(self, session: ClientSession, requested: str):
+        """Confirm the framing in the current framing, then switch both directions."""
+        framing = FRAMING_BINARY if requested == FRAMING_BINARY else FRAMING_LINE
+        self._send_json(session, json.dumps({"command": "register", "status": "OK", "framing": framing}))
+        session.framing = framing
+        log.info("🔧 %s uses %s framing", session.peer, framing)
+
+    async def _read_binary_message(self, session: ClientSession, reader: asyncio.StreamReader) -> Optional[str]:
+        """
+        Read one frame from a binary-framing session. Returns None on EOF, the
+        JSON text of a JSON frame, or "" once an ACK (or unknown) frame is handled.
+        """
+        try:
+            body = await read_frame(reader)
+        except asyncio.IncompleteReadError:
+            return None
+        except ValueError as e:
+            log.warning("⚠️ Bad frame from %s: %s", session.peer, e, extra={"peer": session.peer})
+            return ""
+        frame = LENGTH.pack(len(body)) + body
+        await self._persist_received('tcpbin', session.peer, struct.pack("<I", len(frame)) + frame)
 
-    async def _send_json(self, writer: asyncio.StreamWriter, json_str: str):
-        if not json_str.endswith("\n"):
-            json_str += "\n"
-        writer.write(json_str.encode("utf-8", errors="replace"))
-        await writer.drain()
+        frame_type = body[0]
+        if frame_type == FRAME_JSON:
+            return bytes(body[1:]).decode("utf-8", errors="replace").strip()
+        if frame_type == FRAME_ACK:
+            try:
+                ack = decode_ack(body)
+            except ValueError as e:
+                log.warning("⚠️ Bad ack frame from %s: %s", session.peer, e, extra={"peer": session.peer})
+                return ""
+            match = self._commands.acked_by(session.peer, ack)
+            if match:
+                cmd, latency = match
+                log.debug("✅ Ack %s (%s) from %s: %s in %.1f ms", cmd.command_id, cmd.command,
+                          session.peer, ack["status"], latency * 1000, extra={"peer": session.peer})
+            return ""
+        log.warning("⚠️ Unknown frame type %d from %s", frame_type, session.peer, extra={"peer": session.peer})
+        return ""
 
     # ---------- Single stdin router (manual dispatcher) ----------
 
@@ -526,13 +916,17 @@ class RobotServer:
                 cmd = (await a_input("\nTarget (list | all | <index> | help | quit): ")).strip().lower()
 
                 if cmd == "help":
-                    print("Commands:\n  list      - show connected clients\n  all       - broadcast next manual command\n  <index>   - send to indexed client\n  sensors   - show latest sensor data\n  quit      - stop server")
+                    console.info("Commands:\n  list      - show connected clients\n  all       - broadcast next manual command\n  <index>   - send to indexed client\n  sensors   - show latest sensor data\n  stats     - print server counters as one JSON line\n  latency   - command round-trip latency per robot and command\n  quit      - stop server")
                 elif cmd == "list":
                     await self._print_client_list()
                 elif cmd == "sensors":
                     await self._print_sensor_data()
+                elif cmd == "stats":
+                    console.info("STATS %s", json.dumps(await self.stats()))
+                elif cmd == "latency":
+                    await self._print_latency()
                 elif cmd == "quit":
-                    print("🛑 Shutting down...")
+                    log.info("🛑 Shutting down...")
                     # stop() will cancel this task from outside main()
                     asyncio.get_running_loop().call_soon(asyncio.create_task, self.stop())
                     return
@@ -541,19 +935,22 @@ class RobotServer:
                     try:
                         idx = int(cmd)
                     except ValueError:
-                        print("❌ Unknown command. Type 'help' or 'list'.")
+                        console.info("❌ Unknown command. Type 'help' or 'list'.")
                         continue
                     peers = await self.connected_peers()
                     if idx < 0 or idx >= len(peers):
-                        print("❌ Invalid index.")
+                        console.info("❌ Invalid index.")
                         continue
                     target = peers[idx]
-                    writer, parser, bot_type = self._clients.get(target)
-                    print(f"\n🤖 Selected: {bot_type} at {target}")
-                    parser.list_available_commands()
+                    session = self._clients.get(target)
+                    if session is None:
+                        console.info("❌ Client disconnected.")
+                        continue
+                    console.info("\n🤖 Selected: %s at %s", session.bot_type, target)
+                    session.parser.list_available_commands()
                     raw_message = await a_input(f"\nEnter command for {target}: ")
                     await self.parse_and_send_to(target, raw_message)
-                    print(f"📤 Sending to {target}: {raw_message}")
+                    log.info("📤 Sending to %s: %s", target, raw_message)
                     await a_tts_speak("Executing manual command.")
                 elif cmd == "all":
                     raw_message = await a_input("\nEnter command to broadcast to all: ")
@@ -563,49 +960,135 @@ class RobotServer:
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"❌ Router error: {e}")
+                log.error("❌ Router error: %s", e)
                 await asyncio.sleep(0.2)
 
+    def client_rows(self) -> list[dict]:
+        """One JSON-serialisable row per session for the console `list` (cluster workers send these)."""
+        now = time.monotonic()
+        rows = []
+        for p, session in self._clients.snapshot.by_peer.items():
+            q = session.stats()
+            rows.append({
+                "peer": list(p), "bot_type": session.bot_type, "parser": _parser_class(session.parser).__name__,
+                "framing": session.framing, "robot_id": session.robot_id,
+                "state": self._liveness.state(session, now), "seen_s": now - session.last_seen,
+                "depth": q["depth"], "max_queue": session.max_queue, "dropped": q["dropped"],
+                "last_latency_ms": q["last_latency_ms"], "max_latency_ms": q["max_latency_ms"],
+                "udp": [list(a) for a in sorted(session.udp_addrs)],
+            })
+        return rows
+
+    def latency_report(self) -> dict:
+        """Command counters and latency histogram state() per robot and command, for merging across workers."""
+        return {
+            "counters": self._commands.stats(),
+            "by_robot": {_label(name): hist.state() for name, hist in self._commands.by_robot.items()},
+            "by_command": {name: hist.state() for name, hist in self._commands.by_command.items()},
+        }
+
+    def sensor_report(self) -> dict:
+        """Ingest counters and the latest packet per robot, values rendered for the console."""
+        latest = []
+        for addr, timestamp, data in self._sensor_store.latest_items():
+            sensor_type = data.get('type', 'unknown')
+            ring = self._sensor_store.ring(addr, sensor_type)
+            latest.append({"robot": list(addr), "timestamp": timestamp, "type": sensor_type,
+                           "samples": len(ring) if ring else 0,
+                           "fields": [[key, str(value)] for key, value in data.items() if key != 'type']})
+        return {
+            "udp": self._udp_ingest.stats(),
+            "lidar_scans": self._lidar_scans.stats(),
+            "persistence": self._persistence.stats(),
+            "latest": latest,
+        }
+
     async def _print_client_list(self):
-        peers = await self.connected_peers()
-        if not peers:
-            print("No clients connected.")
-            return
-        print("Connected clients:")
-        async with self._lock:
-            for i, p in enumerate(peers):
-                writer, parser, bot_type = self._clients.get(p, (None, None, "Unknown"))
-                parser_name = type(parser).__name__ if parser else "None"
-                print(f"  [{i}] {p[0]}:{p[1]} - {bot_type} ({parser_name})")
-    
+        _print_client_rows(list(enumerate(self.client_rows())))
+
+    async def _print_latency(self):
+        _print_latency_report(self._commands.stats(), self._commands.by_robot, self._commands.by_command)
+
     async def _print_sensor_data(self):
-        """Display latest sensor data from all sources."""
-        async with self._lock:
-            if not self._sensor_data:
-                print("No sensor data received.")
-                return
-            
-            print("\n📊 Latest Sensor Data:")
-            current_time = time.time()
-            for addr, data in self._sensor_data.items():
-                age = current_time - self._sensor_timestamps.get(addr, 0)
-                sensor_type = data.get('type', 'unknown')
-                print(f"  {addr[0]}:{addr[1]} ({sensor_type}) - {age:.2f}s ago")
-                
-                # Display key sensor values
-                for key, value in data.items():
-                    if key != 'type':
-                        print(f"    {key}: {value}")
-            print()
+        _print_sensor_report(self.sensor_report())
+
+# ---------- Console output (also used by the cluster coordinator) ----------
+
+def _label(name) -> str:
+    return f"{name[0]}:{name[1]}" if isinstance(name, (tuple, list)) else str(name)
+
+def _print_client_rows(rows: list[tuple[int, dict]]):
+    """Print `list` rows as (console index, client_rows() entry)."""
+    if not rows:
+        console.info("No clients connected.")
+        return
+    console.info("Connected clients:")
+    for i, row in rows:
+        identity = f" id {row['robot_id']}," if row["robot_id"] is not None else ""
+        worker = f", worker {row['worker']}" if "worker" in row else ""
+        udp = ", ".join(f"{a[0]}:{a[1]}" for a in row["udp"]) or "none"
+        console.info("  [%d] %s:%s - %s (%s, %s%s)%s %s, seen %.1fs ago, queue %d/%d, %d dropped, "
+                     "write %.1f ms (max %.1f ms), sensors %s",
+                     i, row["peer"][0], row["peer"][1], row["bot_type"], row["parser"], row["framing"], worker,
+                     identity, row["state"], row["seen_s"], row["depth"], row["max_queue"], row["dropped"],
+                     row["last_latency_ms"], row["max_latency_ms"], udp)
+
+def _print_latency_report(c: dict, by_robot: dict, by_command: dict):
+    """Dispatch-to-ack latency histograms per robot and per command type."""
+    console.info("⏱️ Commands: %d dispatched, %d acked (%d failed), %d in flight, %d timed out, %d unmatched acks",
+                 c["dispatched"], c["acked"], c["failed"], c["in_flight"], c["timed_out"], c["unmatched_acks"])
+    for title, hists in (("robot", by_robot), ("command", by_command)):
+        if not hists:
+            continue
+        console.info("  By %s:", title)
+        for name, hist in hists.items():
+            h = hist.summary()
+            console.info("    %-24s n=%-6d p50=%.1f ms  p95=%.1f ms  p99=%.1f ms  max=%.1f ms",
+                         _label(name), h["count"], h["p50_ms"], h["p95_ms"], h["p99_ms"], h["max_ms"])
+
+def _print_sensor_report(report: dict):
+    """Display latest sensor data from all sources."""
+    ingest = report["udp"]
+    console.info("📥 UDP ingest: %d received, %d processed, %d dropped, %d queued",
+                 ingest["received"], ingest["processed"], ingest["dropped"], ingest["depth"])
+    scans = report["lidar_scans"]
+    console.info("🛰️  Lidar scans: %d complete, %d partial, %d expired, %d pending",
+                 scans["completed"], scans["partial"], scans["expired"], scans["pending"])
+    persist = report["persistence"]
+    console.info("💾 Persistence: %d bytes written, %d pending, %d open files, %d backpressure waits",
+                 persist["bytes_written"], persist["pending_bytes"], persist["open_files"], persist["backpressure_waits"])
+    if not report["latest"]:
+        console.info("No sensor data received.")
+        return
+
+    console.info("\n📊 Latest Sensor Data:")
+    current_time = time.time()
+    for entry in report["latest"]:
+        addr = entry["robot"]
+        history = f", {entry['samples']} samples buffered" if entry["samples"] else ""
+        console.info("  %s:%s (%s) - %.2fs ago%s", addr[0], addr[1], entry["type"], current_time - entry["timestamp"], history)
+
+        # Display key sensor values
+        for key, value in entry["fields"]:
+            console.info("    %s: %s", key, value)
+    console.info("")
 
 async def main():
-    server = RobotServer(HOST, PORT, UDP_PORT)
-    await server.start()
+    listener = setup_logging(DEBUG_MODE, LOG_JSON, LOG_RATE, LOG_BURST)
+    log.info("Starting Hybrid Robot Server (TCP + UDP)...")
+    if SERVER_WORKERS > 1:
+        from src.llm.cluster import ClusterCoordinator  # imports this module
+        server = ClusterCoordinator(HOST, PORT, UDP_PORT, SERVER_WORKERS, SERVER_IPC_PATH or None)
+    else:
+        server = RobotServer(HOST, PORT, UDP_PORT)
     try:
+        await server.start()
         await server.serve_forever()
     finally:
-        await server.stop()
+        try:
+            await server.stop()
+        finally:
+            listener.stop()
 
 if __name__ == "__main__":
-    print("Starting Hybrid Robot Server (TCP + UDP)...")
     asyncio.run(main())
\ No newline at end of file
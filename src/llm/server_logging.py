@@ -0,0 +1,129 @@
+"""
+Non-blocking logging for the server.
+
+Log calls on the event loop only build a LogRecord and put it on a queue; a
+QueueListener thread formats and writes it. Formatting is lazy: messages use
+%-style arguments, DEBUG records are dropped by the level check before any
+formatting when SERVER_DEBUG is off, and the remaining records are formatted
+on the listener thread, not the event loop.
+
+Records logged with extra={"peer": addr} are rate limited per (peer, message
+template) with a token bucket. When a suppressed message is allowed again it
+carries the number of copies that were dropped.
+
+Output is the plain message (the console look is unchanged) or, with
+SERVER_LOG_JSON=1, one JSON object per line.
+
+    log = get_logger()
+    log.debug("%s - Received %d bytes", peer, len(data), extra={"peer": peer})
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Optional, TextIO
+
+ROOT_LOGGER = "cap_server"
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """The server logger, or a child such as get_logger("console")."""
+    return logging.getLogger(ROOT_LOGGER if not name else f"{ROOT_LOGGER}.{name}")
+
+
+class PeerRateLimitFilter(logging.Filter):
+    """Token bucket per (peer, message template); records without a peer pass untouched."""
+
+    def __init__(self, rate: float = 5.0, burst: int = 20, max_keys: int = 10000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: dict[tuple, list] = {}  # key -> [tokens, last refill, suppressed]
+        self.suppressed_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        peer = getattr(record, "peer", None)
+        if peer is None or self.rate <= 0:
+            return True
+        key = (peer, record.msg)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.clear()
+            bucket = self._buckets[key] = [float(self.burst), now, 0]
+        else:
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1.0:
+            bucket[2] += 1
+            self.suppressed_total += 1
+            return False
+        bucket[0] -= 1.0
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() formats the message on the calling thread; this one
+    passes the record through so formatting happens on the listener thread.
+    Callers pass values that are not mutated after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class PlainFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (suppressed {suppressed} similar)"
+        return text
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        peer = getattr(record, "peer", None)
+        if peer is not None:
+            entry["peer"] = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) and len(peer) >= 2 else str(peer)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(debug: bool = False, json_output: bool = False, rate: float = 5.0, burst: int = 20,
+                  stream: TextIO | None = None) -> logging.handlers.QueueListener:
+    """Route the server logger through a queue to a background writer thread; returns the started listener."""
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter() if json_output else PlainFormatter("%(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _LazyQueueHandler(log_queue)
+    handler.addFilter(PeerRateLimitFilter(rate, burst))
+
+    logger = get_logger()
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,144 @@
+"""
+Copy-on-write registry of connected sessions.
+
+Readers (UDP batches, broadcasts, `connected_peers()`, the console) take
+`registry.snapshot` and use it without a lock: a snapshot is never modified.
+Writers (connect, register, resume, disconnect) build a new snapshot and swap it in
+with a single attribute assignment. Everything runs on the event loop and no
+writer awaits while building, so readers always see either the old or the
+new snapshot in full.
+
+Robot identity: sensor packets arrive from a UDP address that never matches
+the TCP peername. `resolve_udp()` maps a UDP source to its session in O(1):
+the packet's robot_id when it names a registered robot, else the session the
+address is bound to, else the only session connected from the same IP. A
+robot_id match binds (or re-binds) the address with one snapshot swap, so
+packets without an id keep reaching that robot; the same-IP guess never
+binds, since a robot that has not registered yet may share the IP.
+
+Writes are rare (one per connection event) and cost O(n) to rebuild the
+indexes; reads are O(1) and never wait behind a writer.
+
+    snap = registry.snapshot
+    for session in snap.by_bot_type.get("HOVERBOT", ()):
+        ...
+"""
+
+from types import MappingProxyType
+from typing import Callable, Mapping, NamedTuple, Optional
+
+from src.llm.client_session import ClientSession
+
+_EMPTY = MappingProxyType({})
+
+
+class RegistrySnapshot(NamedTuple):
+    version: int                                          # bumped on every swap
+    by_peer: Mapping[tuple, ClientSession]                # TCP peername -> session, in connection order
+    by_bot_type: Mapping[str, tuple[ClientSession, ...]]  # "HOVERBOT" -> sessions
+    by_robot_id: Mapping[str, ClientSession]              # robot_id from the registration message
+    by_udp_addr: Mapping[tuple, ClientSession]            # bound UDP sensor source -> session
+    by_ip: Mapping[str, tuple[ClientSession, ...]]        # TCP peer IP -> sessions
+
+
+class SessionRegistry:
+    def __init__(self):
+        self.snapshot = RegistrySnapshot(0, _EMPTY, _EMPTY, _EMPTY, _EMPTY, _EMPTY)
+        self._listeners: list[Callable[[RegistrySnapshot], None]] = []
+
+    def add_listener(self, callback: Callable[[RegistrySnapshot], None]):
+        """Call `callback(snapshot)` after every swap (cluster workers mirror the registry this way)."""
+        self._listeners.append(callback)
+
+    def _swap(self, by_peer: dict[tuple, ClientSession]):
+        by_bot_type: dict[str, list[ClientSession]] = {}
+        by_robot_id: dict[str, ClientSession] = {}
+        by_udp_addr: dict[tuple, ClientSession] = {}
+        by_ip: dict[str, list[ClientSession]] = {}
+        for session in by_peer.values():
+            by_bot_type.setdefault(session.bot_type, []).append(session)
+            if session.robot_id is not None:
+                by_robot_id[session.robot_id] = session  # later connection wins
+            for addr in session.udp_addrs:
+                by_udp_addr[addr] = session
+            by_ip.setdefault(session.peer[0], []).append(session)
+        self.snapshot = RegistrySnapshot(
+            self.snapshot.version + 1,
+            MappingProxyType(by_peer),
+            MappingProxyType({k: tuple(v) for k, v in by_bot_type.items()}),
+            MappingProxyType(by_robot_id),
+            MappingProxyType(by_udp_addr),
+            MappingProxyType({k: tuple(v) for k, v in by_ip.items()}),
+        )
+        for callback in self._listeners:
+            callback(self.snapshot)
+
+    def add(self, session: ClientSession):
+        by_peer = dict(self.snapshot.by_peer)
+        by_peer[session.peer] = session
+        self._swap(by_peer)
+
+    def update(self, session: ClientSession):
+        """Re-index after a session's bot_type or robot_id changed (registration)."""
+        if self.snapshot.by_peer.get(session.peer) is session:
+            self._swap(dict(self.snapshot.by_peer))
+
+    def remove(self, session: ClientSession) -> bool:
+        """Remove `session` if it is still the one registered for its peer."""
+        if self.snapshot.by_peer.get(session.peer) is not session:
+            return False
+        by_peer = dict(self.snapshot.by_peer)
+        del by_peer[session.peer]
+        self._swap(by_peer)
+        return True
+
+    def reattach(self, session: ClientSession, old_peer: tuple):
+        """`session` resumed under a new peername: re-key it in place (console indexes stay stable)."""
+        by_peer = {}
+        for peer, other in self.snapshot.by_peer.items():
+            if other is session or peer == old_peer:
+                by_peer[session.peer] = session
+            elif peer != session.peer:
+                by_peer[peer] = other
+        self._swap(by_peer)
+
+    def bind_udp(self, session: ClientSession, addr: tuple):
+        """Route sensor packets from `addr` to `session` (an address belongs to one session)."""
+        for other in self.snapshot.by_peer.values():
+            other.udp_addrs.discard(addr)
+        session.udp_addrs.add(addr)
+        self._swap(dict(self.snapshot.by_peer))
+
+    def resolve_udp(self, addr: tuple, robot_id=None) -> Optional[ClientSession]:
+        """Session for a sensor packet from `addr`; a robot_id match binds the address to it."""
+        snapshot = self.snapshot
+        bound = snapshot.by_udp_addr.get(addr)
+        if robot_id is not None:
+            session = snapshot.by_robot_id.get(str(robot_id))
+            if session is not None:
+                if session is not bound and session.peer in snapshot.by_peer:
+                    self.bind_udp(session, addr)
+                return session
+        if bound is not None:
+            return bound
+        same_ip = snapshot.by_ip.get(addr[0], ())
+        if len(same_ip) == 1 and (robot_id is None or same_ip[0].robot_id is None):
+            return same_ip[0]  # a guess: not bound
+        return None
+
+    def clear(self) -> list[ClientSession]:
+        sessions = list(self.snapshot.by_peer.values())
+        self._swap({})
+        return sessions
+
+    def get(self, peer: tuple) -> Optional[ClientSession]:
+        return self.snapshot.by_peer.get(peer)
+
+    def by_robot_id(self, robot_id: str) -> Optional[ClientSession]:
+        return self.snapshot.by_robot_id.get(robot_id)
+
+    def by_bot_type(self, bot_type: str) -> tuple[ClientSession, ...]:
+        return self.snapshot.by_bot_type.get(bot_type, ())
+
+    def __len__(self) -> int:
+        return len(self.snapshot.by_peer)
@@ -0,0 +1,338 @@
+"""
+Latest sensor rows in shared memory, readable from other processes.
+
+The server mirrors every row it appends to sensor history (see
+RobotSensors.append_row) into a `multiprocessing.shared_memory` segment with
+a fixed layout. A planner, dashboard or safety monitor attaches by name and
+reads the latest lidar / imu / proximity row per robot as a numpy copy: no
+pickling, no sockets, nothing runs on the server's event loop.
+
+    reader = SharedSensorReader.attach("cap_sensors_3000")
+    reading = reader.latest("7", "imu")          # robot_id, or "ip:port" before identification
+    if reading is not None:
+        ax, ay, az, gx, gy, gz = reading.values[0]
+
+Layout (little-endian):
+    header     magic "RSNS", layout version, slot count, slot size, section count,
+               directory version (bumped when a slot is assigned or renamed)
+    sections   per sensor type: name, channels, width, offset within a slot
+    slots      one per robot:  key seqlock, label (utf-8)
+                               then per sensor type: seqlock, timestamp, length, values[channels][width]
+
+Each section has its own seqlock: the writer makes the counter odd, writes,
+then makes it even again. A reader copies the section between two reads of
+the counter and retries if it was odd or changed, so it never sees a torn
+row and never blocks the writer. The counter / 2 is the number of updates.
+There is one writer per segment (the server, or each cluster worker with
+its own segment); numpy stores are not fenced, which is fine on x86 (TSO)
+but not guaranteed on weakly ordered CPUs.
+"""
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from src.llm.sensor_store import DEFAULT_SPECS, SensorSpec
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+MAGIC = b"RSNS"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<4sIIIIQ")       # magic, version, slots, slot size, sections, directory version
+SECTION = struct.Struct("<16sIII")       # name, channels, width, offset in slot
+LABEL_BYTES = 56
+ALIGN = 64                               # sections start on their own cache line
+READ_RETRIES = 1000
+
+DEFAULT_TYPES = ("lidar", "lidar_scan", "imu", "proximity")
+
+
+class SharedReading(NamedTuple):
+    timestamp: float     # receive time (time.time())
+    values: np.ndarray   # (channels, length) float32 copy
+    version: int         # updates to this section so far
+
+
+class _SectionViews(NamedTuple):
+    seq: np.ndarray        # (slots,) uint64 seqlock counters
+    timestamp: np.ndarray  # (slots,) float64
+    length: np.ndarray     # (slots,) uint32 valid columns
+    values: np.ndarray     # (slots, channels, width) float32
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _section_dtype(channels: int, width: int) -> np.dtype:
+    return np.dtype([("seq", "<u8"), ("timestamp", "<f8"), ("length", "<u4"), ("_pad", "<u4"),
+                     ("values", "<f4", (channels, width))])
+
+
+def _slot_dtype(sections: list[tuple[str, int, int, int]], slot_size: int) -> np.dtype:
+    names, formats, offsets = ["key_seq", "label"], ["<u8", f"S{LABEL_BYTES}"], [0, 8]
+    for name, channels, width, offset in sections:
+        names.append(name)
+        formats.append(_section_dtype(channels, width))
+        offsets.append(offset)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": slot_size})
+
+
+class _Segment:
+    """Numpy views of a mapped segment (shared by the writer and readers)."""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        magic, version, slots, slot_size, count, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise ValueError(f"{shm.name} is not a sensor segment (layout {version})")
+        self.sections: list[tuple[str, int, int, int]] = []
+        for i in range(count):
+            name, channels, width, offset = SECTION.unpack_from(shm.buf, HEADER.size + i * SECTION.size)
+            self.sections.append((name.rstrip(b"\0").decode(), channels, width, offset))
+        self.slot_count = slots
+        self.slots = np.ndarray((slots,), dtype=_slot_dtype(self.sections, slot_size), buffer=shm.buf,
+                                offset=_header_size(count))
+        self.key_seq = self.slots["key_seq"]
+        self.labels = self.slots["label"]
+        self.fields: dict[str, _SectionViews] = {}
+        for name, *_ in self.sections:
+            section = self.slots[name]
+            self.fields[name] = _SectionViews(section["seq"], section["timestamp"], section["length"], section["values"])
+        self.directory = np.ndarray((1,), dtype="<u8", buffer=shm.buf, offset=HEADER.size - 8)
+
+    def release(self):
+        # numpy views must go before the mapping can be closed
+        self.slots = self.key_seq = self.labels = self.fields = self.directory = None
+        self.shm.close()
+
+
+def _header_size(count: int) -> int:
+    return _align(HEADER.size + count * SECTION.size)
+
+
+class SensorSlot:
+    """Writer handle for one robot's slot; RobotSensors.append_row() calls write()."""
+
+    __slots__ = ("store", "index", "label", "last_write")
+
+    def __init__(self, store: "SharedSensorStore", index: int, label: str):
+        self.store = store
+        self.index = index
+        self.label = label
+        self.last_write = 0.0
+
+    @property
+    def active(self) -> bool:
+        """False once the slot was reused for another robot or the store was closed."""
+        return self.store._segment is not None and self.store._slots[self.index] is self
+
+    def write(self, sensor_type: str, row: np.ndarray, timestamp: float):
+        section = self.store._segment.fields.get(sensor_type) if self.store._segment else None
+        if section is None or self.store._slots[self.index] is not self:
+            return  # type not mirrored, store closed, or slot reassigned
+        i = self.index
+        n = min(row.shape[-1], section.values.shape[-1])
+        section.seq[i] += 1  # odd: write in progress
+        section.values[i, :, :n] = row[:, :n]
+        section.timestamp[i] = timestamp
+        section.length[i] = n
+        section.seq[i] += 1
+        self.last_write = time.monotonic()
+        self.store.writes += 1
+
+
+class SharedSensorStore:
+    """
+    Creates and owns the segment (one writer). slot(label) hands out a
+    SensorSlot per robot; when all slots are taken the least recently written
+    one is reused.
+    """
+
+    def __init__(self, name: str, slots: int = 256, specs: dict[str, SensorSpec] | None = None,
+                 types: tuple[str, ...] = DEFAULT_TYPES):
+        specs = DEFAULT_SPECS if specs is None else specs
+        sections, offset = [], _align(8 + LABEL_BYTES)
+        for sensor_type in types:
+            spec = specs[sensor_type]
+            sections.append((sensor_type, spec.channels, spec.width, offset))
+            offset = _align(offset + _section_dtype(spec.channels, spec.width).itemsize)
+        slot_size = offset
+        size = _header_size(len(sections)) + slots * slot_size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a server that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, LAYOUT_VERSION, slots, slot_size, len(sections), 0)
+        for i, (sensor_type, channels, width, section_offset) in enumerate(sections):
+            SECTION.pack_into(shm.buf, HEADER.size + i * SECTION.size, sensor_type.encode(), channels, width,
+                              section_offset)
+        self.name = name
+        self._segment: Optional[_Segment] = _Segment(shm)
+        self._slots: list[Optional[SensorSlot]] = [None] * slots
+        self._by_label: dict[str, SensorSlot] = {}
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._segment.shm.size if self._segment else 0
+
+    def _set_label(self, index: int, label: str, clear: bool):
+        segment = self._segment
+        segment.key_seq[index] += 1
+        segment.labels[index] = label.encode("utf-8")[:LABEL_BYTES]
+        if clear:
+            for section in segment.fields.values():
+                section.seq[index] += 1
+                section.length[index] = 0
+                section.timestamp[index] = np.nan
+                section.seq[index] += 1
+        segment.key_seq[index] += 1
+        segment.directory[0] += 1
+
+    def slot(self, label: str) -> SensorSlot:
+        """The slot for `label` (robot_id or "ip:port"), assigning one if needed."""
+        slot = self._by_label.get(label)
+        if slot is not None:
+            return slot
+        try:
+            index = self._slots.index(None)
+        except ValueError:
+            index = min(range(len(self._slots)), key=lambda i: self._slots[i].last_write)
+            del self._by_label[self._slots[index].label]
+            self.evictions += 1
+            log.warning("⚠️ Shared sensor slots full, reusing %s's slot for %s", self._slots[index].label, label)
+        slot = self._slots[index] = self._by_label[label] = SensorSlot(self, index, label)
+        self._set_label(index, label, clear=True)
+        return slot
+
+    def rename(self, slot: SensorSlot, label: str):
+        """Relabel a robot's slot (e.g. "ip:port" -> robot_id once it is identified); its data stays."""
+        if slot.label == label or self._slots[slot.index] is not slot:
+            return
+        other = self._by_label.get(label)
+        if other is not None:  # the same robot had another slot (new UDP port): free it
+            self._slots[other.index] = None
+            self._set_label(other.index, "", clear=True)
+        del self._by_label[slot.label]
+        slot.label = label
+        self._by_label[label] = slot
+        self._set_label(slot.index, label, clear=False)
+
+    def stats(self) -> dict:
+        return {"slots": len(self._slots), "used": len(self._by_label), "writes": self.writes,
+                "evictions": self.evictions, "bytes": self.nbytes}
+
+    def close(self):
+        """Unmap and remove the segment (attached readers keep their mapping until they close)."""
+        if self._segment is None:
+            return
+        shm = self._segment.shm
+        self._segment.release()
+        self._segment = None
+        self._slots = [None] * len(self._slots)
+        self._by_label.clear()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedSensorReader:
+    """Read-only view of a segment from another process."""
+
+    def __init__(self, segment: _Segment):
+        self._segment = segment
+        self._index: dict[str, int] = {}
+        self._directory = None
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedSensorReader":
+        shm = shared_memory.SharedMemory(name=name)
+        # Before Python 3.13 attaching registers the segment for cleanup at exit,
+        # which would unlink the server's segment when this reader exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(_Segment(shm))
+
+    @property
+    def sensor_types(self) -> list[str]:
+        return [name for name, *_ in self._segment.sections]
+
+    def _refresh(self):
+        directory = int(self._segment.directory[0])
+        if directory == self._directory:
+            return
+        index = {}
+        for i in range(self._segment.slot_count):
+            label = self._read_label(i)
+            if label:
+                index[label] = i
+        self._index, self._directory = index, directory
+
+    def _read_label(self, i: int) -> str:
+        key_seq, labels = self._segment.key_seq, self._segment.labels
+        for _ in range(READ_RETRIES):
+            before = int(key_seq[i])
+            if before & 1:
+                continue
+            label = bytes(labels[i])
+            if int(key_seq[i]) == before:
+                return label.rstrip(b"\0").decode("utf-8", errors="replace")
+        return ""
+
+    def robots(self) -> list[str]:
+        """Labels of the robots that currently have a slot."""
+        self._refresh()
+        return list(self._index)
+
+    def latest(self, robot: str, sensor_type: str) -> Optional[SharedReading]:
+        """Consistent copy of `robot`'s latest `sensor_type` row, or None if there is none."""
+        self._refresh()
+        i = self._index.get(str(robot))
+        section = self._segment.fields.get(sensor_type)
+        if i is None or section is None:
+            return None
+        seq = section.seq
+        for attempt in range(READ_RETRIES):
+            before = int(seq[i])
+            if before & 1:
+                if attempt % 64 == 63:
+                    time.sleep(0)  # let a descheduled writer finish
+                continue
+            n = int(section.length[i])
+            timestamp = float(section.timestamp[i])
+            row = section.values[i, :, :n].copy()
+            if int(seq[i]) == before:
+                return SharedReading(timestamp, row, before // 2) if n else None
+        return None
+
+    def close(self):
+        self._segment.release()
+
+
+def worker_segment_name(name: str, worker: Optional[int]) -> str:
+    """Cluster workers each own a segment: "<name>.<worker>"."""
+    return name if worker is None else f"{name}.{worker}"
+
+
+def attach_all(name: str) -> list[SharedSensorReader]:
+    """Readers for `name`, or for cluster worker segments "<name>.0", "<name>.1", ... (SERVER_WORKERS>1)."""
+    try:
+        return [SharedSensorReader.attach(name)]
+    except FileNotFoundError:
+        pass
+    readers = []
+    while True:
+        try:
+            readers.append(SharedSensorReader.attach(worker_segment_name(name, len(readers))))
+        except FileNotFoundError:
+            return readers
@@ -0,0 +1,120 @@
+"""
+Length-prefixed binary framing for the TCP command channel.
+
+A robot opts in by adding "framing": "binary" to its registration message:
+
+    {"command": "register", "bot": "HOVERBOT", "framing": "binary"}
+
+The server confirms with one last newline-terminated JSON line,
+{"command": "register", "status": "OK", "framing": "binary"}, and from then
+on both directions use frames. Firmware that does not ask keeps the newline
+JSON protocol.
+
+Frame layout (little-endian): uint16 length of everything after the length
+field, then a uint8 frame type and a fixed-layout body:
+
+    type 1  COMMAND  server -> robot  uint8 opcode, uint32 id, uint8 count, count x float32
+    type 2  ACK      robot -> server  uint32 id, uint8 status (0 = SUCCESS, 1 = FAILURE), float32 result
+    type 3  JSON     either way       UTF-8 JSON text (registration, messages without an opcode)
+
+A HOVERBOT FORWARD command is 13 bytes instead of ~110 bytes of JSON, and an
+ack is 12 bytes.
+"""
+
+import asyncio
+import json
+import struct
+from typing import Optional, Sequence
+
+FRAMING_LINE = "line"
+FRAMING_BINARY = "binary"
+
+FRAME_COMMAND = 1
+FRAME_ACK = 2
+FRAME_JSON = 3
+
+# Command tokens as produced by the parsers; the table is shared with the firmware
+OPCODES = {
+    "move": 1,
+    "turn": 2,
+    "FORWARD": 3,
+    "BACKWARD": 4,
+    "TURNLEFT": 5,
+    "TURNRIGHT": 6,
+    "PING": 7,
+}
+OPCODE_NAMES = {v: k for k, v in OPCODES.items()}
+
+ACK_STATUSES = ("SUCCESS", "FAILURE")
+
+LENGTH = struct.Struct("<H")
+COMMAND_HEADER = struct.Struct("<HBBIB")      # length, type, opcode, id, count
+COMMAND_1F = struct.Struct("<HBBIBf")         # the common single-argument command in one pack
+ACK = struct.Struct("<HBIBf")                 # length, type, id, status, result
+ACK_BODY = struct.Struct("<BIBf")             # ACK without the length field
+MAX_FRAME = 0xFFFF
+
+
+def command_frame(command: str, command_id: int, values: Sequence[float] = ()) -> Optional[bytes]:
+    """COMMAND frame, or None if the command has no opcode (send it as a JSON frame instead)."""
+    opcode = OPCODES.get(command)
+    if opcode is None:
+        return None
+    n = len(values)
+    if n == 1:
+        return COMMAND_1F.pack(COMMAND_1F.size - LENGTH.size, FRAME_COMMAND, opcode, command_id, 1, values[0])
+    return (COMMAND_HEADER.pack(COMMAND_HEADER.size - LENGTH.size + 4 * n, FRAME_COMMAND, opcode, command_id, n)
+            + struct.pack(f"<{n}f", *values))
+
+
+def ack_frame(command_id: int, success: bool = True, result: float = 0.0) -> bytes:
+    return ACK.pack(ACK.size - LENGTH.size, FRAME_ACK, command_id, 0 if success else 1, result)
+
+
+def json_frame(message: str | bytes | dict | list) -> bytes:
+    if isinstance(message, (dict, list)):
+        message = json.dumps(message)
+    data = message.encode("utf-8") if isinstance(message, str) else message
+    data = data.rstrip(b"\r\n")
+    if len(data) + 1 > MAX_FRAME:
+        raise ValueError(f"JSON message too large for one frame ({len(data)} bytes)")
+    return LENGTH.pack(len(data) + 1) + bytes([FRAME_JSON]) + data
+
+
+def decode_ack(body: bytes) -> dict:
+    """ACK frame body (type byte included) -> ack dict shaped like the JSON acks."""
+    if len(body) < ACK_BODY.size:
+        raise ValueError("Truncated ack frame")
+    _, command_id, status, result = ACK_BODY.unpack_from(body)
+    return {"id": command_id, "status": ACK_STATUSES[status] if status < len(ACK_STATUSES) else "FAILURE",
+            "result": result}
+
+
+def decode_command(body: bytes) -> dict:
+    """COMMAND frame body -> command dict shaped like the JSON commands (for clients and tools)."""
+    header = COMMAND_HEADER.size - LENGTH.size
+    if len(body) < header:
+        raise ValueError("Truncated command frame")
+    _, opcode, command_id, n = struct.unpack_from("<BBIB", body)
+    if len(body) < header + 4 * n:
+        raise ValueError("Truncated command values")
+    return {"id": command_id, "command": OPCODE_NAMES.get(opcode, f"OP{opcode}"),
+            "floatData": list(struct.unpack_from(f"<{n}f", body, header))}
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """
+    Read one frame body (type byte first). Raises asyncio.IncompleteReadError
+    on EOF and ValueError on an empty frame.
+
+    Each body is a fresh bytes object on purpose: asyncio.StreamReader has no
+    readinto(), so readexactly() already copies out of its internal buffer
+    and a per-connection bytearray would only add a second copy. Frames are
+    at most 64 KiB and an ack body is 11 bytes, so the allocation is small
+    next to the await; reusing a buffer would mean replacing the StreamReader
+    with a custom Protocol.
+    """
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if length == 0:
+        raise ValueError("Empty frame")
+    return await reader.readexactly(length)
@@ -0,0 +1,80 @@
+"""
+Broadcast fan-out benchmark: parse/encode per client vs. once per parser group.
+
+Registers N in-memory HOVERBOT sessions (no sockets) on a RobotServer and
+times `parse_and_broadcast` against the previous per-client loop, which called
+`parse_command` and encoded the result for every session.
+Only the fan-out is measured: writer tasks are not started, so each
+broadcast is parse + encode + one enqueue per client.
+
+Run from the repository root:
+    python3 -m src.llm.test.benchmark_broadcast --sessions 1000 --rounds 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.llm.client_session import ClientSession
+from src.llm.command_parser import get_parser
+from src.llm.server import RobotServer, _coalesce_key, _encode_payload
+
+COMMANDS = ["forward 1.0", "backward 0.5", "turnleft 90", "ping"]
+
+
+class _NullWriter:
+    def write(self, data: bytes):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_server(sessions: int, rounds: int) -> RobotServer:
+    server = RobotServer("127.0.0.1", 0, 0)
+    for i in range(sessions):
+        peer = ("10.0.%d.%d" % (i // 250, i % 250 + 1), 40000 + i)
+        server._clients.add(ClientSession(peer, _NullWriter(), get_parser("HOVERBOT"), "HOVERBOT",
+                                          max_queue=rounds * len(COMMANDS) + 1))
+    return server
+
+
+async def run_per_client(server: RobotServer, rounds: int) -> float:
+    """Previous behaviour: parse and encode once per connected client."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for raw in COMMANDS:
+            key = _coalesce_key(raw)
+            for session in server._clients.snapshot.by_peer.values():
+                session.send(_encode_payload(session.parser.parse_command(raw)), key)
+    return (time.perf_counter() - start) / (rounds * len(COMMANDS))
+
+
+async def run_grouped(server: RobotServer, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for raw in COMMANDS:
+            await server.parse_and_broadcast(raw)
+    return (time.perf_counter() - start) / (rounds * len(COMMANDS))
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--rounds", type=int, default=200, help="broadcasts of each test command")
+    args = ap.parse_args()
+
+    print(f"🧪 Broadcasting {len(COMMANDS)} commands x{args.rounds} to HOVERBOT sessions")
+    print(f"  {'sessions':>8}  {'per-client':>14}  {'grouped':>14}  {'grouped/client':>15}  speedup")
+    for n in args.sessions:
+        before = await run_per_client(make_server(n, args.rounds), args.rounds)
+        after = await run_grouped(make_server(n, args.rounds), args.rounds)
+        print(f"  {n:>8}  {before * 1e6:11.1f} us  {after * 1e6:11.1f} us  "
+              f"{after / n * 1e9:12.0f} ns  {before / after:6.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
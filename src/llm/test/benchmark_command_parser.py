@@ -0,0 +1,86 @@
+"""
+Command parser microbenchmark: parses per second for each registered parser.
+
+Compares the compiled dispatch/template path (`parse_command`,
+`encode_command`) against the previous implementation, which rebuilt the
+alias map and a message dict on every call and went through json.dumps.
+Every compiled output is first checked byte for byte against the previous
+encoder.
+
+Run from the repository root:
+    python3 -m src.llm.test.benchmark_command_parser --count 200000
+"""
+
+import argparse
+import json
+import time
+
+from src.llm.command_parser import HOVERBOTCommandParser, _PARSERS
+
+SAMPLES = {
+    "R1D4": ["move 1.0", "m 0.25", "turn 90", "t -45.5"],
+    "HOVERBOT": ["forward 1.0", "b 0.5", "turnleft 90", "tr 33.3", "ping"],
+}
+
+
+def _legacy_message(token: str, float_data: list) -> str:
+    return json.dumps({"id": 1, "command": token, "status": "DISPATCHED", "intData": [],
+                       "floatData": float_data, "result": 0.0, "text": ""})
+
+
+def legacy_r1d4(command_str: str) -> str:
+    parts = command_str.strip().split()
+    verb, value = parts[0].lower(), float(parts[1])
+    if verb in ("move", "m"):
+        return _legacy_message("move", [value * 2000.0])
+    return _legacy_message("turn", [value])
+
+
+def legacy_hoverbot(command_str: str) -> str:
+    parts = command_str.strip().lower().split()
+    alias_map = {}
+    for canonical, meta in HOVERBOTCommandParser.command_docs.items():
+        for a in meta["aliases"]:
+            alias_map[a] = canonical
+    if parts[0] in ("ping", "p"):
+        return _legacy_message("PING", [])
+    token = alias_map[parts[0]].upper().replace(" ", "")
+    value = float(parts[1])
+    duration_ms = value * 2000.0 if token in ("FORWARD", "BACKWARD") else abs(value) / 90.0 * 500.0
+    return _legacy_message(token, [duration_ms])
+
+
+LEGACY = {"R1D4": legacy_r1d4, "HOVERBOT": legacy_hoverbot}
+
+
+def rate(fn, samples: list[str], count: int) -> float:
+    inputs = (samples * (count // len(samples) + 1))[:count]
+    start = time.perf_counter()
+    for s in inputs:
+        fn(s)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--count", type=int, default=200_000, help="parses per measurement")
+    args = ap.parse_args()
+
+    print(f"🧪 {args.count} parses per measurement")
+    print(f"  {'parser':<10} {'legacy json.dumps':>18} {'parse_command':>15} {'encode_command':>15}  speedup")
+    for robot_type, parser in _PARSERS.items():
+        samples = SAMPLES.get(robot_type)
+        if not samples:
+            continue
+        legacy = LEGACY[robot_type]
+        for s in samples:
+            assert parser.parse_command(s) == legacy(s), s
+            assert parser.encode_command(s) == (legacy(s) + "\n").encode("utf-8"), s
+        before = rate(legacy, samples, args.count)
+        parsed = rate(parser.parse_command, samples, args.count)
+        encoded = rate(parser.encode_command, samples, args.count)
+        print(f"  {robot_type:<10} {before:16,.0f}/s {parsed:13,.0f}/s {encoded:13,.0f}/s  {encoded / before:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Liveness tracking cost at fleet scale: one timer wheel vs. one sleep task per client.
+
+Both variants watch N idle-ish sessions for a few seconds of wall time while a
+traffic task marks a fraction of them as heard from every tick (the way
+inbound messages update `last_seen`). The per-client variant is the obvious
+alternative: one task per session sleeping until its deadline and
+re-sleeping if traffic arrived. Reported are the CPU time the event loop
+spent and the memory held by the tracking structures (tracemalloc).
+
+Run from the repository root:
+    python3 -m src.llm.test.benchmark_liveness --sessions 10000 --seconds 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from src.llm.liveness import LivenessMonitor
+
+
+class _Session:
+    __slots__ = ("last_seen", "closed", "detached", "__weakref__")
+
+    def __init__(self):
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self.detached = False
+
+
+async def _traffic(sessions: list, fraction: float, tick: float, deadline: float):
+    n = max(1, int(len(sessions) * fraction))
+    while time.monotonic() < deadline:
+        now = time.monotonic()
+        for session in random.sample(sessions, n):
+            session.last_seen = now
+        await asyncio.sleep(tick)
+
+
+async def run_wheel(sessions: list, idle: float, timeout: float, tick: float, seconds: float, fraction: float):
+    evicted = []
+    monitor = LivenessMonitor(idle, timeout, probe=lambda s: None, evict=lambda s, silent: evicted.append(s), tick=tick)
+    tracemalloc.start()
+    for session in sessions:
+        monitor.watch(session)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    monitor.start()
+    cpu = time.process_time()
+    await _traffic(sessions, fraction, tick, time.monotonic() + seconds)
+    cpu = time.process_time() - cpu
+    await monitor.stop()
+    return cpu, memory, len(evicted)
+
+
+async def run_tasks(sessions: list, idle: float, timeout: float, tick: float, seconds: float, fraction: float):
+    evicted = []
+
+    async def watch(session):
+        probed = False
+        while True:
+            silent = time.monotonic() - session.last_seen
+            if silent >= timeout:
+                evicted.append(session)
+                return
+            if silent >= idle and not probed:
+                probed = True
+            await asyncio.sleep((timeout if silent >= idle else idle) - silent)
+
+    tracemalloc.start()
+    tasks = [asyncio.create_task(watch(session)) for session in sessions]
+    await asyncio.sleep(0)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    cpu = time.process_time()
+    await _traffic(sessions, fraction, tick, time.monotonic() + seconds)
+    cpu = time.process_time() - cpu
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return cpu, memory, len(evicted)
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--seconds", type=float, default=5.0, help="wall time per run")
+    ap.add_argument("--idle", type=float, default=1.0, help="silence before a probe (short, so timers churn)")
+    ap.add_argument("--timeout", type=float, default=3.0, help="silence before eviction")
+    ap.add_argument("--tick", type=float, default=0.1)
+    ap.add_argument("--traffic", type=float, default=0.05, help="fraction of sessions heard from per tick")
+    args = ap.parse_args()
+
+    print(f"🧪 idle {args.idle}s, timeout {args.timeout}s, {args.traffic:.0%} of sessions active per {args.tick}s tick")
+    print(f"  {'sessions':>8}  {'variant':<11} {'CPU':>8} {'CPU %':>7} {'memory':>10} {'evicted':>8}")
+    for n in args.sessions:
+        for name, runner in (("timer wheel", run_wheel), ("task/client", run_tasks)):
+            sessions = [_Session() for _ in range(n)]
+            cpu, memory, evicted = await runner(sessions, args.idle, args.timeout, args.tick, args.seconds,
+                                                args.traffic)
+            print(f"  {n:>8}  {name:<11} {cpu:7.2f}s {cpu / args.seconds:6.1%} {memory / 1024:7.0f} KiB {evicted:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+Session registry contention benchmark: copy-on-write snapshots vs. one asyncio.Lock.
+
+Runs a mixed load on one event loop against an in-memory RobotServer (no
+sockets, persistence disabled):
+  - UDP tasks feed batches of JSON IMU datagrams to `_handle_sensor_batch`
+  - broadcast tasks call `parse_and_broadcast`
+  - reader tasks call `connected_peers()` and `get_latest_sensor_data()`
+  - a churn task connects and disconnects sessions
+
+The "locked" variant takes the single asyncio.Lock the server used before
+around every registry and sensor access, the way the old code did. Reported
+are operations per second and per-call latency (including time spent waiting
+for the lock or the event loop) for each kind of task.
+
+Run from the repository root:
+    python3 -m src.llm.test.benchmark_session_registry --sessions 200 --seconds 3
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from src.llm.client_session import ClientSession
+from src.llm.command_parser import get_parser
+from src.llm.server import RobotServer
+
+COMMANDS = ["forward 1.0", "backward 0.5", "turnleft 90", "ping"]
+
+
+class _NullWriter:
+    def write(self, data: bytes):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LockedServer(RobotServer):
+    """RobotServer with the old single lock around registry and sensor access."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._lock = asyncio.Lock()
+
+    async def parse_and_broadcast(self, raw_message: str, bot_type=None):
+        async with self._lock:
+            list(self._clients.snapshot.by_peer.values())
+        await super().parse_and_broadcast(raw_message, bot_type)
+
+    async def connected_peers(self) -> list[tuple]:
+        async with self._lock:
+            return await super().connected_peers()
+
+    async def get_latest_sensor_data(self, addr: tuple, max_age: float = 1.0):
+        async with self._lock:
+            return await super().get_latest_sensor_data(addr, max_age)
+
+    async def _handle_sensor_batch(self, batch):
+        async with self._lock:
+            await super()._handle_sensor_batch(batch)
+
+    async def add_session(self, session: ClientSession):
+        async with self._lock:
+            self._clients.add(session)
+
+    async def remove_session(self, session: ClientSession):
+        async with self._lock:
+            self._clients.remove(session)
+
+
+class SnapshotServer(RobotServer):
+    async def add_session(self, session: ClientSession):
+        self._clients.add(session)
+
+    async def remove_session(self, session: ClientSession):
+        self._clients.remove(session)
+
+
+async def _no_persist(kind: str, addr: tuple, payload):
+    pass
+
+
+def _peer(i: int) -> tuple:
+    return ("10.0.%d.%d" % (i // 250, i % 250 + 1), 40000 + i)
+
+
+def _session(i: int) -> ClientSession:
+    return ClientSession(_peer(i), _NullWriter(), get_parser("HOVERBOT"), "HOVERBOT", max_queue=64)
+
+
+async def run(server_cls, sessions: int, seconds: float, udp_tasks: int, broadcast_tasks: int,
+              reader_tasks: int, batch: int) -> dict:
+    server = server_cls("127.0.0.1", 0, 0)
+    server._persist_received = _no_persist
+    for i in range(sessions):
+        await server.add_session(_session(i))
+
+    latencies: dict[str, list[float]] = {"udp batch": [], "broadcast": [], "read": [], "churn": []}
+    deadline = time.perf_counter() + seconds
+    payload = json.dumps({"type": "imu", "accel": {"x": 0.0, "y": 0.0, "z": 9.8},
+                          "gyro": {"x": 0.0, "y": 0.0, "z": 0.1}}).encode()
+
+    async def timed(kind: str, coro):
+        start = time.perf_counter()
+        await coro
+        latencies[kind].append(time.perf_counter() - start)
+
+    async def udp(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            now = time.time()
+            datagrams = [(now, _peer((i + k) % sessions), payload) for k in range(batch)]
+            i += batch
+            await timed("udp batch", server._handle_sensor_batch(datagrams))
+            await asyncio.sleep(0)
+
+    async def broadcast(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            await timed("broadcast", server.parse_and_broadcast(COMMANDS[i % len(COMMANDS)]))
+            for session in server._clients.snapshot.by_peer.values():
+                session._queue.clear()  # writer tasks are not running; keep queues from filling
+            i += 1
+            await asyncio.sleep(0)
+
+    async def reader(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            async def read():
+                peers = await server.connected_peers()
+                await server.get_latest_sensor_data(peers[i % len(peers)])
+            await timed("read", read())
+            i += 1
+            await asyncio.sleep(0)
+
+    async def churn():
+        i = sessions
+        while time.perf_counter() < deadline:
+            session = _session(i)
+            async def cycle():
+                await server.add_session(session)
+                await server.remove_session(session)
+            await timed("churn", cycle())
+            i += 1
+            await asyncio.sleep(0.001)
+
+    tasks = ([udp(n) for n in range(udp_tasks)] + [broadcast(n) for n in range(broadcast_tasks)]
+             + [reader(n) for n in range(reader_tasks)] + [churn()])
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    await server._lidar_scans.stop()
+    return {kind: (len(samples) / elapsed, samples) for kind, samples in latencies.items()}
+
+
+def _pct(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--seconds", type=float, default=3.0, help="duration of each run")
+    ap.add_argument("--udp-tasks", type=int, default=4)
+    ap.add_argument("--broadcast-tasks", type=int, default=2)
+    ap.add_argument("--reader-tasks", type=int, default=4)
+    ap.add_argument("--batch", type=int, default=64, help="datagrams per UDP batch")
+    ap.add_argument("--repeat", type=int, default=3, help="alternating runs per variant (results are pooled)")
+    args = ap.parse_args()
+
+    print(f"🧪 {args.sessions} sessions, {args.udp_tasks} UDP / {args.broadcast_tasks} broadcast / "
+          f"{args.reader_tasks} reader tasks + churn, {args.repeat} x {args.seconds:.0f}s per variant")
+    results: dict[str, dict[str, tuple[float, list[float]]]] = {"locked": {}, "snapshot": {}}
+    for _ in range(args.repeat):
+        for name, cls in (("locked", LockedServer), ("snapshot", SnapshotServer)):
+            run_result = await run(cls, args.sessions, args.seconds, args.udp_tasks, args.broadcast_tasks,
+                                   args.reader_tasks, args.batch)
+            for kind, (rate, samples) in run_result.items():
+                total_rate, pooled = results[name].get(kind, (0.0, []))
+                results[name][kind] = (total_rate + rate / args.repeat, pooled + samples)
+
+    print(f"  {'operation':<10} {'variant':<9} {'ops/s':>10} {'mean':>10} {'p50':>10} {'p99':>10}")
+    for kind in results["locked"]:
+        for name in ("locked", "snapshot"):
+            rate, samples = results[name][kind]
+            mean = statistics.fmean(samples) if samples else 0.0
+            print(f"  {kind:<10} {name:<9} {rate:10.0f} {mean * 1e6:7.1f} us {_pct(samples, 50) * 1e6:7.1f} us "
+                  f"{_pct(samples, 99) * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+UDP ingestion benchmark: per-datagram tasks vs. batched ring-buffer consumer.
+
+Feeds synthetic sensor datagrams through both ingestion paths on one event
+loop and reports packets/s. Datagrams are delivered in bursts (as the loop
+does when several packets are readable at once) and file persistence is a
+no-op coroutine so only the ingestion overhead is measured.
+
+Run from the repository root:
+    python3 -m src.llm.test.benchmark_udp_ingest --robots 50 --seconds 2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from src.llm.udp_ingest import UDPIngestPipeline
+
+
+def make_datagrams(robots: int, count: int) -> list[tuple[bytes, tuple]]:
+    """Pre-encode a mix of lidar/imu/proximity packets from `robots` addresses."""
+    out = []
+    for i in range(count):
+        addr = ("10.0.0.%d" % (i % robots + 1), 40000 + i % robots)
+        kind = i % 3
+        if kind == 0:
+            data = {"type": "lidar", "timestamp": time.time(),
+                    "distances": [round(random.uniform(0.1, 5.0), 3) for _ in range(360)]}
+        elif kind == 1:
+            data = {"type": "imu", "timestamp": time.time(),
+                    "accel": {"x": 0.1, "y": 0.0, "z": 9.8}, "gyro": {"x": 0.0, "y": 0.0, "z": 0.01}}
+        else:
+            data = {"type": "proximity", "timestamp": time.time(), "distance_cm": 42, "robot_id": "HOVERBOT"}
+        out.append((json.dumps(data).encode("utf-8"), addr))
+    return out
+
+
+class _SensorState:
+    """Stand-in for the RobotServer sensor state (lock + latest dicts)."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.sensor_data: dict[tuple, dict] = {}
+        self.sensor_timestamps: dict[tuple, float] = {}
+        self.handled = 0
+
+    async def persist(self, kind: str, addr: tuple, payload: str):
+        async with self.lock:
+            pass
+
+
+async def run_legacy(datagrams, burst: int) -> float:
+    """Pre-pipeline path: two create_task calls per datagram, each taking the lock."""
+    state = _SensorState()
+
+    async def handle(addr, sensor_data):
+        async with state.lock:
+            state.sensor_data[addr] = sensor_data
+            state.sensor_timestamps[addr] = time.time()
+        state.handled += 1
+
+    def datagram_received(data, addr):
+        msg = data.decode("utf-8", errors="replace")
+        sensor_data = json.loads(msg)
+        asyncio.create_task(state.persist("udp", addr, msg))
+        asyncio.create_task(handle(addr, sensor_data))
+
+    start = time.perf_counter()
+    for i in range(0, len(datagrams), burst):
+        for data, addr in datagrams[i:i + burst]:
+            datagram_received(data, addr)
+        await asyncio.sleep(0)
+    while state.handled < len(datagrams):
+        await asyncio.sleep(0)
+    return len(datagrams) / (time.perf_counter() - start)
+
+
+async def run_pipeline(datagrams, burst: int, capacity: int, max_batch: int) -> tuple[float, dict]:
+    """Batched path: ring-buffer push, one consumer, one lock acquisition per batch."""
+    state = _SensorState()
+
+    async def handle_batch(batch):
+        decoded = []
+        raw_by_addr: dict[tuple, list[str]] = {}
+        for recv_time, addr, data in batch:
+            msg = data.decode("utf-8", errors="replace")
+            decoded.append((recv_time, addr, json.loads(msg)))
+            raw_by_addr.setdefault(addr, []).append(msg + "\n")
+        for addr, lines in raw_by_addr.items():
+            await state.persist("udp", addr, "".join(lines))
+        async with state.lock:
+            for recv_time, addr, sensor_data in decoded:
+                state.sensor_data[addr] = sensor_data
+                state.sensor_timestamps[addr] = recv_time
+        state.handled += len(batch)
+
+    pipeline = UDPIngestPipeline(handle_batch, capacity, max_batch)
+    pipeline.start()
+    start = time.perf_counter()
+    for i in range(0, len(datagrams), burst):
+        for data, addr in datagrams[i:i + burst]:
+            pipeline.push(data, addr)
+        await asyncio.sleep(0)
+    while state.handled + pipeline.dropped < len(datagrams):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await pipeline.stop()
+    return len(datagrams) / elapsed, pipeline.stats()
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--robots", type=int, default=50)
+    ap.add_argument("--hz", type=int, default=50, help="per-robot packet rate used to size the run")
+    ap.add_argument("--seconds", type=float, default=2.0, help="simulated traffic duration")
+    ap.add_argument("--burst", type=int, default=32, help="datagrams delivered per loop iteration")
+    ap.add_argument("--capacity", type=int, default=8192)
+    ap.add_argument("--batch", type=int, default=256)
+    args = ap.parse_args()
+
+    count = int(args.robots * args.hz * args.seconds)
+    print(f"🧪 Generating {count} datagrams from {args.robots} robots...")
+    datagrams = make_datagrams(args.robots, count)
+
+    legacy = await run_legacy(datagrams, args.burst)
+    print(f"  before (task per datagram): {legacy:12,.0f} packets/s")
+    batched, stats = await run_pipeline(datagrams, args.burst, args.capacity, args.batch)
+    print(f"  after  (batched consumer):  {batched:12,.0f} packets/s  "
+          f"({stats['batches']} batches, {stats['dropped']} dropped)")
+    print(f"  speedup: {batched / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,414 @@
+"""
+Fleet load generator and RobotServer benchmark harness.
+
+Launches hundreds to thousands of simulated robots from one command, spread
+over one worker process per core (each with its own asyncio loop). Every
+robot opens a TCP session, registers as R1D4 or HOVERBOT (configurable mix)
+and streams UDP sensor packets at a fixed rate and payload size.
+
+By default the harness also spawns the server (`python3 -m src.llm.server`)
+and drives its operator console over stdin, which lets it:
+  - read ingest/drop counters via the `stats` console command
+  - broadcast commands ("move"/"forward") and time operator dispatch -> robot receipt
+  - sample server CPU and RSS, summed over worker processes when the server
+    runs with SERVER_WORKERS>1 (requires psutil; reported as null otherwise)
+Use --attach to target an already running server instead (client-side
+numbers only, plus CPU/RSS if --server-pid is given).
+
+The run ends with a JSON report suitable for tracking regressions:
+    python3 -m src.llm.test.fleet_load_harness --robots 500 --udp-rate 20 --seconds 30 \\
+        --report fleet_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:  # CPU/RSS sampling is optional
+    psutil = None
+
+from src.llm.sensor_packet import encode_lidar
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+BROADCASTS = {"R1D4": "move 0.1", "HOVERBOT": "forward 0.1"}  # one valid command per parser
+
+
+# ---------- Worker process (simulated robots) ----------
+
+class SimRobot:
+    def __init__(self, index: int, bot_type: str, payload: bytes):
+        self.index = index
+        self.bot_type = bot_type
+        self.payload = payload
+        self.writer: asyncio.StreamWriter | None = None
+        self.udp: asyncio.DatagramTransport | None = None
+        self.command_times: list[float] = []  # wall-clock receipt time of each server command
+        self.udp_sent = 0
+        self.udp_errors = 0
+
+    async def connect(self, host: str, tcp_port: int, udp_port: int):
+        reader, self.writer = await asyncio.open_connection(host, tcp_port)
+        self.writer.write((json.dumps({"command": "register", "bot": self.bot_type}) + "\n").encode("utf-8"))
+        await self.writer.drain()
+        loop = asyncio.get_running_loop()
+        self.udp, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, udp_port))
+        return asyncio.create_task(self._listen(reader))
+
+    async def _listen(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            self.command_times.append(time.time())
+            try:
+                cmd = json.loads(line)
+                ack = {"id": cmd.get("id"), "command": cmd.get("command"), "status": "completed"}
+                self.writer.write((json.dumps(ack) + "\n").encode("utf-8"))
+            except (ValueError, AttributeError):
+                pass
+
+    def send_sensor(self):
+        try:
+            self.udp.sendto(self.payload)
+            self.udp_sent += 1
+        except OSError:
+            self.udp_errors += 1
+
+    async def close(self):
+        if self.udp:
+            self.udp.close()
+        if self.writer:
+            self.writer.close()
+
+
+async def _run_worker(worker_id: int, specs: list[tuple[int, str]], cfg: dict, start_evt, stop_evt, results):
+    rng = random.Random(worker_id)
+    robots = []
+    for index, bot_type in specs:
+        if cfg["format"] == "json":
+            payload = json.dumps({"type": "lidar", "timestamp": time.time(),
+                                  "distances": [round(rng.uniform(0.1, 5.0), 3) for _ in range(cfg["points"])]}).encode("utf-8")
+        else:
+            angles = [i * 360.0 / cfg["points"] for i in range(cfg["points"])]
+            payload = encode_lidar(index & 0xFFFF, 0, angles, [rng.uniform(0.1, 5.0) for _ in angles])
+        robots.append(SimRobot(index, bot_type, payload))
+
+    listeners, connect_errors = [], 0
+    for robot in robots:
+        try:
+            listeners.append(await robot.connect(cfg["host"], cfg["tcp_port"], cfg["udp_port"]))
+        except OSError:
+            connect_errors += 1
+        if cfg["ramp"] > 0:
+            await asyncio.sleep(cfg["ramp"])
+    connected = [r for r in robots if r.udp is not None]
+
+    results.put(("ready", worker_id, len(connected)))
+    await asyncio.to_thread(start_evt.wait)
+
+    # One paced sender loop per worker instead of one sleeping task per robot
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / cfg["udp_rate"] if cfg["udp_rate"] > 0 else None
+    next_tick = loop.time()
+    while not stop_evt.is_set():
+        if interval is None:
+            await asyncio.sleep(0.1)
+            continue
+        for robot in connected:
+            robot.send_sensor()
+        next_tick += interval
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    await asyncio.sleep(cfg["settle"])  # let late commands arrive
+    for task in listeners:
+        task.cancel()
+    for robot in robots:
+        await robot.close()
+    results.put(("done", worker_id, {
+        "connected": len(connected),
+        "connect_errors": connect_errors,
+        "udp_sent": sum(r.udp_sent for r in robots),
+        "udp_errors": sum(r.udp_errors for r in robots),
+        "command_times": {bt: [r.command_times for r in robots if r.bot_type == bt] for bt in BROADCASTS},
+    }))
+
+
+def worker_main(worker_id, specs, cfg, start_evt, stop_evt, results):
+    asyncio.run(_run_worker(worker_id, specs, cfg, start_evt, stop_evt, results))
+
+
+# ---------- Server control (operator console over stdin) ----------
+
+class ServerConsole:
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self._stats: asyncio.Queue = asyncio.Queue()
+        self._reader = asyncio.create_task(self._read_stdout())
+
+    async def _read_stdout(self):
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                return
+            text = line.decode("utf-8", errors="replace")
+            start = text.find('{"ts": ')
+            if start >= 0:
+                # SERVER_LOG_JSON=1: the console line is the "msg" field
+                try:
+                    text = json.loads(text[start:]).get("msg", "")
+                except ValueError:
+                    pass
+            pos = text.find("STATS ")
+            if pos >= 0:
+                await self._stats.put(json.loads(text[pos + 6:]))
+
+    async def send(self, *lines: str):
+        self.proc.stdin.write("".join(l + "\n" for l in lines).encode("utf-8"))
+        await self.proc.stdin.drain()
+
+    async def stats(self, timeout: float = 5.0) -> dict | None:
+        await self.send("stats")
+        try:
+            return await asyncio.wait_for(self._stats.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        try:
+            await self.send("quit")
+            await asyncio.wait_for(self.proc.wait(), 10)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.proc.kill()
+        self._reader.cancel()
+
+
+async def spawn_server(tcp_port: int, udp_port: int) -> asyncio.subprocess.Process:
+    env = dict(os.environ, SERVER_PORT=str(tcp_port), UDP_PORT=str(udp_port), PYTHONUNBUFFERED="1")
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.llm.server", cwd=str(REPO_ROOT), env=env,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    q = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {"count": len(values), "p50": q[49], "p95": q[94], "p99": q[98], "max": max(values)}
+
+
+class ResourceSampler:
+    def __init__(self, pid: int | None):
+        self.proc = psutil.Process(pid) if (psutil and pid) else None
+        self.cpu: list[float] = []
+        self.rss: list[int] = []
+
+    async def run(self, interval: float = 0.5):
+        if self.proc is None:
+            return
+        self.proc.cpu_percent(None)
+        children: dict[int, "psutil.Process"] = {}  # SERVER_WORKERS>1: worker processes count too
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                cpu, rss = self.proc.cpu_percent(None), self.proc.memory_info().rss
+            except psutil.Error:
+                return
+            for child in self.proc.children(recursive=True):
+                if child.pid not in children:
+                    children[child.pid] = child
+                    child.cpu_percent(None)  # first call only primes the counter
+            for pid, child in list(children.items()):
+                try:
+                    cpu += child.cpu_percent(None)
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    del children[pid]
+            self.cpu.append(cpu)
+            self.rss.append(rss)
+
+    def summary(self) -> dict:
+        if not self.cpu:
+            return {"cpu_percent_avg": None, "cpu_percent_max": None, "rss_bytes_max": None}
+        return {"cpu_percent_avg": statistics.fmean(self.cpu), "cpu_percent_max": max(self.cpu),
+                "rss_bytes_max": max(self.rss)}
+
+
+# ---------- Coordinator ----------
+
+class WorkerFailed(RuntimeError):
+    pass
+
+
+async def _collect(results, procs: dict, kind: str, timeout: float) -> dict:
+    """
+    Wait for one `kind` message from every worker and return {worker_id: payload}.
+    Raises WorkerFailed if a worker exits without sending it or `timeout` passes.
+    """
+    got = {}
+    deadline = time.monotonic() + timeout
+    while len(got) < len(procs):
+        try:
+            msg_kind, worker_id, payload = await asyncio.to_thread(results.get, timeout=1.0)
+        except queue.Empty:
+            dead = [f"worker {w} (exit code {p.exitcode})" for w, p in procs.items()
+                    if w not in got and not p.is_alive()]
+            if dead:
+                raise WorkerFailed(f"{', '.join(dead)} died before reporting '{kind}'")
+            if time.monotonic() > deadline:
+                missing = sorted(w for w in procs if w not in got)
+                raise WorkerFailed(f"no '{kind}' from worker(s) {missing} after {timeout:.0f}s")
+            continue
+        if msg_kind == kind:
+            got[worker_id] = payload
+    return got
+
+
+async def run_harness(args) -> dict:
+    workers = args.workers or os.cpu_count() or 1
+    mix = [("R1D4", args.r1d4_ratio), ("HOVERBOT", 1.0 - args.r1d4_ratio)]
+    rng = random.Random(args.seed)
+    specs = [(i, rng.choices([m[0] for m in mix], weights=[m[1] for m in mix])[0]) for i in range(args.robots)]
+    per_worker = [specs[w::workers] for w in range(workers)]
+
+    console = None
+    server_pid = args.server_pid
+    if not args.attach:
+        proc = await spawn_server(args.tcp_port, args.udp_port)
+        console = ServerConsole(proc)
+        server_pid = proc.pid
+        await asyncio.sleep(args.startup)
+
+    cfg = {"host": args.host, "tcp_port": args.tcp_port, "udp_port": args.udp_port, "udp_rate": args.udp_rate,
+           "points": args.points, "format": args.format, "ramp": args.ramp, "settle": 1.0}
+    ctx = mp.get_context("spawn")
+    start_evt, stop_evt, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    procs = {w: ctx.Process(target=worker_main, args=(w, per_worker[w], cfg, start_evt, stop_evt, results), daemon=True)
+             for w in range(workers) if per_worker[w]}
+    for p in procs.values():
+        p.start()
+    try:
+        ready_timeout = args.worker_timeout + max(len(per_worker[w]) for w in procs) * cfg["ramp"]
+        return await _drive(args, procs, cfg, console, server_pid, start_evt, stop_evt, results, ready_timeout)
+    finally:
+        start_evt.set()  # workers still waiting to start go straight to shutdown
+        stop_evt.set()
+        for p in procs.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        if console:
+            await console.close()
+
+
+async def _drive(args, procs: dict, cfg: dict, console, server_pid, start_evt, stop_evt, results,
+                 ready_timeout: float) -> dict:
+    ready = await _collect(results, procs, "ready", ready_timeout)
+    connected = sum(ready.values())
+    print(f"🤖 {connected}/{args.robots} robots connected over {len(procs)} workers")
+
+    sampler = ResourceSampler(server_pid)
+    sampler_task = asyncio.create_task(sampler.run())
+    before = await console.stats() if console else None
+    start_evt.set()
+    t_start = time.time()
+
+    dispatch: dict[str, list[float]] = {bt: [] for bt in BROADCASTS}
+    if console and args.commands > 0:
+        gap = args.seconds / (args.commands + 1)
+        for _ in range(args.commands):
+            await asyncio.sleep(gap)
+            for bot_type, command in BROADCASTS.items():
+                dispatch[bot_type].append(time.time())
+                await console.send("all", command)
+        await asyncio.sleep(max(0.0, t_start + args.seconds - time.time()))
+    else:
+        await asyncio.sleep(args.seconds)
+
+    stop_evt.set()
+    elapsed = time.time() - t_start
+    after = await console.stats() if console else None
+    sampler_task.cancel()
+
+    totals = {"connected": 0, "connect_errors": 0, "udp_sent": 0, "udp_errors": 0}
+    latencies: list[float] = []
+    for res in (await _collect(results, procs, "done", args.worker_timeout + cfg["settle"])).values():
+        for k in totals:
+            totals[k] += res[k]
+        for bot_type, per_robot in res["command_times"].items():
+            sent = dispatch.get(bot_type, [])
+            for times in per_robot:
+                # The i-th command a robot receives answers the i-th broadcast to its type
+                latencies.extend((recv - sent_t) * 1000.0 for recv, sent_t in zip(times, sent))
+    server = {}
+    if before and after:
+        span = after["time"] - before["time"]
+        processed = after["udp"]["processed"] - before["udp"]["processed"]
+        server = {
+            "ingest_packets_per_s": processed / span if span > 0 else None,
+            "udp_received": after["udp"]["received"] - before["udp"]["received"],
+            "udp_dropped": after["udp"]["dropped"] - before["udp"]["dropped"],
+            "clients": after["clients"],
+        }
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "report"} | {"workers": len(procs)},
+        "duration_s": elapsed,
+        "clients": totals,
+        "client_send_rate_per_s": totals["udp_sent"] / elapsed if elapsed else None,
+        "server": server,
+        "command_latency_ms": _percentiles(latencies),
+        "server_resources": sampler.summary(),
+        "psutil": psutil is not None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--robots", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=0, help="worker processes (default: one per core)")
+    ap.add_argument("--r1d4-ratio", type=float, default=0.5, help="fraction of robots registering as R1D4")
+    ap.add_argument("--udp-rate", type=float, default=10.0, help="sensor packets per second per robot")
+    ap.add_argument("--points", type=int, default=360, help="lidar points per packet (payload size)")
+    ap.add_argument("--format", choices=("binary", "json"), default="binary")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--commands", type=int, default=5, help="broadcast rounds during the run")
+    ap.add_argument("--ramp", type=float, default=0.0, help="seconds between robot connects per worker")
+    ap.add_argument("--startup", type=float, default=3.0, help="seconds to wait for a spawned server")
+    ap.add_argument("--worker-timeout", type=float, default=60.0,
+                    help="seconds to wait for a worker to connect its robots or report results")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--tcp-port", type=int, default=int(os.environ.get("SERVER_PORT", 3000)))
+    ap.add_argument("--udp-port", type=int, default=int(os.environ.get("UDP_PORT", 3001)))
+    ap.add_argument("--attach", action="store_true", help="use an already running server")
+    ap.add_argument("--server-pid", type=int, help="pid to sample CPU/RSS from in --attach mode")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--report", type=Path, default=Path("fleet_report.json"))
+    args = ap.parse_args()
+
+    try:
+        report = asyncio.run(run_harness(args))
+    except WorkerFailed as e:
+        sys.exit(f"❌ {e}")
+    args.report.write_text(json.dumps(report, indent=2, default=str))
+    lat = report["command_latency_ms"]
+    print(f"📤 Clients sent {report['clients']['udp_sent']} packets "
+          f"({report['client_send_rate_per_s'] or 0:,.0f}/s), {report['clients']['udp_errors']} send errors")
+    if report["server"]:
+        print(f"📥 Server ingested {report['server']['ingest_packets_per_s'] or 0:,.0f} packets/s, "
+              f"{report['server']['udp_dropped']} dropped")
+    if lat["count"]:
+        print(f"⏱️  Command latency p50={lat['p50']:.1f} ms p95={lat['p95']:.1f} ms p99={lat['p99']:.1f} ms")
+    print(f"📝 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Read the server's shared-memory sensor store from a separate process.
+
+Attaches to the segment the running server creates (SENSOR_SHM_NAME, default
+cap_sensors_<SERVER_PORT>; with SERVER_WORKERS>1 every worker's
+"<name>.<n>" segment) and prints the latest row per robot and sensor type.
+Nothing here talks to the server: reads are seqlock-checked copies out of
+shared memory. --bench measures the cost of one latest() call.
+
+Run from the repository root while the server is up:
+    python3 -m src.llm.test.monitor_shared_sensors --interval 1
+    python3 -m src.llm.test.monitor_shared_sensors --bench 100000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.llm.shared_sensors import attach_all
+
+
+def _summary(sensor_type: str, values: np.ndarray) -> str:
+    if sensor_type in ("lidar", "lidar_scan"):
+        distances = values[1]
+        valid = distances[np.isfinite(distances) & (distances > 0)]
+        nearest = f", nearest {valid.min():.0f}" if valid.size else ""
+        return f"{values.shape[1]} points{nearest}"
+    return " ".join(f"{v:.2f}" for v in values[0])
+
+
+def show(readers):
+    now = time.time()
+    for reader in readers:
+        for robot in reader.robots():
+            for sensor_type in reader.sensor_types:
+                reading = reader.latest(robot, sensor_type)
+                if reading is not None:
+                    print(f"  {robot:<22} {sensor_type:<11} {now - reading.timestamp:6.2f}s ago  "
+                          f"#{reading.version:<7} {_summary(sensor_type, reading.values)}")
+
+
+def bench(readers, reads: int):
+    targets = [(reader, robot, sensor_type) for reader in readers for robot in reader.robots()
+               for sensor_type in reader.sensor_types if reader.latest(robot, sensor_type) is not None]
+    if not targets:
+        print("No sensor rows to read yet.")
+        return
+    for reader, robot, sensor_type in targets:
+        start = time.perf_counter()
+        for _ in range(reads):
+            reader.latest(robot, sensor_type)
+        elapsed = time.perf_counter() - start
+        print(f"  {robot:<22} {sensor_type:<11} {elapsed / reads * 1e6:7.2f} us per latest()")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--name", default=os.environ.get("SENSOR_SHM_NAME",
+                                                     f"cap_sensors_{os.environ.get('SERVER_PORT', 3000)}"))
+    ap.add_argument("--interval", type=float, default=1.0, help="seconds between prints")
+    ap.add_argument("--count", type=int, default=0, help="prints before exiting (0 = until Ctrl-C)")
+    ap.add_argument("--bench", type=int, default=0, help="time this many reads per robot and type, then exit")
+    args = ap.parse_args()
+
+    readers = attach_all(args.name)
+    if not readers:
+        raise SystemExit(f"❌ No shared sensor segment '{args.name}' (is the server running?)")
+    print(f"🧠 Attached to {len(readers)} segment(s) for '{args.name}'")
+    try:
+        if args.bench:
+            bench(readers, args.bench)
+            return
+        shown = 0
+        while not args.count or shown < args.count:
+            print(time.strftime("%H:%M:%S"))
+            show(readers)
+            shown += 1
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,7 @@ async def _send_registration(writer: asyncio.StreamWriter):
 async def _heartbeat_loop(writer: asyncio.StreamWriter):
     while True:
         await asyncio.sleep(HEARTBEAT_INTERVAL_SEC)
-        # optional: send a lightweight ping; server currently ignores unparsed lines
+        # keeps the session alive; the server answers {"command":"pong"}
         ping_line = "{\"command\":\"ping\"}\n"
         try:
             writer.write(ping_line.encode("utf-8"))
@@ -9,6 +9,7 @@ import asyncio
 import json
 import os
 import re
+import struct
 import time
 from typing import List
 
@@ -18,6 +19,20 @@ TCP_PORT = int(os.environ.get("SERVER_PORT", 3000))
 UDP_PORT = int(os.environ.get("UDP_PORT", 3001))
 LIDAR_FILE = "test_data/LIDAR_message.txt"
 SEND_INTERVAL = 0.1  # seconds between UDP packets
+BINARY_PACKETS = os.environ.get("SENSOR_FORMAT", "json").lower() == "binary"  # SENSOR_FORMAT=binary
+ROBOT_ID = int(os.environ.get("ROBOT_ID", 1))
+
+# Binary sensor packet format v1 (see src/llm/sensor_packet.py)
+PACKET_HEADER = struct.Struct("<BBBBHHId")  # magic, version, type, flags, robot_id, count, seq, timestamp
+
+
+def encode_lidar_packet(robot_id: int, seq: int, batch: list[dict], fragment: int, fragments: int) -> bytes:
+    """Binary lidar packet: header + fragment info + (float32 angle, float32 distance) pairs."""
+    n = len(batch)
+    points = [v for scan in batch for v in (scan["angle"], scan["distance"])]
+    return (PACKET_HEADER.pack(0xB5, 1, 1, 0, robot_id, n, seq, time.time())
+            + struct.pack("<HH", fragment, fragments)
+            + struct.pack(f"<{2 * n}f", *points))
 
 
 def parse_lidar_file(filepath: str) -> list[dict]:
@@ -97,6 +112,7 @@ async def udp_sender(scans: List[dict], ping_queue: asyncio.Queue):
     )
     
     print(f"📡 UDP: Ready to send to {SERVER_HOST}:{UDP_PORT} (waiting for ping)")
+    seq = 0
     
     try:
         while True:
@@ -110,14 +126,22 @@ async def udp_sender(scans: List[dict], ping_queue: asyncio.Queue):
 
             batch_size = 1000
             sent = 0
+            seq += 1
+            fragments = (total + batch_size - 1) // batch_size
             for scan_idx in range(0, total, batch_size):
                 batch = scans[scan_idx:scan_idx + batch_size]
-                packet = {
-                    "type": "lidar",
-                    "timestamp": time.time(),
-                    "scans": batch
-                }
-                message = json.dumps(packet).encode("utf-8")
+                if BINARY_PACKETS:
+                    message = encode_lidar_packet(ROBOT_ID, seq, batch, scan_idx // batch_size, fragments)
+                else:
+                    packet = {
+                        "type": "lidar",
+                        "timestamp": time.time(),
+                        "scan_id": seq,
+                        "fragment": scan_idx // batch_size,
+                        "fragments": fragments,
+                        "scans": batch
+                    }
+                    message = json.dumps(packet).encode("utf-8")
                 transport.sendto(message)
                 sent += len(batch)
                 print(f"📤 Sent {len(batch)} scans (angles {batch[0]['angle']:.1f}-{batch[-1]['angle']:.1f}°) [{sent}/{total}]")
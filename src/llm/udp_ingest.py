@@ -0,0 +1,142 @@
+"""
+Batched UDP ingestion stage for the sensor channel.
+
+``UDPProtocol.datagram_received`` only pushes raw datagrams into a bounded
+ring buffer. A single consumer task drains the ring in batches and hands each
+batch to the server, so the per-packet cost on the event loop is one append
+instead of two tasks and two lock acquisitions.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from src.llm.server_logging import get_logger
+
+log = get_logger()
+
+# (receive time, source address, raw datagram)
+Datagram = tuple[float, tuple, bytes]
+
+
+class DatagramRing:
+    """
+    Fixed-capacity FIFO of received datagrams backed by a preallocated list.
+    When full, the oldest datagram is overwritten (fresh sensor data wins)
+    and the drop counter is incremented.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: list[Optional[Datagram]] = [None] * capacity
+        self._head = 0  # index of the oldest entry
+        self._size = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: Datagram):
+        if self._size == self.capacity:
+            # Overwrite the oldest slot and advance the head
+            self._slots[self._head] = item
+            self._head = (self._head + 1) % self.capacity
+            self.dropped += 1
+            return
+        self._slots[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+
+    def pop_batch(self, max_items: int) -> list[Datagram]:
+        n = min(max_items, self._size)
+        if n == 0:
+            return []
+        head, cap, slots = self._head, self.capacity, self._slots
+        end = head + n
+        if end <= cap:
+            batch = slots[head:end]
+            slots[head:end] = [None] * n
+        else:
+            batch = slots[head:] + slots[:end - cap]
+            slots[head:] = [None] * (cap - head)
+            slots[:end - cap] = [None] * (end - cap)
+        self._head = end % cap
+        self._size -= n
+        return batch
+
+
+class UDPIngestPipeline:
+    """
+    Single-consumer ingestion pipeline.
+      - push(): called synchronously from the datagram protocol
+      - handle_batch: coroutine receiving a list of (recv_time, addr, data)
+    """
+
+    def __init__(self, handle_batch: Callable[[list[Datagram]], Awaitable[None]],
+                 capacity: int = 8192, max_batch: int = 256):
+        self._handle_batch = handle_batch
+        self._ring = DatagramRing(capacity)
+        self.max_batch = max_batch
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.processed = 0
+        self.batches = 0
+
+    @property
+    def dropped(self) -> int:
+        return self._ring.dropped
+
+    @property
+    def depth(self) -> int:
+        return len(self._ring)
+
+    def push(self, data: bytes, addr: tuple):
+        self.received += 1
+        self._ring.push((time.time(), addr, data))
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drain whatever is still buffered, then stop the consumer."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._drain()
+
+    async def _drain(self):
+        while len(self._ring):
+            batch = self._ring.pop_batch(self.max_batch)
+            try:
+                await self._handle_batch(batch)
+            except Exception as e:
+                log.error("❌ UDP ingest batch failed: %s", e)
+            self.processed += len(batch)
+            self.batches += 1
+            # Yield so the loop keeps servicing sockets between batches
+            await asyncio.sleep(0)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._drain()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "depth": self.depth,
+            "batches": self.batches,
+        }
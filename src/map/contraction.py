@@ -0,0 +1,353 @@
+"""
+Contraction hierarchies for large navigation maps.
+
+Preprocessing contracts nodes one at a time, least important first. A node
+is contracted by removing it and adding a shortcut between two of its
+neighbours wherever the route through it was the only shortest one (a
+bounded "witness" search looks for another). Importance is twice the edge
+difference (shortcuts added minus edges removed) plus the number of
+neighbours already contracted plus the node's depth in the hierarchy, kept
+up to date lazily. Every node ends up with a rank and a short list of
+"upward" edges to higher-ranked nodes.
+
+Floor plans are grid-like, and the top of a grid's hierarchy is nearly a
+clique: a query there relaxes hundreds of shortcuts per node, which is
+most of the time in Python. So contraction stops when `core_size` nodes
+remain, and the core gets an all-pairs RouteTable instead.
+
+A query runs Dijkstra from both ends over upward edges only, stopping at
+core nodes (stall-on-demand prunes nodes that a higher neighbour already
+reaches more cheaply). The route either meets below the core or crosses
+it: the best core entry/exit pair is one vectorised lookup in the core
+table. Shortcuts remember the node they bypass, so the route is expanded
+back to original edges afterwards.
+
+Graph edges are symmetric (add_edge adds both directions with one weight),
+so one upward edge list serves both searches. The preprocessed hierarchy
+is saved as .npz and reloaded at startup instead of rebuilt:
+
+    ch = ContractionHierarchy.build(graph.adj)
+    ch.save("campus.ch.npz", version="3f2a9c")
+    ch = ContractionHierarchy.load("campus.ch.npz")
+    ch.path("lobby", "ward 12")
+
+Build offline for a map file (otherwise CompiledGraph builds and caches it):
+    python3 -m src.map.contraction src/map/maps/campus.json
+"""
+
+import argparse
+import heapq
+import time
+from functools import lru_cache
+from math import inf
+from pathlib import Path
+from typing import Mapping, Optional
+
+import numpy as np
+
+from src.map.route_table import RouteTable
+
+WITNESS_SETTLE_LIMIT = 60  # nodes a witness search may settle before a shortcut is assumed necessary
+CORE_SIZE = 1000           # nodes left uncontracted and covered by an all-pairs table (8 + 4 bytes per pair)
+SEARCH_SPACE_CACHE = 4096  # endpoints whose upward search is kept
+FORMAT_VERSION = 1
+
+
+def _witness_distances(adj: list, source: int, skip: int, max_dist: float, limit: int, targets: set) -> dict:
+    """Dijkstra from source in the remaining graph without `skip`, until every target is settled
+    or max_dist / `limit` settled nodes is reached."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > max_dist or settled >= limit:
+            break
+        settled += 1
+        if u in targets:
+            targets.discard(u)
+            if not targets:
+                break
+        for v, w in adj[u].items():
+            if v == skip:
+                continue
+            alt = d + w
+            if alt < dist.get(v, inf):
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return dist
+
+
+def _shortcuts(adj: list, v: int, limit: int) -> list:
+    """Shortcuts (u, w, weight) that contracting v needs."""
+    neighbors = list(adj[v].items())
+    needed = []
+    for i, (u, wu) in enumerate(neighbors):
+        later = neighbors[i + 1:]
+        if not later:
+            break
+        dist = _witness_distances(adj, u, v, wu + max(ww for _, ww in later), limit, {w for w, _ in later})
+        for w, ww in later:
+            via = wu + ww
+            if dist.get(w, inf) > via:
+                needed.append((u, w, via))
+    return needed
+
+
+class ContractionHierarchy:
+    def __init__(self, nodes: tuple, rank: np.ndarray, offsets: np.ndarray, targets: np.ndarray,
+                 weights: np.ndarray, middle: np.ndarray, core: RouteTable, version: str = ""):
+        self.nodes = nodes
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.rank = rank          # int32 [n]: contraction order; core nodes rank last
+        self.offsets = offsets    # int64 [n + 1]: upward edges of node i are offsets[i]:offsets[i + 1]
+        self.targets = targets    # int32 [m]: higher-ranked endpoint
+        self.weights = weights    # float64 [m]
+        self.middle = middle      # int32 [m]: node a shortcut bypasses, -1 for an original edge
+        self.core = core          # RouteTable over the uncontracted nodes (node ids as names)
+        self.version = version    # map version the hierarchy was built from
+        # Python lists for the query loop (per-item numpy indexing is several times slower)
+        bounds = offsets.tolist()
+        edges = list(zip(targets.tolist(), weights.tolist(), middle.tolist()))
+        self._up = [edges[bounds[i]:bounds[i + 1]] for i in range(len(nodes))]
+        self._rank = rank.tolist()
+        n = len(nodes)
+        lo = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        shortcut = middle >= 0
+        # (lower, higher) node pair -> bypassed node, for unpacking; original edges are absent
+        self._bypassed = dict(zip((lo[shortcut] * n + targets[shortcut]).tolist(), middle[shortcut].tolist()))
+        self._core_row = [-1] * len(nodes)
+        for row, node in enumerate(core.nodes):
+            self._core_row[node] = row
+        # Requests name the same rooms over and over: keep their upward searches (results are never modified)
+        self._search_space = lru_cache(maxsize=SEARCH_SPACE_CACHE)(self._upward)
+
+    @classmethod
+    def build(cls, adj: Mapping, core_size: int = CORE_SIZE, witness_limit: int = WITNESS_SETTLE_LIMIT,
+              version: str = "") -> "ContractionHierarchy":
+        """Contract a Graph adjacency ({node: {neighbor: (weight, direction)}})."""
+        nodes = tuple(adj)
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+        remaining = [dict() for _ in range(n)]
+        for node, edges in adj.items():
+            i = index[node]
+            for neighbor, (weight, _) in edges.items():
+                j = index[neighbor]
+                if j != i:
+                    w = float(weight)
+                    if w < remaining[i].get(j, inf):
+                        remaining[i][j] = remaining[j][i] = w
+        bypassed: dict[tuple[int, int], int] = {}  # (lo, hi) node pair -> node its current shortcut bypasses
+        contracted_neighbors = [0] * n
+        depth = [0] * n
+
+        def importance(v, shortcuts):
+            return 2 * (len(shortcuts) - len(remaining[v])) + contracted_neighbors[v] + depth[v]
+
+        heap = [(importance(v, _shortcuts(remaining, v, witness_limit)), v) for v in range(n)]
+        heapq.heapify(heap)
+
+        rank = np.empty(n, dtype=np.int32)
+        up: list = [None] * n
+        order = 0
+        while heap and order < n - core_size:
+            _, v = heapq.heappop(heap)
+            if up[v] is not None:
+                continue
+            shortcuts = _shortcuts(remaining, v, witness_limit)
+            p = importance(v, shortcuts)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))  # lazy update: importance grew, try again later
+                continue
+
+            rank[v] = order
+            order += 1
+            up[v] = [(u, w, bypassed.get((min(u, v), max(u, v)), -1)) for u, w in remaining[v].items()]
+            for u, w, weight in shortcuts:
+                if weight < remaining[u].get(w, inf):
+                    remaining[u][w] = remaining[w][u] = weight
+                    bypassed[(min(u, w), max(u, w))] = v
+            for u in remaining[v]:
+                del remaining[u][v]
+                contracted_neighbors[u] += 1
+                depth[u] = max(depth[u], depth[v] + 1)
+            remaining[v] = {}
+
+        # The core: what is left, ranked last, with core-to-core edges kept on the lower-ranked end
+        core = [v for v in range(n) if up[v] is None]
+        for v in core:
+            rank[v] = order
+            order += 1
+        for v in core:
+            up[v] = [(u, w, bypassed.get((min(u, v), max(u, v)), -1))
+                     for u, w in remaining[v].items() if rank[u] > rank[v]]
+        table = RouteTable.build({v: {u: (w, None) for u, w in remaining[v].items()} for v in core}, np.float64)
+
+        counts = np.fromiter((len(edges) for edges in up), dtype=np.int64, count=n)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        flat = [edge for edges in up for edge in edges]
+        targets = np.fromiter((e[0] for e in flat), dtype=np.int32, count=len(flat))
+        weights = np.fromiter((e[1] for e in flat), dtype=np.float64, count=len(flat))
+        middle = np.fromiter((e[2] for e in flat), dtype=np.int32, count=len(flat))
+        return cls(nodes, rank, offsets, targets, weights, middle, table, version)
+
+    # ---------- Serialisation ----------
+
+    def save(self, path, version: Optional[str] = None):
+        """Write the hierarchy as .npz (node names must be strings)."""
+        if version is not None:
+            self.version = version
+        with open(path, "wb") as f:  # a file object keeps np.savez from appending ".npz"
+            np.savez(f, format=np.int32(FORMAT_VERSION), version=np.str_(self.version),
+                     nodes=np.array(self.nodes, dtype=np.str_), rank=self.rank, offsets=self.offsets,
+                     targets=self.targets, weights=self.weights, middle=self.middle,
+                     core=np.array(self.core.nodes, dtype=np.int32), core_next_hop=self.core.next_hop,
+                     core_distance=self.core.distance)
+
+    @classmethod
+    def load(cls, path) -> "ContractionHierarchy":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported hierarchy format {int(data['format'])}")
+            core = RouteTable(tuple(data["core"].tolist()), data["core_next_hop"], data["core_distance"])
+            return cls(tuple(data["nodes"].tolist()), data["rank"], data["offsets"], data["targets"],
+                       data["weights"], data["middle"], core, str(data["version"]))
+
+    # ---------- Queries ----------
+
+    def path(self, start, goal) -> list:
+        """Shortest route from start to goal as a list of nodes, or [] if there is none."""
+        s = self.index.get(start)
+        t = self.index.get(goal)
+        if s is None or t is None:
+            return []
+        if s == t:
+            return [start]
+        forward_dist, forward_parent, forward_core = self._search_space(s)
+        backward_dist, backward_parent, backward_core = self._search_space(t)
+
+        best, meet, exit_node = inf, -1, -1
+        if len(backward_dist) < len(forward_dist):
+            smaller, larger = backward_dist, forward_dist
+        else:
+            smaller, larger = forward_dist, backward_dist
+        for u, d in smaller.items():
+            other = larger.get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+        if forward_core and backward_core:
+            # Best (entry, exit) pair through the core: one lookup in the core distance table
+            rows, entry_dist = zip(*forward_core)
+            cols, exit_dist = zip(*backward_core)
+            total = self.core.distance[np.ix_(rows, cols)] + np.array(entry_dist)[:, None] + np.array(exit_dist)
+            k = int(total.argmin())
+            i, j = divmod(k, len(cols))
+            if total[i, j] < best:
+                best = total[i, j]
+                meet = self.core.nodes[rows[i]]
+                exit_node = self.core.nodes[cols[j]]
+        if meet < 0:
+            return []
+
+        hops = []  # hierarchy nodes from s to t: up to meet, across the core, down to t
+        node = meet
+        while node != s:
+            hops.append(node)
+            node = forward_parent[node]
+        hops.append(s)
+        hops.reverse()
+        if exit_node >= 0 and exit_node != meet:
+            hops.extend(self.core.path(meet, exit_node)[1:])
+            node = exit_node
+        else:
+            node = meet
+        while node != t:
+            node = backward_parent[node]
+            hops.append(node)
+
+        route = [start]
+        for a, b in zip(hops, hops[1:]):
+            self._unpack(a, b, route)
+        return route
+
+    def _upward(self, source: int):
+        """Dijkstra over upward edges from source; core nodes are recorded, not expanded."""
+        up = self._up
+        core_row = self._core_row
+        dist = {source: 0.0}
+        parent = {source: source}
+        reached_core = []  # (core table row, distance)
+        heap = [(0.0, source)]
+        pop, push = heapq.heappop, heapq.heappush
+        while heap:
+            d, u = pop(heap)
+            if d > dist[u]:
+                continue
+            row = core_row[u]
+            if row >= 0:
+                reached_core.append((row, d))
+                continue
+            edges = up[u]
+            for v, w, _ in edges:  # stall-on-demand: a higher neighbour reaches u more cheaply
+                dv = dist.get(v)
+                if dv is not None and dv + w < d:
+                    break
+            else:
+                for v, w, _ in edges:
+                    alt = d + w
+                    if alt < dist.get(v, inf):
+                        dist[v] = alt
+                        parent[v] = u
+                        push(heap, (alt, v))
+        return dist, parent, reached_core
+
+    def _unpack(self, a: int, b: int, route: list):
+        """Append the original nodes after `a` on edge a-b (expanding shortcuts) to route."""
+        nodes = self.nodes
+        rank = self._rank
+        n = len(nodes)
+        bypassed = self._bypassed
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            mid = bypassed.get(a * n + b if rank[a] < rank[b] else b * n + a)
+            if mid is None:
+                route.append(nodes[b])
+            else:
+                stack.append((mid, b))
+                stack.append((a, mid))
+
+    @property
+    def shortcuts(self) -> int:
+        return int(np.count_nonzero(self.middle >= 0))
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.rank, self.offsets, self.targets, self.weights, self.middle)
+        return sum(a.nbytes for a in arrays) + self.core.nbytes
+
+
+def main():
+    from src.map.navigation_map import ch_cache_path, load_map
+
+    ap = argparse.ArgumentParser(description="Preprocess a navigation map into a contraction hierarchy (.npz).")
+    ap.add_argument("map", help="map file (JSON/YAML)")
+    ap.add_argument("--out", help="output file (default: <map>.ch.npz, where the server looks for it)")
+    ap.add_argument("--core-size", type=int, default=CORE_SIZE)
+    args = ap.parse_args()
+
+    graph = load_map(args.map, backend="astar")
+    t0 = time.perf_counter()
+    ch = ContractionHierarchy.build(graph.adj, args.core_size, version=graph.version)
+    out = Path(args.out) if args.out else ch_cache_path(args.map)
+    ch.save(out)
+    print(f"✅ {len(ch.nodes)} nodes, {ch.shortcuts} shortcuts, built in {time.perf_counter() - t0:.1f} s "
+          f"-> {out} (map version {graph.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,32 @@
-from math import inf
+import heapq
+from itertools import count
+from math import hypot, inf
+from pathlib import Path
 import json
+import threading
 
+from src.llm.server_logging import get_logger
 
-current_heading = 0  # Initial orientation in degrees
+log = get_logger("navigation")
+
+HEADINGS = {'h': 0, 'd': 90, 'b': 180, 'g': 270}  # absolute heading for each direction letter
+DEFAULT_MAP_FILE = Path(__file__).resolve().parent / "maps" / "hospital.json"
+_navigation_map = None  # NavigationMap, loaded on first use or by load_navigation_map()
 
 # --- Graph class adapted from old project ---
 class Graph:
     def __init__(self):
         self.adj = {}  # Dictionary representation of the graph
+        self.positions = {}  # node -> (x, y), same unit as edge weights (A* heuristic)
         self.opposites = {'h': 'b', 'd': 'g', 'b': 'h', 'g': 'd'}  # For reverse direction
 
+    def add_node(self, node, x=None, y=None):
+        """Add a node, optionally with coordinates (edge weights must be >= straight-line distance)."""
+        if node not in self.adj:
+            self.adj[node] = {}
+        if x is not None and y is not None:
+            self.positions[node] = (float(x), float(y))
+
     def add_edge(self, a, b, weight, direction):
         # Add edge from a to b
         if a not in self.adj:
@@ -21,107 +38,163 @@ class Graph:
         self.adj[b][a] = (weight, self.opposites[direction])
 
     def dijkstra(self, start, target):
-        #print(self.adj.items())
-        dist = {node: inf for node in self.adj}
-        prev = {node: None for node in self.adj}
-        dist[start] = 0
-        unvisited = set(self.adj.keys())
-
-        while unvisited:
-            current = min(unvisited, key=lambda node: dist[node])
-            if current == target:
-                break
-            unvisited.remove(current)
-            for neighbor, (w, _) in self.adj[current].items():
-                alt = dist[current] + w
-                if alt < dist[neighbor]:
+        """
+        Shortest path from start to target as a list of nodes, or [] if target
+        is unreachable. Binary heap; stops as soon as target is settled.
+        """
+        return self._search(start, target, None)
+
+    def astar(self, start, target):
+        """
+        Same result as dijkstra(), guided by the straight-line distance to
+        target. Nodes without a position get a zero estimate.
+        """
+        goal = self.positions.get(target)
+        if goal is None:
+            return self._search(start, target, None)
+        positions = self.positions
+        gx, gy = goal
+
+        def estimate(node):
+            p = positions.get(node)
+            return hypot(p[0] - gx, p[1] - gy) if p is not None else 0.0
+
+        return self._search(start, target, estimate)
+
+    def _search(self, start, target, estimate):
+        if start not in self.adj or target not in self.adj:
+            return []
+        adj = self.adj
+        dist = {start: 0}
+        prev = {start: None}
+        tie = count()  # node names need not be comparable
+        heap = [(estimate(start) if estimate else 0, 0, next(tie), start)]
+        while heap:
+            _, d, _, node = heapq.heappop(heap)
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = prev[node]
+                path.reverse()
+                return path
+            if d > dist[node]:
+                continue  # stale entry: node was reached more cheaply since
+            for neighbor, (w, _) in adj[node].items():
+                alt = d + w
+                if alt < dist.get(neighbor, inf):
                     dist[neighbor] = alt
-                    prev[neighbor] = current
-        # Reconstruct path from start to target
-        path = []
-        node = target
-        while node is not None:
-            path.insert(0, node)
-            node = prev[node]
-        return path
-
-# --- Command Generation Functions ---
-def angle_for_direction(direction):
-    # Map a direction letter to an angle (in degrees)
-    global current_heading
-    #print(current_heading)
-    mapping = {'h': 0-current_heading, 'd': 90-current_heading, 'b': 180-current_heading, 'g': 270-current_heading}
-    update_heading(mapping[direction])
-    return mapping.get(direction, 0)
+                    prev[neighbor] = node
+                    priority = alt + estimate(neighbor) if estimate else alt
+                    heapq.heappush(heap, (priority, alt, next(tie), neighbor))
+        return []
 
-def update_heading(turn_angle):
-    global current_heading
-    current_heading = (current_heading + turn_angle) % 360
-    return current_heading
+    def path_length(self, path):
+        """Sum of edge weights along a path."""
+        return sum(self.adj[a][b][0] for a, b in zip(path, path[1:]))
 
+# --- Command Generation Functions ---
+def turn_for_direction(direction, heading):
+    """Turn needed to face `direction` from `heading`, and the heading after it."""
+    turn = HEADINGS[direction] - heading
+    return turn, (heading + turn) % 360
 
-def generate_commands(graph, path, current_heading=0):
+def generate_commands(graph, path, heading=0):
     """
     For each consecutive pair of nodes in the path, generate:
       - A turn command (to face the direction of the edge)
       - A move command (to move the required distance)
+    `heading` is where the robot faces at the start; nothing outside is changed
+    (plan_route() in navigation_map.py also returns the final heading).
     """
     commands = []
-    if len(path) < 2:
-        return commands  # Nothing to do if the path is too short
-    
-
-#    # Determine the desired heading for the first edge
-#     _, (weight, direction) = next(iter(graph.adj[path[0]].items()))
-#     desired_heading = angle_for_direction(direction)  # e.g., maps 'h'->0, 'd'->90, etc.
-
-#     # Compute the rotation needed to reorient the robot
-#     rotation_needed = (desired_heading - current_heading) % 360
-#     if rotation_needed != 0:
-#         commands.append({"command": "turn", "float_data": [rotation_needed]})
-
-
-    for i in range(len(path) - 1):
-        src = path[i]
-        dst = path[i + 1]
+    for src, dst in zip(path, path[1:]):
         weight, direction = graph.adj[src][dst]
-        turn_angle = angle_for_direction(direction)
+        turn_angle, heading = turn_for_direction(direction, heading)
         # Append turn and move commands
         commands.append({"command": "turn", "float_data": [turn_angle]})
         commands.append({"command": "move", "float_data": [weight]})
     return commands
 
+
+class NavigationSession:
+    """
+    One robot's pose on the navigation map: the node it was last sent to and
+    the heading it faces. Each robot has its own, so concurrent requests for
+    different robots share nothing but the read-only map; requests for the
+    same robot are applied one at a time.
+    """
+
+    def __init__(self, robot_id=None, node=None, heading=0):
+        self.robot_id = robot_id
+        self.node = node
+        self.heading = heading
+        self._lock = threading.Lock()
+
+    @property
+    def pose(self):
+        return self.node, self.heading
+
+    def plan(self, nav_map, start, goal):
+        """Route from start to goal for this robot (a navigation_map.Route, or None); advances the pose."""
+        with self._lock:
+            route = nav_map.route(start, goal, self.heading)
+            if route is not None:
+                self.node = goal
+                self.heading = route.heading
+            return route
+
 # --- Integration Function ---
-def handle_navigation_command(current_room, target_room):
+def load_navigation_map(path=None, cache_size=1024, reload_interval=0.0, table_max_nodes=None, backend="auto"):
+    """
+    Load the map used by handle_navigation_command (default: maps/hospital.json).
+    With reload_interval > 0 a background thread swaps in edits to the file.
+    backend: "auto" (all-pairs table up to table_max_nodes nodes, else A*),
+    "table", "ch" (contraction hierarchy) or "astar".
+    """
+    global _navigation_map
+    from src.map.navigation_map import NavigationMap, ROUTE_TABLE_MAX_NODES
+
+    if table_max_nodes is None:
+        table_max_nodes = ROUTE_TABLE_MAX_NODES
+    previous = _navigation_map
+    _navigation_map = NavigationMap(path or DEFAULT_MAP_FILE, cache_size, reload_interval, table_max_nodes, backend)
+    if previous is not None:
+        previous.close()
+    return _navigation_map
+
+def navigation_map():
+    """The loaded NavigationMap, loading the default map on first use."""
+    if _navigation_map is None:
+        load_navigation_map()
+    return _navigation_map
+
+def handle_navigation_command(current_room, target_room, session=None):
     """
     Computes the shortest path from current_room to target_room,
     generates corresponding movement commands, and returns them as a JSON string.
+    Routes come from the loaded map's cache. `session` is the robot's
+    NavigationSession: its heading is used and advanced (without one the
+    robot is assumed to face heading 0).
     """
-    # Create and populate the graph (this could be loaded from a file or defined elsewhere)
-    graph = Graph()
-    # Example graph edges
-    graph.add_edge('corner one', 'corner two', 2, 'd')
-    graph.add_edge('corner two', 'corner three', 1, 'h')
-    graph.add_edge('corner three', 'corner four', 2, 'g')
-    graph.add_edge('corner four', 'end', 1, 'b')
-    # ... additional nodes and edges as required for hospital map
-
-    # Compute the shortest path using Dijkstra's algorithm
+    nav = navigation_map()
+    if session is None:
+        session = NavigationSession()
     current_room = current_room.strip("\"")
     target_room = target_room.strip("\"")
 
-    if current_room not in graph.adj:
-        return json.dumps({"error": f"Room {current_room} does not exist. Try again"})
-    if target_room not in graph.adj:
-        return json.dumps({"error": f"Room {target_room} does not exist. Try again"})
-    
-    path = graph.dijkstra(current_room, target_room)
-    print("Path from", current_room, "to", target_room, ":", path)
+    route = session.plan(nav, current_room, target_room)
+    if route is None:
+        graph = nav.graph
+        if current_room not in graph.adj:
+            return json.dumps({"error": f"Room {current_room} does not exist. Try again"})
+        if target_room not in graph.adj:
+            return json.dumps({"error": f"Room {target_room} does not exist. Try again"})
+        return json.dumps({"error": f"No route from {current_room} to {target_room}. Try again"})
+    log.debug("🗺️ Path from %s to %s: %s", current_room, target_room, list(route.path))
 
-    # Generate commands based on the computed path
-    commands = generate_commands(graph, path, current_heading)
     # Return the commands as a JSON string
-    return json.dumps(commands)
+    return json.dumps(route.command_list())
 
 # --- Example Usage ---
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+"""
+Navigation maps loaded from a file, compiled once, with a route cache.
+
+A map file (JSON, or YAML when PyYAML is installed) lists nodes with
+optional coordinates and the edges between them:
+
+    {
+      "name": "hospital",
+      "nodes": {"corner one": [0, 0], "corner two": [2, 0], "lobby": null},
+      "edges": [
+        ["corner one", "corner two", 2, "d"],
+        {"from": "corner two", "to": "lobby", "weight": 1.5, "direction": "h"}
+      ]
+    }
+
+Directions are the Graph letters ('h' +y, 'd' +x, 'b' -y, 'g' -x); each edge
+is added in both directions. Coordinates are in the unit of the weights
+and only guide A*. Nodes that appear in an edge need not be listed.
+
+`load_map()` returns a CompiledGraph: a Graph whose adjacency is read-only,
+stamped with a version (hash of the file contents), with a route backend:
+
+    auto    "table" for maps of up to `table_max_nodes` nodes, else "astar"
+    table   all-pairs RouteTable built at compile time: routes are looked up
+    ch      ContractionHierarchy, for large multi-building maps; it is saved
+            next to the map file (<map>.ch.npz) and reused while the map
+            version matches, so only the first start pays for preprocessing
+    astar   search on demand
+
+`NavigationMap` holds
+the current compiled graph together with an LRU cache of routes keyed by
+(start, goal, heading). Reloading builds a new graph and cache off to the
+side and swaps both in with one assignment: requests already running keep
+the graph they started with, and a new version never sees old routes.
+
+    nav = NavigationMap("src/map/maps/hospital.json", reload_interval=2.0)
+    route = nav.route("corner one", "end", heading=0)
+    route.command_list()  # [{"command": "turn", "float_data": [90]}, ...]
+
+Planning keeps no state of its own: the heading goes in and comes back out
+(`plan_route(graph, start, goal, heading) -> (commands, heading)`), and each
+robot's heading lives in its mapStructure.NavigationSession.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache, partial
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from src.map.contraction import ContractionHierarchy
+from src.map.mapStructure import Graph, turn_for_direction
+from src.map.route_table import RouteTable
+from src.llm.server_logging import get_logger
+
+log = get_logger("navigation")
+
+ROUTE_TABLE_MAX_NODES = 2000  # larger maps search on demand (the table needs 8 bytes per node pair)
+ROUTE_BACKENDS = ("auto", "table", "ch", "astar")
+
+
+def ch_cache_path(map_path) -> Path:
+    """Where the contraction hierarchy for a map file is kept: maps/campus.json -> maps/campus.ch.npz."""
+    map_path = Path(map_path)
+    return map_path.with_name(map_path.stem + ".ch.npz")
+
+
+def _hierarchy(adj, version: str, path: Optional[Path]) -> ContractionHierarchy:
+    """The saved hierarchy for this map version, else a freshly built (and saved) one."""
+    if path is not None and path.exists():
+        try:
+            hierarchy = ContractionHierarchy.load(path)
+            if hierarchy.version == version and len(hierarchy.nodes) == len(adj):
+                return hierarchy
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("⚠️ Ignoring contraction hierarchy %s: %s", path, e)
+    log.info("🗺️ Building contraction hierarchy for %d nodes (map version %s)...", len(adj), version)
+    hierarchy = ContractionHierarchy.build(adj, version=version)
+    if path is not None:
+        if all(isinstance(node, str) for node in hierarchy.nodes):
+            try:
+                hierarchy.save(path)
+            except OSError as e:
+                log.warning("⚠️ Could not save contraction hierarchy %s: %s", path, e)
+        else:
+            log.warning("⚠️ Not saving contraction hierarchy %s: node names must all be strings", path)
+    return hierarchy
+
+
+class CompiledGraph(Graph):
+    """Read-only Graph with a version stamp; safe to share between threads."""
+
+    def __init__(self, graph: Graph, version: str, name: str = "", table_max_nodes: int = ROUTE_TABLE_MAX_NODES,
+                 backend: str = "auto", hierarchy_path: Optional[Path] = None):
+        super().__init__()
+        if backend not in ROUTE_BACKENDS:
+            raise ValueError(f"unknown route backend {backend!r} (expected one of {', '.join(ROUTE_BACKENDS)})")
+        self.adj = MappingProxyType({node: MappingProxyType(dict(edges)) for node, edges in graph.adj.items()})
+        self.positions = MappingProxyType(dict(graph.positions))
+        self.version = version
+        self.name = name
+        if backend == "auto":
+            backend = "table" if 0 < len(self.adj) <= table_max_nodes else "astar"
+        self.backend = backend
+        self.route_table = RouteTable.build(self.adj) if backend == "table" and self.adj else None
+        self.hierarchy = _hierarchy(self.adj, version, hierarchy_path) if backend == "ch" and self.adj else None
+
+    def shortest_path(self, start, target):
+        """Shortest route with the map's backend; [] if unreachable."""
+        if self.route_table is not None:
+            return self.route_table.path(start, target)
+        if self.hierarchy is not None:
+            return self.hierarchy.path(start, target)
+        return self.astar(start, target)
+
+    def add_node(self, node, x=None, y=None):
+        raise TypeError("compiled graph is read-only; edit the map file instead")
+
+    def add_edge(self, a, b, weight, direction):
+        raise TypeError("compiled graph is read-only; edit the map file instead")
+
+
+class Route(NamedTuple):
+    version: str                             # map version the route was planned on
+    path: tuple                              # nodes from start to goal
+    commands: tuple[tuple[str, float], ...]  # ("turn", degrees) / ("move", distance)
+    heading: int                             # heading after the last turn
+
+    def command_list(self) -> list[dict]:
+        """Commands in the robot wire format (fresh dicts, safe to modify)."""
+        return [{"command": name, "float_data": [value]} for name, value in self.commands]
+
+
+def _read_spec(path: Path, data: bytes) -> dict:
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"{path}: YAML maps need PyYAML (pip install PyYAML)") from None
+        try:
+            spec = yaml.safe_load(data)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: {e}") from None
+    else:
+        spec = json.loads(data)
+    if not isinstance(spec, dict):
+        raise ValueError(f"{path}: expected a mapping with 'nodes' and 'edges'")
+    return spec
+
+
+def _is_name(node) -> bool:
+    return isinstance(node, (str, int, float)) and not isinstance(node, bool)
+
+
+def _is_coordinate(value) -> bool:
+    return value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+
+
+def compile_map(spec: dict, version: str, source="map", table_max_nodes: int = ROUTE_TABLE_MAX_NODES,
+                backend: str = "auto", hierarchy_path: Optional[Path] = None) -> CompiledGraph:
+    """Build a CompiledGraph from a parsed map file; a malformed node or edge raises ValueError."""
+    nodes = spec.get("nodes") or {}
+    edges = spec.get("edges") or []
+    if not isinstance(nodes, dict):
+        raise ValueError(f"{source}: 'nodes' must be a mapping of node name to position, got {type(nodes).__name__}")
+    if not isinstance(edges, list):
+        raise ValueError(f"{source}: 'edges' must be a list, got {type(edges).__name__}")
+    graph = Graph()
+    for node, position in nodes.items():
+        if position is None:
+            x = y = None
+        elif isinstance(position, dict):
+            x, y = position.get("x"), position.get("y")
+        elif isinstance(position, (list, tuple)) and len(position) == 2:
+            x, y = position
+        else:
+            raise ValueError(f"{source}: node {node!r} position must be [x, y], {{x, y}} or null, got {position!r}")
+        if not _is_name(node) or not (_is_coordinate(x) and _is_coordinate(y)):
+            raise ValueError(f"{source}: node {node!r} has an invalid name or position {position!r}")
+        graph.add_node(node, x, y)
+    for i, edge in enumerate(edges):
+        if isinstance(edge, dict):
+            edge = (edge.get("from"), edge.get("to"), edge.get("weight"), edge.get("direction"))
+        try:
+            a, b, weight, direction = edge
+            weight = float(weight)
+        except (TypeError, ValueError):
+            raise ValueError(f"{source}: edge {i} must be [from, to, weight, direction], got {edge!r}") from None
+        if not (_is_name(a) and _is_name(b)):
+            raise ValueError(f"{source}: edge {i} endpoints must be node names, got {a!r} -> {b!r}")
+        if direction not in graph.opposites:
+            raise ValueError(f"{source}: edge {i} ({a} -> {b}) has unknown direction {direction!r}")
+        if weight < 0:
+            raise ValueError(f"{source}: edge {i} ({a} -> {b}) has a negative weight")
+        graph.add_edge(a, b, weight, direction)
+    return CompiledGraph(graph, version, str(spec.get("name", "")), table_max_nodes, backend, hierarchy_path)
+
+
+def load_map(path, table_max_nodes: int = ROUTE_TABLE_MAX_NODES, backend: str = "auto") -> CompiledGraph:
+    """Read and compile a map file; the version is a hash of its bytes."""
+    path = Path(path)
+    data = path.read_bytes()
+    return compile_map(_read_spec(path, data), hashlib.sha1(data).hexdigest()[:12], path, table_max_nodes,
+                       backend, ch_cache_path(path))
+
+
+def plan(graph: CompiledGraph, start, goal, heading: int = 0) -> Optional[Route]:
+    """
+    Route from start to goal for a robot facing `heading`; None if there is none.
+    Pure: reads only the (immutable) graph, so any number of threads may plan at once.
+    """
+    path = graph.shortest_path(start, goal)
+    if not path:
+        return None
+    commands = []
+    for a, b in zip(path, path[1:]):
+        weight, direction = graph.adj[a][b]
+        turn, heading = turn_for_direction(direction, heading)
+        commands.append(("turn", turn))
+        commands.append(("move", weight))
+    return Route(graph.version, tuple(path), tuple(commands), heading)
+
+
+def plan_route(graph: CompiledGraph, start, goal, heading: int = 0) -> tuple[list[dict], int]:
+    """(commands, final heading) for start -> goal; no commands if start == goal or there is no route."""
+    route = plan(graph, start, goal, heading)
+    if route is None:
+        return [], heading
+    return route.command_list(), route.heading
+
+
+class _MapState(NamedTuple):
+    graph: CompiledGraph
+    route: object  # lru_cache-wrapped plan bound to graph
+    stamp: tuple   # (mtime_ns, size) of the file it was loaded from
+
+
+class NavigationMap:
+    """The current compiled map and its route cache; reload() swaps both at once."""
+
+    def __init__(self, path, cache_size: int = 1024, reload_interval: float = 0.0,
+                 table_max_nodes: int = ROUTE_TABLE_MAX_NODES, backend: str = "auto"):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self.table_max_nodes = table_max_nodes
+        self.backend = backend
+        self.reloads = 0
+        self._reload_lock = threading.Lock()  # serialises reloaders only; route() never takes it
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._failed_stamp = None  # file stamp that did not compile; not retried until the file changes again
+        self._state = self._load()
+        if reload_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, args=(reload_interval,),
+                                             name="nav-map-watch", daemon=True)
+            self._watcher.start()
+
+    def _load(self) -> _MapState:
+        stat = os.stat(self.path)
+        graph = load_map(self.path, self.table_max_nodes, self.backend)
+        return _MapState(graph, lru_cache(maxsize=self.cache_size)(partial(plan, graph)),
+                         (stat.st_mtime_ns, stat.st_size))
+
+    @property
+    def graph(self) -> CompiledGraph:
+        return self._state.graph
+
+    @property
+    def version(self) -> str:
+        return self._state.graph.version
+
+    def route(self, start, goal, heading: int = 0) -> Optional[Route]:
+        """Cached plan() on the current map version."""
+        return self._state.route(start, goal, heading % 360)
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the file again if it changed; True if a new map version was swapped in."""
+        with self._reload_lock:
+            current = self._state
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if not force and stamp in (current.stamp, self._failed_stamp):
+                return False
+            try:
+                state = self._load()
+            except Exception:
+                self._failed_stamp = stamp
+                raise
+            if state.graph.version == current.graph.version:
+                self._state = current._replace(stamp=state.stamp)  # touched, not edited: keep the warm cache
+                return False
+            self._state = state
+            self.reloads += 1
+        log.info("🗺️ Navigation map %s reloaded: version %s -> %s (%d nodes)",
+                 self.path.name, current.graph.version, state.graph.version, len(state.graph.adj))
+        return True
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                log.warning("⚠️ Keeping navigation map %s: %s", self.version, e)
+            except Exception:  # anything else must not stop hot reload either
+                log.exception("❌ Keeping navigation map %s: unexpected error loading %s", self.version, self.path)
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self) -> dict:
+        state = self._state
+        info = state.route.cache_info()
+        table = state.graph.route_table
+        return {
+            "version": state.graph.version,
+            "route_backend": state.graph.backend,
+            "route_table_bytes": table.nbytes if table is not None else 0,
+            "reloads": self.reloads,
+            "route_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize},
+        }
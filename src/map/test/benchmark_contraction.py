@@ -0,0 +1,112 @@
+"""
+Contraction hierarchy benchmark: preprocessing, .npz round trip and query latency vs. A*.
+
+Builds the synthetic floor plans from benchmark_pathfinding (node names
+turned into strings, as in a map file), contracts them, saves and reloads
+the hierarchy, then times queries on the reloaded copy:
+
+    cold    random (start, goal) pairs, nothing cached
+    rooms   pairs drawn from --rooms named endpoints, the way voice requests
+            repeat the same rooms (their upward searches stay cached)
+
+Routes are checked against heap Dijkstra, and A* is timed on the first
+--astar-queries pairs for comparison. Preprocessing is pure Python and
+takes minutes at 100k nodes; that is what the saved .npz avoids.
+
+Run from the repository root:
+    python3 -m src.map.test.benchmark_contraction --nodes 10000 30000 100000
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.map.contraction import CORE_SIZE, ContractionHierarchy
+from src.map.mapStructure import Graph
+from src.map.test.benchmark_pathfinding import _time, floor_plan
+
+
+def named(graph: Graph) -> Graph:
+    """Copy of a floor plan with "r-c" string node names."""
+    name = {node: f"{node[0]}-{node[1]}" for node in graph.adj}
+    copy = Graph()
+    for node, (x, y) in graph.positions.items():
+        copy.add_node(name[node], x, y)
+    for node, edges in graph.adj.items():
+        copy.adj[name[node]] = {name[n]: edge for n, edge in edges.items()}
+    return copy
+
+
+def _us(times) -> str:
+    p95 = sorted(times)[min(len(times) - 1, int(0.95 * len(times)))]
+    return f"{statistics.fmean(times) * 1e6:8.0f} us {p95 * 1e6:8.0f} us"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, nargs="+", default=[10000, 30000, 100000])
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--rooms", type=int, default=200, help="distinct endpoints for the 'rooms' queries")
+    ap.add_argument("--astar-queries", type=int, default=20)
+    ap.add_argument("--core-size", type=int, default=CORE_SIZE)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    print(f"  {'nodes':>7} {'build':>8} {'shortcuts':>9} {'file':>8} {'load':>7}  "
+          f"{'queries':<6} {'mean':>11} {'p95':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.nodes:
+            graph = named(floor_plan(n, seed=args.seed))
+            t0 = time.perf_counter()
+            built = ContractionHierarchy.build(graph.adj, args.core_size, version="bench")
+            build = time.perf_counter() - t0
+            path = os.path.join(tmp, f"plan{n}.ch.npz")
+            built.save(path)
+            t0 = time.perf_counter()
+            ch = ContractionHierarchy.load(path)
+            load = time.perf_counter() - t0
+
+            rng = random.Random(args.seed)
+            nodes = list(graph.adj)
+            cold = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+            rooms = [rng.choice(nodes) for _ in range(args.rooms)]
+            repeated = [(rng.choice(rooms), rng.choice(rooms)) for _ in range(args.queries)]
+
+            cold_times, cold_paths = _time(ch.path, cold)
+            _time(ch.path, repeated)  # first pass fills the endpoint cache
+            room_times, _ = _time(ch.path, repeated)
+            astar_times, _ = _time(graph.astar, cold[:args.astar_queries])
+            for (start, goal), route in zip(cold[:args.astar_queries], cold_paths):
+                expected = graph.dijkstra(start, goal)
+                if not expected:
+                    assert route == [], (start, goal, route)
+                    continue
+                assert route[0] == start and route[-1] == goal, (start, goal, route)
+                assert all(b in graph.adj[a] for a, b in zip(route, route[1:])), (start, goal)
+                assert math.isclose(graph.path_length(route), graph.path_length(expected)), (start, goal)
+
+            head = (f"  {len(nodes):>7} {build:6.1f} s {ch.shortcuts:>9} "
+                    f"{os.path.getsize(path) / 2**20:5.1f} MB {load:5.2f} s  ")
+            blank = " " * len(head)
+            print(f"{head}{'cold':<6} {_us(cold_times)}")
+            print(f"{blank}{'rooms':<6} {_us(room_times)}")
+            print(f"{blank}{'A*':<6} {_us(astar_times)}")
+
+    # Unreachable goals and unknown nodes are empty routes, with or without a core
+    graph = Graph()
+    graph.add_edge("a", "b", 1.0, 'h')
+    graph.add_edge("b", "c", 1.0, 'd')
+    graph.add_node("island")
+    for core_size in (0, 2, 100):
+        ch = ContractionHierarchy.build(graph.adj, core_size)
+        assert ch.path("a", "c") == ["a", "b", "c"] and ch.path("c", "a") == ["c", "b", "a"]
+        assert ch.path("a", "island") == [] and ch.path("a", "nowhere") == [] and ch.path("b", "b") == ["b"]
+    print("✅ Hierarchy routes match heap Dijkstra; unreachable goals return []")
+
+
+if __name__ == "__main__":
+    main()
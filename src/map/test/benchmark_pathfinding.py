@@ -0,0 +1,126 @@
+"""
+Route search benchmark: heap Dijkstra and A* vs. the previous O(V^2) Dijkstra.
+
+Builds synthetic floor plans: a grid of corridor junctions with a fraction
+of corridors removed (walls), coordinates in metres and edge weights of at
+least the straight-line distance (so the A* estimate stays admissible).
+Each search is timed on the same random (start, goal) pairs, and every
+route length is checked against heap Dijkstra. The previous implementation
+scans every unvisited node per step, so it only runs up to --legacy-max-nodes.
+
+Run from the repository root:
+    python3 -m src.map.test.benchmark_pathfinding --nodes 10000 30000 100000 --queries 50
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+
+from src.map.mapStructure import Graph
+
+
+def legacy_dijkstra(graph: Graph, start, target) -> list:
+    """The previous Graph.dijkstra (linear min() over unvisited nodes, path.insert(0, ...))."""
+    dist = {node: math.inf for node in graph.adj}
+    prev = {node: None for node in graph.adj}
+    dist[start] = 0
+    unvisited = set(graph.adj.keys())
+    while unvisited:
+        current = min(unvisited, key=lambda node: dist[node])
+        if current == target:
+            break
+        unvisited.remove(current)
+        for neighbor, (w, _) in graph.adj[current].items():
+            alt = dist[current] + w
+            if alt < dist[neighbor]:
+                dist[neighbor] = alt
+                prev[neighbor] = current
+    path = []
+    node = target
+    while node is not None:
+        path.insert(0, node)
+        node = prev[node]
+    return path
+
+
+def floor_plan(nodes: int, spacing: float = 3.0, walls: float = 0.15, seed: int = 1) -> Graph:
+    """Grid of about `nodes` junctions; `walls` of the corridors are removed (keeping one spanning grid row/column)."""
+    rng = random.Random(seed)
+    side = max(2, int(math.sqrt(nodes)))
+    graph = Graph()
+    for r in range(side):
+        for c in range(side):
+            graph.add_node((r, c), c * spacing, r * spacing)
+    for r in range(side):
+        for c in range(side):
+            # 'h' is +y (north), 'd' is +x (east); add_edge adds the reverse direction
+            if r + 1 < side and (c == 0 or rng.random() > walls):
+                graph.add_edge((r, c), (r + 1, c), round(spacing * rng.uniform(1.0, 1.3), 2), 'h')
+            if c + 1 < side and (r == 0 or rng.random() > walls):
+                graph.add_edge((r, c), (r, c + 1), round(spacing * rng.uniform(1.0, 1.3), 2), 'd')
+    return graph
+
+
+def _time(search, pairs) -> tuple[list[float], list[list]]:
+    times, paths = [], []
+    for start, goal in pairs:
+        t0 = time.perf_counter()
+        paths.append(search(start, goal))
+        times.append(time.perf_counter() - t0)
+    return times, paths
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, nargs="+", default=[10000, 30000, 100000])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--legacy-queries", type=int, default=3, help="queries for the O(V^2) version")
+    ap.add_argument("--legacy-max-nodes", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    print(f"  {'nodes':>7}  {'search':<16} {'queries':>7} {'mean':>10} {'p95':>10} {'vs heap':>9}")
+    for n in args.nodes:
+        graph = floor_plan(n, seed=args.seed)
+        rng = random.Random(args.seed)
+        nodes = list(graph.adj)
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+
+        base_times, base_paths = _time(graph.dijkstra, pairs)
+        base_mean = statistics.fmean(base_times)
+        expected = [graph.path_length(p) if p else None for p in base_paths]
+        rows = [("heap dijkstra", base_times, base_mean)]
+
+        astar_times, astar_paths = _time(graph.astar, pairs)
+        for want, path in zip(expected, astar_paths):
+            got = graph.path_length(path) if path else None
+            assert (want is None) == (got is None) and (want is None or math.isclose(want, got)), (want, got)
+        rows.append(("A*", astar_times, base_mean))
+
+        if len(graph.adj) <= args.legacy_max_nodes:
+            legacy_pairs = pairs[:args.legacy_queries]
+            legacy_times, legacy_paths = _time(lambda s, t: legacy_dijkstra(graph, s, t), legacy_pairs)
+            for want, path in zip(expected, legacy_paths):
+                assert want is None or math.isclose(want, graph.path_length(path)), (want, path)
+            rows.append(("previous O(V^2)", legacy_times, statistics.fmean(base_times[:len(legacy_pairs)])))
+
+        for name, times, reference in rows:  # reference: heap Dijkstra on the same queries
+            mean = statistics.fmean(times)
+            p95 = sorted(times)[min(len(times) - 1, int(0.95 * len(times)))]
+            print(f"  {len(graph.adj):>7}  {name:<16} {len(times):>7} {mean * 1e3:7.2f} ms {p95 * 1e3:7.2f} ms "
+                  f"{mean / reference:8.2f}x")
+        if len(graph.adj) > args.legacy_max_nodes:
+            print(f"  {len(graph.adj):>7}  {'previous O(V^2)':<16} skipped (above --legacy-max-nodes)")
+
+    # An unreachable goal is an empty route, not a one-node "path"
+    graph = Graph()
+    graph.add_edge("a", "b", 1.0, 'h')
+    graph.add_node("island")
+    assert graph.dijkstra("a", "island") == [] and graph.astar("a", "island") == []
+    print("✅ Routes match heap Dijkstra; unreachable goals return []")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+All-pairs route table benchmark: build cost, memory and lookup time vs. A*.
+
+Compiles the synthetic floor plans from benchmark_pathfinding with a route
+table, then answers the same random (start, goal) pairs by table lookup
+and by A* (on the first tenth of the pairs). Every looked-up route is checked to be as short as heap
+Dijkstra's. The table is what CompiledGraph builds for maps up to
+NAV_ROUTE_TABLE_MAX_NODES nodes (default 2000).
+
+Run from the repository root:
+    python3 -m src.map.test.benchmark_route_table --nodes 500 1000 2000 --queries 1000
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+
+from src.map.mapStructure import Graph
+from src.map.navigation_map import CompiledGraph
+from src.map.test.benchmark_pathfinding import _time, floor_plan
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, nargs="+", default=[500, 1000, 2000])
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    print(f"  {'nodes':>6} {'build':>9} {'table':>9}  {'lookup mean':>11} {'p95':>9}  {'A* mean':>9} {'speedup':>8}")
+    for n in args.nodes:
+        graph = floor_plan(n, seed=args.seed)
+        t0 = time.perf_counter()
+        compiled = CompiledGraph(graph, "bench", table_max_nodes=len(graph.adj))
+        build = time.perf_counter() - t0
+        table = compiled.route_table
+
+        rng = random.Random(args.seed)
+        nodes = list(graph.adj)
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+        lookup_times, lookup_paths = _time(table.path, pairs)
+        astar_times, _ = _time(compiled.astar, pairs[:max(1, args.queries // 10)])
+        for (start, goal), path in zip(pairs[:200], lookup_paths):
+            expected = graph.dijkstra(start, goal)
+            if not expected:  # a junction walled off on all sides
+                assert path == [] and math.isinf(table.length(start, goal)), (start, goal, path)
+                continue
+            want, got = graph.path_length(expected), graph.path_length(path)
+            assert path[0] == start and path[-1] == goal and math.isclose(want, got), (start, goal, want, got)
+            assert math.isclose(table.length(start, goal), want, rel_tol=1e-6)
+
+        mean = statistics.fmean(lookup_times)
+        p95 = sorted(lookup_times)[min(len(lookup_times) - 1, int(0.95 * len(lookup_times)))]
+        astar_mean = statistics.fmean(astar_times)
+        print(f"  {len(nodes):>6} {build:7.2f} s {table.nbytes / 2**20:6.1f} MB  {mean * 1e6:8.1f} us "
+              f"{p95 * 1e6:6.1f} us  {astar_mean * 1e3:6.2f} ms {astar_mean / mean:7.0f}x")
+
+    # Unreachable goals and unknown nodes are empty routes; no table above the node limit
+    graph = Graph()
+    graph.add_edge("a", "b", 1.0, 'h')
+    graph.add_node("island")
+    compiled = CompiledGraph(graph, "check")
+    assert compiled.shortest_path("a", "b") == ["a", "b"] and compiled.shortest_path("b", "a") == ["b", "a"]
+    assert compiled.shortest_path("a", "island") == [] and compiled.shortest_path("a", "nowhere") == []
+    assert CompiledGraph(graph, "check", table_max_nodes=2).route_table is None
+    print("✅ Table routes match heap Dijkstra; unreachable goals return []")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Concurrent navigation planning stress test.
+
+Writes a synthetic floor plan (benchmark_pathfinding.floor_plan, string node
+names) to a map file, then checks that planning in parallel gives exactly
+what planning one request at a time gives:
+
+  1. --plans independent plan_route(graph, start, goal, heading) calls, run
+     serially, on a thread pool and on a process pool (each worker process
+     loads the map file itself; compiled graphs are not pickled).
+  2. --robots robots with their own NavigationSession, each sent through
+     --legs consecutive legs on one shared NavigationMap (and route cache)
+     from a thread pool. Every robot's commands and final pose must match
+     a serial run: a heading shared between robots would break this.
+
+Run from the repository root:
+    python3 -m src.map.test.stress_navigation --plans 100
+    python3 -m src.map.test.stress_navigation --backend astar --nodes 10000
+    python3 -m src.map.test.stress_navigation --backend ch --nodes 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.map.mapStructure import NavigationSession
+from src.map.navigation_map import ROUTE_BACKENDS, NavigationMap, load_map, plan_route
+from src.map.test.benchmark_contraction import named
+from src.map.test.benchmark_pathfinding import floor_plan
+
+_worker_graph = None  # per worker process, loaded by _load_worker
+
+
+def write_map(path: str, nodes: int, seed: int):
+    graph = named(floor_plan(nodes, seed=seed))
+    edges = [[a, b, weight, direction] for a, neighbors in graph.adj.items()
+             for b, (weight, direction) in neighbors.items() if a < b]
+    spec = {"name": f"floor plan {nodes}", "nodes": {n: list(p) for n, p in graph.positions.items()}, "edges": edges}
+    with open(path, "w") as f:
+        json.dump(spec, f)
+
+
+def _load_worker(path: str, backend: str):
+    global _worker_graph
+    _worker_graph = load_map(path, backend=backend)
+
+
+def _plan_in_worker(request):
+    return plan_route(_worker_graph, *request)
+
+
+def _run_legs(nav: NavigationMap, session: NavigationSession, legs: list, start: threading.Barrier = None):
+    if start is not None:
+        start.wait()
+    return [(route.command_list() if route else None) for route in (session.plan(nav, a, b) for a, b in legs)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, default=1600)
+    ap.add_argument("--plans", type=int, default=100)
+    ap.add_argument("--robots", type=int, default=20)
+    ap.add_argument("--legs", type=int, default=5)
+    ap.add_argument("--threads", type=int, default=32)
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--backend", choices=ROUTE_BACKENDS, default="auto")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plan.json")
+        write_map(path, args.nodes, args.seed)
+        graph = load_map(path, backend=args.backend)
+        print(f"🗺️ {len(graph.adj)} nodes, {graph.backend} routes, map version {graph.version}")
+
+        rng = random.Random(args.seed)
+        nodes = list(graph.adj)
+        requests = [(rng.choice(nodes), rng.choice(nodes), rng.choice((0, 90, 180, 270)))
+                    for _ in range(args.plans)]
+
+        t0 = time.perf_counter()
+        serial = [plan_route(graph, *request) for request in requests]
+        serial_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            threaded = list(pool.map(lambda request: plan_route(graph, *request), requests))
+        thread_time = time.perf_counter() - t0
+        assert threaded == serial, "thread pool plans differ from serial plans"
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(args.processes, initializer=_load_worker, initargs=(path, args.backend)) as pool:
+            processed = list(pool.map(_plan_in_worker, requests, chunksize=max(1, args.plans // (4 * args.processes))))
+        process_time = time.perf_counter() - t0  # includes starting workers and loading the map in each
+        assert processed == serial, "process pool plans differ from serial plans"
+
+        turns = sum(1 for commands, _ in serial for c in commands if c["command"] == "turn" and c["float_data"][0])
+        print(f"  {args.plans} plans: serial {serial_time * 1e3:.1f} ms, {args.threads} threads "
+              f"{thread_time * 1e3:.1f} ms, {args.processes} processes {process_time * 1e3:.1f} ms "
+              f"({turns} non-zero turns, all identical)")
+
+        # Robots with their own heading, planning at the same time through one NavigationMap
+        legs = {}
+        for i in range(args.robots):
+            stops = rng.sample(nodes, args.legs + 1)  # each leg starts where the previous one ended
+            legs[f"robot-{i}"] = list(zip(stops, stops[1:]))
+        expected = {}
+        serial_nav = NavigationMap(path, backend=args.backend)
+        for robot, robot_legs in legs.items():
+            session = NavigationSession(robot)
+            expected[robot] = (_run_legs(serial_nav, session, robot_legs), session.pose)
+
+        nav = NavigationMap(path, backend=args.backend)
+        sessions = {robot: NavigationSession(robot) for robot in legs}
+        barrier = threading.Barrier(len(legs))
+        with ThreadPoolExecutor(len(legs)) as pool:
+            futures = {robot: pool.submit(_run_legs, nav, sessions[robot], robot_legs, barrier)
+                       for robot, robot_legs in legs.items()}
+            for robot, future in futures.items():
+                assert (future.result(), sessions[robot].pose) == expected[robot], f"{robot} differs from serial run"
+        print(f"  {args.robots} robots x {args.legs} legs in parallel: commands and final poses match serial runs "
+              f"(route cache {nav.stats()['route_cache']})")
+    print("✅ Concurrent plans match serial execution")
+
+
+if __name__ == "__main__":
+    main()